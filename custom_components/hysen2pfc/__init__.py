@@ -4,39 +4,57 @@ Hysen 2 Pipe Fan Coil Controller — Home Assistant integration.
 Entry points
 ------------
 async_setup          Called once when the integration is first loaded. Initialises
-                     hass.data[DOMAIN] and registers the four custom climate services
-                     (set_hvac_mode, set_temperature, set_fan_mode, set_preset_mode).
-                     Services are guarded with has_service() so they are registered
-                     exactly once even when multiple devices are configured.
-
-async_setup_entry    Called for each config entry (one per physical device). Creates
-                     a Hysen2PipeFanCoilDevice, builds the HysenCoordinator, performs
-                     the first refresh, then forwards setup to all platform modules.
-                     Also registers an options-update listener so that changes made
-                     in the options flow trigger a full entry reload.
+                     hass.data[DOMAIN] (including the shared entity index, the
+                     persisted offline command queues, the desired-settings
+                     reconciler, the settings profiles, the coordinator
+                     snapshots, the fleet write limiter and the fleet metrics)
+                     and registers every custom service in the SERVICES table
+                     of services.py. Services are registered exactly once,
+                     however many devices are configured. Also registers the
+                     HTTP views of the local state proxy (proxy.py).
+
+async_setup_entry    Called for each config entry (one per physical device).
+                     Creates a Hysen2PipeFanCoilDevice (recording its packets
+                     when the capture option is on, see capture.py), builds the
+                     HysenCoordinator (with a HysenTracer when the trace option
+                     is on, see tracing.py), performs the first refresh (or,
+                     after a restart, starts from the saved snapshot and polls
+                     in the background), registers the device with the
+                     reconciler, the snapshot store and the fleet metrics, then
+                     forwards setup to all platform modules. Also registers an
+                     options-update listener so that changes made in the
+                     options flow trigger a full entry reload.
 
 async_unload_entry   Unloads all platforms and removes the device from hass.data.
-                     When the last device is removed the custom services are also
-                     unregistered.
+                     The custom services stay registered; with no device loaded
+                     they reject calls with no_valid_entity_ids.
+
+async_remove_entry   Called after a config entry is deleted. Drops the device's
+                     saved snapshot, desired settings and pending offline
+                     commands, so that re-adding the same MAC starts clean.
 
 Custom services
 ---------------
-The standard HA climate services (climate.set_hvac_mode etc.) do not respect the
-dynamic mode lists that the coordinator provides. These custom services replicate
-that behaviour with the same validation logic used by the climate entity, so that
-automations see the same constraints as the UI.
+See services.py. Each service is one declarative entry in its SERVICES table.
 """
 
+import asyncio
 import logging
 import binascii
-import voluptuous as vol
 from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.exceptions import ConfigEntryNotReady, ServiceValidationError
-from homeassistant.helpers import config_validation as cv
+from homeassistant.exceptions import ConfigEntryNotReady
 from hysen import Hysen2PipeFanCoilDevice
 from .const import (
     DOMAIN,
+    DATA_ENTITY_INDEX,
+    DATA_COMMAND_QUEUE_STORE,
+    DATA_RECONCILER,
+    DATA_PROFILE_STORE,
+    DATA_FLEET_LIMITER,
+    DATA_SNAPSHOT_STORE,
+    DATA_FLEET_METRICS,
+    GLOBAL_FLEET_CONCURRENCY,
     PLATFORMS,
     CONF_HOST, 
     CONF_MAC, 
@@ -45,33 +63,43 @@ from .const import (
     CONF_SYNC_CLOCK,
     CONF_SYNC_HOUR,
     CONF_UPDATE_INTERVAL,
+    CONF_WRITE_RATE,
+    CONF_WRITE_BURST,
+    CONF_STALE_GRACE,
+    CONF_PROXY,
+    CONF_CAPTURE,
+    CONF_LOOP_BUDGET,
+    CONF_TRACE,
     DEFAULT_NAME, 
     DEFAULT_TIMEOUT,
-    DEFAULT_MIN_TEMP,
-    DEFAULT_MAX_TEMP,
     DEFAULT_SYNC_CLOCK,
     DEFAULT_SYNC_HOUR,
     DEFAULT_UPDATE_INTERVAL,
-    ATTR_ENTITY_ID,
-    ATTR_HVAC_MODE,
-    ATTR_TEMPERATURE,
-    ATTR_FAN_MODE,
-    ATTR_PRESET_MODE,
-    ATTR_MIN_TEMP,
-    ATTR_MAX_TEMP,
-    HVAC_MODES,
-    HVAC_MODES_NO_FAN,
-    FAN_AUTO,
-    FAN_MODES,
-    FAN_MODES_MANUAL,
-    PRESET_MODES,
-    SERVICE_SET_TEMPERATURE,
-    SERVICE_SET_HVAC_MODE,
-    SERVICE_SET_FAN_MODE,
-    SERVICE_SET_PRESET_MODE,
-    HVACMode,
+    DEFAULT_WRITE_RATE,
+    DEFAULT_WRITE_BURST,
+    DEFAULT_STALE_GRACE,
+    DEFAULT_PROXY,
+    DEFAULT_CAPTURE,
+    DEFAULT_LOOP_BUDGET,
+    DEFAULT_TRACE,
+    CAPTURE_DIR,
+    CAPTURE_MAX_BYTES,
+    CAPTURE_BACKUP_COUNT,
+    TRACE_DIR,
+    TRACE_MAX_BYTES,
+    TRACE_BACKUP_COUNT,
 )
+from .capture import HysenCaptureLog
+from .command_queue import HysenCommandQueueStore
 from .coordinator import HysenCoordinator
+from .entity import HysenEntityIndex
+from .metrics import HysenFleetMetrics
+from .profiles import HysenProfileStore
+from .proxy import async_register_views
+from .reconciler import HysenReconciler
+from .services import async_register_services
+from .snapshots import HysenSnapshotStore
+from .tracing import HysenTraceLog, HysenTracer
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -89,6 +117,27 @@ async def async_setup(hass: HomeAssistant, config: dict):
     """
     _LOGGER.info("Initializing Hysen2pfc integration")
     hass.data.setdefault(DOMAIN, {})
+    hass.data[DOMAIN].setdefault(DATA_ENTITY_INDEX, HysenEntityIndex())
+    if DATA_COMMAND_QUEUE_STORE not in hass.data[DOMAIN]:
+        store = HysenCommandQueueStore(hass)
+        await store.async_load()
+        hass.data[DOMAIN][DATA_COMMAND_QUEUE_STORE] = store
+    if DATA_RECONCILER not in hass.data[DOMAIN]:
+        reconciler = HysenReconciler(hass)
+        await reconciler.async_load()
+        hass.data[DOMAIN][DATA_RECONCILER] = reconciler
+    if DATA_PROFILE_STORE not in hass.data[DOMAIN]:
+        profiles = HysenProfileStore(hass)
+        await profiles.async_load()
+        hass.data[DOMAIN][DATA_PROFILE_STORE] = profiles
+    if DATA_SNAPSHOT_STORE not in hass.data[DOMAIN]:
+        snapshots = HysenSnapshotStore(hass)
+        await snapshots.async_load()
+        hass.data[DOMAIN][DATA_SNAPSHOT_STORE] = snapshots
+    hass.data[DOMAIN].setdefault(DATA_FLEET_LIMITER, asyncio.Semaphore(GLOBAL_FLEET_CONCURRENCY))
+    hass.data[DOMAIN].setdefault(DATA_FLEET_METRICS, HysenFleetMetrics())
+    async_register_services(hass)
+    async_register_views(hass)
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
@@ -107,6 +156,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     mac = entry.data[CONF_MAC]
     name = entry.data.get(CONF_NAME, DEFAULT_NAME)
     hass.data.setdefault(DOMAIN, {})
+    hass.data[DOMAIN].setdefault(DATA_ENTITY_INDEX, HysenEntityIndex())
     timeout = entry.options.get(CONF_TIMEOUT, entry.data.get(CONF_TIMEOUT, DEFAULT_TIMEOUT))
     sync_clock = entry.options.get(CONF_SYNC_CLOCK, DEFAULT_SYNC_CLOCK)
     sync_hour = entry.options.get(CONF_SYNC_HOUR, DEFAULT_SYNC_HOUR)
@@ -128,8 +178,49 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         _LOGGER.error("Failed to initialize Hysen device at %s: %s", host, e)
         raise ConfigEntryNotReady from e
 
-    coordinator = HysenCoordinator(hass, device, host, entry, update_interval=update_interval)
-    await coordinator.async_config_entry_first_refresh()
+    coordinator = HysenCoordinator(
+        hass, device, host, entry,
+        update_interval=update_interval,
+        command_queue_store=hass.data[DOMAIN][DATA_COMMAND_QUEUE_STORE],
+        write_rate=entry.options.get(CONF_WRITE_RATE, DEFAULT_WRITE_RATE),
+        write_burst=entry.options.get(CONF_WRITE_BURST, DEFAULT_WRITE_BURST),
+        stale_grace=entry.options.get(CONF_STALE_GRACE, DEFAULT_STALE_GRACE),
+        loop_budget=entry.options.get(CONF_LOOP_BUDGET, DEFAULT_LOOP_BUDGET),
+    )
+    if entry.options.get(CONF_CAPTURE, DEFAULT_CAPTURE):
+        capture = HysenCaptureLog(
+            hass.config.path(DOMAIN, CAPTURE_DIR), mac_bytes, CAPTURE_MAX_BYTES, CAPTURE_BACKUP_COUNT
+        )
+        # Attached after the coordinator's metrics so that their time on
+        # the wire does not include the capture writes.
+        capture.attach(device)
+
+        async def _async_close_capture() -> None:
+            await hass.async_add_executor_job(capture.close)
+
+        entry.async_on_unload(_async_close_capture)
+
+    if entry.options.get(CONF_TRACE, DEFAULT_TRACE):
+        trace_log = HysenTraceLog(
+            hass.config.path(DOMAIN, TRACE_DIR), mac_bytes, host, TRACE_MAX_BYTES, TRACE_BACKUP_COUNT
+        )
+        coordinator.tracer = HysenTracer(hass, trace_log)
+
+        async def _async_close_trace() -> None:
+            await hass.async_add_executor_job(trace_log.close)
+
+        entry.async_on_unload(_async_close_trace)
+
+    snapshot = hass.data[DOMAIN][DATA_SNAPSHOT_STORE].get(mac)
+    if snapshot is not None:
+        # Warm restart: entities start from the cached state and the first
+        # live poll runs in the background.
+        coordinator.async_restore_snapshot(snapshot)
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN}_{host}_first_refresh"
+        )
+    else:
+        await coordinator.async_config_entry_first_refresh()
 
     hass.data[DOMAIN][entry.entry_id] = {
         "host": host,
@@ -137,497 +228,14 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         "name": name,
         "timeout": timeout,
         "coordinator": coordinator,
+        "proxy": entry.options.get(CONF_PROXY, DEFAULT_PROXY),
     }
 
-    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
-
-    # Register custom service for set_hvac_mode
-    async def async_set_hvac_mode_handler(service_call):
-        """Handle the hysen2pfc.set_hvac_mode service call.
-
-        Processes the service call to set the HVAC mode for Hysen climate entities.
-        Validates the provided entity_id(s) and hvac_mode, then calls the climate.set_hvac_mode
-        service for each valid entity.
-
-        Args:
-            service_call (homeassistant.core.ServiceCall): The service call object containing
-                the domain, service, data, and context of the call. Expects 'entity_id' (string or list)
-                and 'hvac_mode' (string) in service_call.data.
-
-        Raises:
-            ServiceValidationError: If entity_id or hvac_mode is missing, invalid, or if no valid entity IDs are provided.
-            HomeAssistantError: If the climate.set_hvac_mode service call fails for any entity.
-
-        Example:
-            Service call data:
-            service: hysen2pfc.set_hvac_mode
-            target:
-              entity_id: climate.office
-            data:
-              hvac_mode: heat
-            or
-            service: hysen2pfc.set_hvac_mode
-            data:
-              entity_id: climate.office
-              hvac_mode: heat
-        """
-        entity_ids = service_call.data.get('entity_id')
-        hvac_mode = service_call.data.get(ATTR_HVAC_MODE)
-        
-        # Check for missing or None values
-        if entity_ids is None:
-            _LOGGER.error("Missing or invalid entity_id (%s)", 
-                          entity_ids)
-            raise ServiceValidationError(
-                f"Missing or invalid entity_id ({entity_ids})",
-                translation_domain=DOMAIN,
-                translation_key="missing_or_invalid_entity_id",
-            )
-        if hvac_mode is None:
-            _LOGGER.error("Missing or invalid hvac_mode: (%s)", 
-                          hvac_mode)
-            raise ServiceValidationError(
-                f"Missing or invalid hvac_mode {hvac_mode}",
-                translation_domain=DOMAIN,
-                translation_key="missing_or_invalid_hvac_mode",
-            )
-
-        # Ensure entity_ids is a list
-        if isinstance(entity_ids, str):
-            entity_ids = [entity_ids]
-        elif not isinstance(entity_ids, list):
-            _LOGGER.error("entity_id must be a string or list of strings, got %s (type: %s)", 
-                          entity_ids, type(entity_ids))
-            raise ServiceValidationError(
-                f"entity_id must be a string or list of strings, got {entity_ids}",
-                translation_domain=DOMAIN,
-                translation_key="invalid_entity_id_type",
-            )
-        
-        # Validate each entity_id
-        valid_entity_ids = []
-        for entity_id in entity_ids:
-            if not isinstance(entity_id, str):
-                _LOGGER.error("Invalid entity_id: %s is not a string (type: %s)", entity_id, type(entity_id))
-                continue
-            if not entity_id.startswith("climate."):
-                _LOGGER.error("Invalid entity_id: %s does not belong to climate domain", entity_id)
-                continue
-
-            # Check fan mode for fan_only HVAC mode
-            if hvac_mode == HVACMode.FAN_ONLY:
-                entity_state = hass.states.get(entity_id)
-                _LOGGER.debug("Get entity_state: %s, entity_state.attributes.get(ATTR_FAN_MODE): %s", 
-                              entity_state, entity_state.attributes.get(ATTR_FAN_MODE) if entity_state else None)
-                if entity_state and entity_state.attributes.get(ATTR_FAN_MODE) == FAN_AUTO:
-                    _LOGGER.error("[%s] HVAC mode %s is not allowed when fan mode is auto. Valid fan modes are: %s", 
-                                  entity_id, hvac_mode, ", ".join(FAN_MODES_MANUAL))
-                    raise ServiceValidationError(
-                        f"HVAC mode {hvac_mode} is not allowed when fan mode is auto. Set fan mode to low, medium, or high first.",
-                        translation_domain=DOMAIN,
-                        translation_key="fan_only_with_auto_fan",
-                    )
-
-            valid_entity_ids.append(entity_id)
-        
-        if not valid_entity_ids:
-            _LOGGER.error("No valid entity IDs provided")
-            raise ServiceValidationError(
-                "No valid entity IDs provided",
-                translation_domain=DOMAIN,
-                translation_key="no_valid_entity_ids",
-            )
-        
-        # Process valid entity_ids
-        for entity_id in valid_entity_ids:
-            try:
-                await hass.services.async_call(
-                    'climate',
-                    SERVICE_SET_HVAC_MODE,
-                    {'entity_id': entity_id, 'hvac_mode': hvac_mode},
-                    context=service_call.context
-                )
-                _LOGGER.debug("Called climate.set_hvac_mode for %s with hvac_mode %s", entity_id, hvac_mode)
-            except Exception as e:
-                _LOGGER.error("Failed to set hvac mode for %s: %s", entity_id, e)
-                raise
-
-    if not hass.services.has_service(DOMAIN, SERVICE_SET_HVAC_MODE):
-        hass.services.async_register(
-            DOMAIN,
-            SERVICE_SET_HVAC_MODE,
-            async_set_hvac_mode_handler,
-            schema=vol.Schema({
-                vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
-                vol.Required(ATTR_HVAC_MODE): cv.string,  # Validate as string, check in async_set_hvac_mode
-            })
-        )
-
-    # Register custom service for set_temperature
-    async def async_set_temperature_handler(service_call):
-        """Handle the hysen2pfc.set_temperature service call.
-
-        Processes the service call to set the target temperature for Hysen climate entities.
-        Validates the provided entity_id(s) and temperature against the entity's min_temp and max_temp,
-        then calls the climate.set_temperature service for each valid entity.
-
-        Args:
-            service_call (homeassistant.core.ServiceCall): The service call object containing
-                the domain, service, data, and context of the call. Expects 'entity_id' (string or list)
-                and 'temperature' (float) in service_call.data.
-
-        Raises:
-            ServiceValidationError: If entity_id or temperature is missing, invalid, or if no valid entity IDs are provided.
-            HomeAssistantError: If the climate.set_temperature service call fails for any entity.
-
-        Example:
-            Service call data:
-            service: hysen2pfc.set_temperature
-            target:
-              entity_id: climate.office
-            data:
-              temperature: 22
-            or
-            service: hysen2pfc.set_temperature
-            data:
-              entity_id: climate.office
-              temperature: 22
-        """
-        entity_ids = service_call.data.get('entity_id')
-        temperature = service_call.data.get(ATTR_TEMPERATURE)
-        
-        # Check for missing or None values
-        if entity_ids is None:
-            _LOGGER.error("Missing or invalid entity_id (%s)", 
-                          entity_ids)
-            raise ServiceValidationError(
-                f"Missing or invalid entity_id ({entity_ids})",
-                translation_domain=DOMAIN,
-                translation_key="missing_or_invalid_entity_id",
-            )
-        if temperature is None:
-            _LOGGER.error("Missing or invalid temperature (%s)", 
-                          temperature)
-            raise ServiceValidationError(
-                f"Missing or invalid temperature ({temperature})",
-                translation_domain=DOMAIN,
-                translation_key="missing_or_invalid_temperature",
-            )
-        
-        # Ensure entity_ids is a list
-        if isinstance(entity_ids, str):
-            entity_ids = [entity_ids]
-        elif not isinstance(entity_ids, list):
-            _LOGGER.error("entity_id must be a string or list of strings, got %s (type: %s)", 
-                          entity_ids, type(entity_ids))
-            raise ServiceValidationError(
-                f"entity_id must be a string or list of strings, got {entity_ids}",
-                translation_domain=DOMAIN,
-                translation_key="invalid_entity_id_type",
-            )
-        
-        # Validate each entity_id and temperature
-        valid_entity_ids = []
-        for entity_id in entity_ids:
-            if not isinstance(entity_id, str):
-                _LOGGER.error("Invalid entity_id: %s is not a string (type: %s)", entity_id, type(entity_id))
-                continue
-            if not entity_id.startswith("climate."):
-                _LOGGER.error("Invalid entity_id: %s does not belong to climate domain", entity_id)
-                continue
-
-            # Check temperature range
-            entity_state = hass.states.get(entity_id)
-            if not entity_state:
-                _LOGGER.error("Entity %s not found", entity_id)
-                continue
-            min_temp = entity_state.attributes.get(ATTR_MIN_TEMP, DEFAULT_MIN_TEMP)
-            max_temp = entity_state.attributes.get(ATTR_MAX_TEMP, DEFAULT_MAX_TEMP)
-            try:
-                temp_value = float(temperature)
-                if temp_value < min_temp or temp_value > max_temp:
-                    _LOGGER.error(
-                        "[%s] Temperature %s is out of range. Valid range is %s to %s",
-                        entity_id, temp_value, min_temp, max_temp
-                    )
-                    raise ServiceValidationError(
-                        f"Temperature {temp_value} is out of range for {entity_id}. Valid range is {min_temp} to {max_temp}.",
-                        translation_domain=DOMAIN,
-                        translation_key="temperature_out_of_range",
-                    )
-                valid_entity_ids.append(entity_id)
-            except (TypeError, ValueError):
-                _LOGGER.error("Invalid temperature type: %s (expected a number)", temperature)
-                raise ServiceValidationError(
-                    f"Invalid temperature type: {temperature} (expected a number)",
-                    translation_domain=DOMAIN,
-                    translation_key="invalid_temperature_type",
-                )
-        
-        if not valid_entity_ids:
-            _LOGGER.error("No valid entity IDs provided")
-            raise ServiceValidationError(
-                "No valid entity IDs provided",
-                translation_domain=DOMAIN,
-                translation_key="no_valid_entity_ids",
-            )
-        
-        # Process valid entity_ids
-        for entity_id in valid_entity_ids:
-            try:
-                await hass.services.async_call(
-                    'climate',
-                    SERVICE_SET_TEMPERATURE,
-                    {'entity_id': entity_id, 'temperature': temp_value},
-                    context=service_call.context
-                )
-                _LOGGER.debug("Called climate.set_temperature for %s with temperature %s", entity_id, temperature)
-            except Exception as e:
-                _LOGGER.error("Failed to set temperature for %s: %s", entity_id, e)
-                raise
-
-    if not hass.services.has_service(DOMAIN, SERVICE_SET_TEMPERATURE):
-        hass.services.async_register(
-            DOMAIN,
-            SERVICE_SET_TEMPERATURE,
-            async_set_temperature_handler,
-            schema=vol.Schema({
-                vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
-                vol.Required(ATTR_TEMPERATURE): cv.positive_float,  # Accept positive float, validation in async_set_temperature
-            })
-        )
-
-    # Register custom service for set_fan_mode
-    async def async_set_fan_mode_handler(service_call):
-        """Handle the hysen2pfc.set_fan_mode service call.
-
-        Processes the service call to set the fan mode for Hysen climate entities.
-        Validates the provided entity_id(s) and fan_mode, then calls the climate.set_fan_mode
-        service for each valid entity.
-
-        Args:
-            service_call (homeassistant.core.ServiceCall): The service call object containing
-                the domain, service, data, and context of the call. Expects 'entity_id' (string or list)
-                and 'fan_mode' (string) in service_call.data.
-
-        Raises:
-            ServiceValidationError: If entity_id or fan_mode is missing, invalid, or if no valid entity IDs are provided.
-            HomeAssistantError: If the climate.set_fan_mode service call fails for any entity.
-
-        Example:
-            Service call data:
-            service: hysen2pfc.set_fan_mode
-            target:
-              entity_id: climate.office
-            data:
-              fan_mode: low
-            or
-            service: hysen2pfc.set_fan_mode
-            data:
-              entity_id: climate.office
-              fan_mode: low
-        """
-        entity_ids = service_call.data.get('entity_id')
-        fan_mode = service_call.data.get(ATTR_FAN_MODE)
-        
-        # Check for missing or None values
-        if entity_ids is None:
-            _LOGGER.error("Missing or invalid entity_id (%s)", 
-                          entity_ids)
-            raise ServiceValidationError(
-                f"Missing or invalid entity_id ({entity_ids})",
-                translation_domain=DOMAIN,
-                translation_key="missing_or_invalid_entity_id",
-            )
-        if fan_mode is None:
-            _LOGGER.error("Missing or invalid fan_mode (%s)", 
-                          fan_mode)
-            raise ServiceValidationError(
-                f"Missing or invalid fan_mode: {fan_mode}",
-                translation_domain=DOMAIN,
-                translation_key="missing_or_invalid_fan_mode",
-            )
-
-        # Ensure entity_ids is a list
-        if isinstance(entity_ids, str):
-            entity_ids = [entity_ids]
-        elif not isinstance(entity_ids, list):
-            _LOGGER.error("entity_id must be a string or list of strings, got %s (type: %s)", 
-                          entity_ids, type(entity_ids))
-            raise ServiceValidationError(
-                f"entity_id must be a string or list of strings, got {entity_ids}",
-                translation_domain=DOMAIN,
-                translation_key="invalid_entity_id_type",
-            )
-
-        # Validate each entity_id
-        valid_entity_ids = []
-        for entity_id in entity_ids:
-            if not isinstance(entity_id, str):
-                _LOGGER.error("Invalid entity_id: %s is not a string (type: %s)", entity_id, type(entity_id))
-                continue
-            if not entity_id.startswith("climate."):
-                _LOGGER.error("Invalid entity_id: %s does not belong to climate domain", entity_id)
-                continue
-
-            # Check HVAC mode for auto fan mode
-            if fan_mode == FAN_AUTO:
-                entity_state = hass.states.get(entity_id)
-                _LOGGER.debug("Get entity_state: %s, entity_state.attributes.get(ATTR_HVAC_MODE): %s", 
-                              entity_state, entity_state.attributes.get(ATTR_HVAC_MODE) if entity_state else None)
-                if entity_state and entity_state.attributes.get(ATTR_HVAC_MODE) == HVACMode.FAN_ONLY:
-                    _LOGGER.error("[%s] fan mode %s is not allowed when HVAC mode is fan_only. Valid HVAC modes are: %s", 
-                                  entity_id, fan_mode, ", ".join(HVAC_MODES_NO_FAN))
-                    raise ServiceValidationError(
-                        f"fan mode {fan_mode} is not allowed when HVAC mode is fan_only. Set HVAC mode to off, heat, or cool first.",
-                        translation_domain=DOMAIN,
-                        translation_key="auto_fan_with_fan_only",
-                    )
-
-            valid_entity_ids.append(entity_id)
-
-        if not valid_entity_ids:
-            _LOGGER.error("No valid entity IDs provided")
-            raise ServiceValidationError(
-                "No valid entity IDs provided",
-                translation_domain=DOMAIN,
-                translation_key="no_valid_entity_ids",
-            )
-        
-        # Process valid entity_ids
-        for entity_id in valid_entity_ids:
-            try:
-                await hass.services.async_call(
-                    'climate',
-                    SERVICE_SET_FAN_MODE,
-                    {'entity_id': entity_id, 'fan_mode': fan_mode},
-                    context=service_call.context
-                )
-                _LOGGER.debug("Called climate.set_fan_mode for %s with fan_mode %s", entity_id, fan_mode)
-            except Exception as e:
-                _LOGGER.error("Failed to set fan mode for %s: %s", entity_id, e)
-                raise
-
-    if not hass.services.has_service(DOMAIN, SERVICE_SET_FAN_MODE):
-        hass.services.async_register(
-            DOMAIN,
-            SERVICE_SET_FAN_MODE,
-            async_set_fan_mode_handler,
-            schema=vol.Schema({
-                vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
-    #            vol.Required(ATTR_FAN_MODE): vol.In(["low", "medium", "high", "auto"])
-                vol.Required(ATTR_FAN_MODE): cv.string,  # Validate as string, check in async_set_hvac_mode
-            })
-        )
+    entry.async_on_unload(hass.data[DOMAIN][DATA_RECONCILER].async_track(hass.data[DOMAIN][entry.entry_id]))
+    entry.async_on_unload(hass.data[DOMAIN][DATA_SNAPSHOT_STORE].async_track(mac, coordinator))
+    entry.async_on_unload(hass.data[DOMAIN][DATA_FLEET_METRICS].async_track(mac, coordinator.metrics))
 
-    # Register custom service for set_preset_mode
-    async def async_set_preset_mode_handler(service_call):
-        """Handle the hysen2pfc.set_preset_mode service call.
-
-        Processes the service call to set the preset mode for Hysen climate entities.
-        Validates the provided entity_id(s) and preset_mode, then calls the climate.set_preset_mode
-        service for each valid entity.
-
-        Args:
-            service_call (homeassistant.core.ServiceCall): The service call object containing
-                the domain, service, data, and context of the call. Expects 'entity_id' (string or list)
-                and 'preset_mode' (string) in service_call.data.
-
-        Raises:
-            ServiceValidationError: If entity_id or preset_mode is missing, invalid, or if no valid entity IDs are provided.
-            HomeAssistantError: If the climate.set_preset_mode service call fails for any entity.
-
-        Example:
-            Service call data:
-            service: hysen2pfc.set_preset_mode
-            target:
-              entity_id: climate.office
-            data:
-              preset_mode: Today
-            or
-            service: hysen2pfc.set_preset_mode
-            data:
-              entity_id: climate.office
-              preset_mode: Today
-        """
-
-        entity_ids = service_call.data.get('entity_id')
-        preset_mode = service_call.data.get(ATTR_PRESET_MODE)
-        
-        # Check for missing or None values
-        if entity_ids is None:
-            _LOGGER.error("Missing or invalid entity_id (%s)", 
-                          entity_ids)
-            raise ServiceValidationError(
-                f"Missing or invalid entity_id ({entity_ids})",
-                translation_domain=DOMAIN,
-                translation_key="missing_or_invalid_entity_id",
-            )
-        if preset_mode is None:
-            _LOGGER.error("Missing or invalid preset_mode (%s)", 
-                          preset_mode)
-            raise ServiceValidationError(
-                f"Missing or invalid preset_mode ({preset_mode})",
-                translation_domain=DOMAIN,
-                translation_key="missing_or_invalid_preset_mode",
-            )
-        
-        # Ensure entity_ids is a list
-        if isinstance(entity_ids, str):
-            entity_ids = [entity_ids]
-        elif not isinstance(entity_ids, list):
-            _LOGGER.error("entity_id must be a string or list of strings, got %s (type: %s)", 
-                          entity_ids, type(entity_ids))
-            raise ServiceValidationError(
-                f"entity_id must be a string or list of strings, got {entity_ids}",
-                translation_domain=DOMAIN,
-                translation_key="invalid_entity_id_type",
-            )
-        
-        # Validate each entity_id
-        valid_entity_ids = []
-        for entity_id in entity_ids:
-            if not isinstance(entity_id, str):
-                _LOGGER.error("Invalid entity_id: %s is not a string (type: %s)", entity_id, type(entity_id))
-                continue
-            if not entity_id.startswith("climate."):
-                _LOGGER.error("Invalid entity_id: %s does not belong to climate domain", entity_id)
-                continue
-            valid_entity_ids.append(entity_id)
-        
-        if not valid_entity_ids:
-            _LOGGER.error("No valid entity IDs provided")
-            raise ServiceValidationError(
-                "No valid entity IDs provided",
-                translation_domain=DOMAIN,
-                translation_key="no_valid_entity_ids",
-            )
-        
-        # Process valid entity_ids
-        for entity_id in valid_entity_ids:
-            try:
-                await hass.services.async_call(
-                    'climate',
-                    SERVICE_SET_PRESET_MODE,
-                    {'entity_id': entity_id, 'preset_mode': preset_mode},
-                    context=service_call.context
-                )
-                _LOGGER.debug("Called climate.set_preset_mode for %s with preset %s", entity_id, preset_mode)
-            except Exception as e:
-                _LOGGER.error("Failed to set preset mode for %s: %s", entity_id, e)
-                raise
-
-    # Register the service with updated schema
-    if not hass.services.has_service(DOMAIN, SERVICE_SET_PRESET_MODE):
-        hass.services.async_register(
-            DOMAIN,
-            SERVICE_SET_PRESET_MODE,
-            async_set_preset_mode_handler,
-            schema=vol.Schema({
-                vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
-                vol.Required(ATTR_PRESET_MODE): cv.string,  # Validate as string, check in async_set_preset_mode
-            })
-        )
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     _LOGGER.debug("Forwarding setup to %s platforms for MAC %s", PLATFORMS, mac)
@@ -657,13 +265,27 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id, None)
-        # Remove custom services only when the last config entry is removed
-        if not hass.data[DOMAIN]:
-            for service_name in [
-                SERVICE_SET_HVAC_MODE,
-                SERVICE_SET_TEMPERATURE,
-                SERVICE_SET_FAN_MODE,
-                SERVICE_SET_PRESET_MODE,
-            ]:
-                hass.services.async_remove(DOMAIN, service_name)
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted state of a deleted Hysen config entry.
+
+    The snapshot store, the reconciler and the command queue store are keyed
+    by MAC address and outlive config entries, so without this a device
+    added again later would start from the old snapshot, be pushed back to
+    the old desired settings and replay the old queued commands.
+
+    Args:
+        hass: The Home Assistant instance.
+        entry: The configuration entry being removed.
+    """
+    mac = entry.data[CONF_MAC]
+    domain_data = hass.data.get(DOMAIN, {})
+    if DATA_SNAPSHOT_STORE in domain_data:
+        domain_data[DATA_SNAPSHOT_STORE].async_remove(mac)
+    if DATA_RECONCILER in domain_data:
+        domain_data[DATA_RECONCILER].async_clear_desired(mac)
+    if DATA_COMMAND_QUEUE_STORE in domain_data:
+        domain_data[DATA_COMMAND_QUEUE_STORE].async_set(mac, [])
+    _LOGGER.info("Removed stored state of device with MAC %s", mac)
@@ -0,0 +1,215 @@
+"""
+Settings backup and restore for the Hysen 2 Pipe Fan Coil integration.
+
+A snapshot holds everything needed to re-commission a unit: the
+configuration settings (see settings.py) and the weekly schedule (preset
+plus the four slot edges). Snapshots are versioned JSON files in
+<config>/hysen2pfc/backups/, one file per device and export:
+
+    {
+      "version": 1,
+      "created": "2026-01-31T08:00:00+01:00",
+      "name": "Living room", "mac": "34:ea:34:...",
+      "settings": {"hysteresis": "0.5", "calibration": -0.5, ...},
+      "schedule": {"preset_mode": "Workdays", "slot1_start_time": "7:30", ...}
+    }
+
+hysen2pfc.restore_settings applies one snapshot to any number of devices.
+Like apply_schedule, only the fields that differ are written, and per
+device they are folded into at most four writes (set_options,
+set_lock_power, set_daily_schedule, set_weekly_schedule) sent as one batch
+followed by one refresh, instead of one round trip per entity. The restored
+settings also become the device's desired settings (see reconciler.py).
+"""
+
+import json
+import logging
+import os
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.util import dt as dt_util
+from .const import (
+    DOMAIN,
+    BACKUP_DIR,
+    BACKUP_VERSION,
+    DEFAULT_FLEET_CONCURRENCY,
+    DATA_KEY_PRESET_MODE,
+    ATTR_FILE,
+    ATTR_PRESET_MODE,
+    ATTR_MAX_CONCURRENCY,
+)
+from .fleet import (
+    RESULT_UPDATED,
+    RESULT_FAILED,
+    SCHEDULE_EDGES,
+    SCHEDULE_FIELDS,
+    SCHEDULE_SCHEMA,
+    async_apply_configuration,
+    async_require_devices,
+    validate_schedule_order,
+)
+from .settings import (
+    SETTINGS,
+    SETTINGS_SCHEMA,
+    SETTING_DATA_KEYS,
+    validate_limits,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _backup_dir(hass: HomeAssistant) -> str:
+    """Return the directory holding the snapshot files."""
+    return hass.config.path(DOMAIN, BACKUP_DIR)
+
+
+def _invalid_backup(file: str, error: str) -> ServiceValidationError:
+    """Build the error raised for a missing or unusable snapshot file."""
+    _LOGGER.error("Invalid settings backup %s: %s", file, error)
+    return ServiceValidationError(
+        f"Invalid settings backup {file}: {error}",
+        translation_domain=DOMAIN,
+        translation_key="invalid_backup",
+        translation_placeholders={"file": file, "error": error},
+    )
+
+
+def build_snapshot(device_data: dict) -> dict:
+    """Return the snapshot of one device from its coordinator data."""
+    data = device_data["coordinator"].data
+    schedule = {ATTR_PRESET_MODE: data.get(DATA_KEY_PRESET_MODE)}
+    for enable_attr, time_attr, enable_key, time_key in SCHEDULE_EDGES:
+        schedule[enable_attr] = data.get(enable_key)
+        schedule[time_attr] = data.get(time_key)
+    return {
+        "version": BACKUP_VERSION,
+        "created": dt_util.now().isoformat(),
+        "name": device_data["name"],
+        "mac": device_data["mac"],
+        "settings": {setting: data.get(data_key) for setting, data_key in SETTING_DATA_KEYS.items()},
+        "schedule": schedule,
+    }
+
+
+def _parse_snapshot(file: str, snapshot) -> tuple:
+    """Validate a loaded snapshot and return its (settings, schedule).
+
+    Unknown keys are ignored and missing ones are left unchanged on restore,
+    so snapshots of a later minor layout still restore what they share.
+    The values go through the same schemas and checks as the service
+    fields, so a hand-edited file cannot reach the device or the desired
+    settings with values the services would reject.
+
+    Raises:
+        ServiceValidationError: If the snapshot is not a supported version
+            or holds an invalid value.
+    """
+    if not isinstance(snapshot, dict) or snapshot.get("version") != BACKUP_VERSION:
+        version = snapshot.get("version") if isinstance(snapshot, dict) else None
+        raise _invalid_backup(file, f"unsupported version {version}")
+    settings = {
+        key: value for key, value in (snapshot.get("settings") or {}).items()
+        if key in SETTINGS and value is not None
+    }
+    schedule = {
+        key: value for key, value in (snapshot.get("schedule") or {}).items()
+        if key in SCHEDULE_FIELDS and value is not None
+    }
+    try:
+        settings = vol.Schema(SETTINGS_SCHEMA)(settings)
+        schedule = vol.Schema(SCHEDULE_SCHEMA)(schedule)
+    except vol.Invalid as exc:
+        raise _invalid_backup(file, str(exc)) from exc
+    try:
+        validate_limits(settings)
+        validate_schedule_order(schedule)
+    except ServiceValidationError as exc:
+        raise _invalid_backup(file, str(exc)) from exc
+    return settings, schedule
+
+
+async def async_export_settings(hass: HomeAssistant, service_call: ServiceCall) -> dict:
+    """Write a snapshot file for every targeted device.
+
+    No device I/O is needed: snapshots are taken from the coordinator data
+    of the last poll. Devices whose last poll failed are reported as failed
+    instead of exporting stale values.
+
+    Args:
+        hass: The Home Assistant instance.
+        service_call: The hysen2pfc.export_settings service call.
+
+    Returns:
+        Dict with a per-device 'devices' list holding the file name and the
+        snapshot.
+
+    Raises:
+        ServiceValidationError: If no Hysen device is targeted.
+    """
+    devices = async_require_devices(hass, service_call)
+    directory = _backup_dir(hass)
+    stamp = dt_util.now().strftime("%Y%m%d_%H%M%S")
+
+    results = []
+    files = {}
+    for device_data in devices:
+        result = {"name": device_data["name"], "mac": device_data["mac"]}
+        if not device_data["coordinator"].online:
+            result.update(result=RESULT_FAILED, error="device unavailable")
+        else:
+            file = f"{device_data['mac'].replace(':', '').lower()}_{stamp}.json"
+            snapshot = build_snapshot(device_data)
+            files[file] = snapshot
+            result.update(result=RESULT_UPDATED, file=file, snapshot=snapshot)
+        results.append(result)
+
+    def _write_files():
+        os.makedirs(directory, exist_ok=True)
+        for file, snapshot in files.items():
+            with open(os.path.join(directory, file), "w", encoding="utf-8") as handle:
+                json.dump(snapshot, handle, indent=2)
+
+    await hass.async_add_executor_job(_write_files)
+    _LOGGER.info("Exported %d settings backups to %s", len(files), directory)
+    return {"devices": results}
+
+
+async def async_restore_settings(hass: HomeAssistant, service_call: ServiceCall) -> dict:
+    """Restore one snapshot to every targeted device.
+
+    Each device receives only the fields that differ from its coordinator
+    data, see async_apply_configuration.
+
+    Args:
+        hass: The Home Assistant instance.
+        service_call: The hysen2pfc.restore_settings service call.
+
+    Returns:
+        Dict with a per-device 'devices' list and a 'summary' of counts.
+
+    Raises:
+        ServiceValidationError: If the file is missing or not a supported
+            snapshot, if no Hysen device is targeted, or if the settings
+            break a limit on any targeted device.
+    """
+    file = service_call.data[ATTR_FILE]
+    if not file.endswith(".json"):
+        file = f"{file}.json"
+    if os.path.basename(file) != file:
+        raise _invalid_backup(file, "expected a file name inside the backups directory")
+    path = os.path.join(_backup_dir(hass), file)
+    max_concurrency = service_call.data.get(ATTR_MAX_CONCURRENCY, DEFAULT_FLEET_CONCURRENCY)
+
+    def _read_file():
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+
+    try:
+        snapshot = await hass.async_add_executor_job(_read_file)
+    except (OSError, ValueError) as exc:
+        raise _invalid_backup(file, str(exc)) from exc
+    settings, schedule = _parse_snapshot(file, snapshot)
+
+    devices = async_require_devices(hass, service_call)
+    return await async_apply_configuration(hass, devices, settings, schedule, max_concurrency, "restore_settings")
@@ -0,0 +1,251 @@
+"""
+Packet capture and replay for the Hysen 2 Pipe Fan Coil integration.
+
+With the capture option enabled on a device, every request the library
+sends and the response it gets (or the timeout or error it raises) is
+appended to a binary log in <config>/hysen2pfc/captures/<mac>.hcap,
+rotated like a log file: at CAPTURE_MAX_BYTES the file becomes <mac>.hcap.1
+(the older ones move up), and only CAPTURE_BACKUP_COUNT rotated files are
+kept. Recording happens in the executor thread that already does the
+device I/O, so the event loop never touches the file.
+
+Frames are stored with the AES layer removed: the session key changes on
+every authentication, so encrypted frames could not be played back. A log
+therefore contains the session keys of the device; keep it local.
+
+File format (little endian)::
+
+    header   "HYCAP", version (u8), MAC address (6 bytes)
+    record   timestamp (f64, UNIX time the request was sent),
+             latency (f32, seconds until the response or the error),
+             packet type (u16, 0x65 auth / 0x6a command),
+             outcome (u8, OUTCOME_*),
+             request length (u16), response length (u16),
+             request payload, response
+    response OUTCOME_OK: the 0x38-byte packet header followed by the
+             decrypted payload; otherwise the error message (UTF-8).
+
+HysenReplayDevice plays a capture back to the coordinator offline: it is a
+Hysen2PipeFanCoilDevice whose send_packet answers every request with the
+next recorded exchange of the same request (re-encrypted with its current
+key), raising the recorded timeouts and errors, either at once or at the
+recorded pace. tools/replay.py drives a HysenCoordinator with it.
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+from broadlink import exceptions as broadlink_exceptions
+from hysen import Hysen2PipeFanCoilDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+CAPTURE_SUFFIX = ".hcap"
+
+OUTCOME_OK = 0
+OUTCOME_TIMEOUT = 1
+OUTCOME_ERROR = 2
+
+_MAGIC = b"HYCAP"
+_VERSION = 1
+_FILE_HEADER = struct.Struct("<5sB6s")
+_RECORD_HEADER = struct.Struct("<dfHBHH")
+_PACKET_HEADER_SIZE = 0x38
+
+
+class HysenCaptureLog:
+    """Rotating capture file of one device.
+
+    Written from the executor threads that run the device I/O; a lock keeps
+    records whole. Write errors disable the capture instead of failing the
+    device request.
+    """
+
+    def __init__(self, directory: str, mac: bytes, max_bytes: int, backup_count: int) -> None:
+        """Initialise the log; the file is opened on the first record.
+
+        Args:
+            directory: Directory of the capture files; created if missing.
+            mac: MAC address of the device, as bytes.
+            max_bytes: Size at which the file is rotated.
+            backup_count: Rotated files kept.
+        """
+        self.path = os.path.join(directory, mac.hex() + CAPTURE_SUFFIX)
+        self._directory = directory
+        self._mac = mac
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._lock = threading.Lock()
+        self._handle = None
+        self._failed = False
+
+    def attach(self, device) -> None:
+        """Record every packet the device sends from now on."""
+        send_packet = device.send_packet
+
+        def _send_packet(packet_type: int, payload: bytes) -> bytes:
+            timestamp = time.time()
+            start = time.monotonic()
+            try:
+                response = send_packet(packet_type, payload)
+            except broadlink_exceptions.NetworkTimeoutError:
+                self.write(timestamp, time.monotonic() - start, packet_type, OUTCOME_TIMEOUT, payload, b"")
+                raise
+            except Exception as exc:
+                self.write(timestamp, time.monotonic() - start, packet_type, OUTCOME_ERROR, payload,
+                           str(exc).encode())
+                raise
+            latency = time.monotonic() - start
+            frame = bytes(response[:_PACKET_HEADER_SIZE]) + device.decrypt(response[_PACKET_HEADER_SIZE:])
+            self.write(timestamp, latency, packet_type, OUTCOME_OK, payload, frame)
+            return response
+
+        device.send_packet = _send_packet
+
+    def write(self, timestamp: float, latency: float, packet_type: int, outcome: int,
+              request: bytes, response: bytes) -> None:
+        """Append one exchange, rotating the file first if it is full."""
+        record = _RECORD_HEADER.pack(timestamp, latency, packet_type, outcome, len(request), len(response))
+        record += bytes(request) + response
+        with self._lock:
+            if self._failed:
+                return
+            try:
+                if self._handle is None:
+                    self._open()
+                elif self._handle.tell() + len(record) > self._max_bytes:
+                    self._rotate()
+                self._handle.write(record)
+                self._handle.flush()
+            except OSError as exc:
+                _LOGGER.error("Stopped capturing to %s: %s", self.path, exc)
+                self._failed = True
+                self._close()
+
+    def close(self) -> None:
+        """Close the file; blocking."""
+        with self._lock:
+            self._close()
+
+    def _open(self) -> None:
+        """Open the current file for appending, writing a header if new."""
+        os.makedirs(self._directory, exist_ok=True)
+        self._handle = open(self.path, "ab")
+        if self._handle.tell() == 0:
+            self._handle.write(_FILE_HEADER.pack(_MAGIC, _VERSION, self._mac))
+        _LOGGER.info("Capturing device packets to %s", self.path)
+
+    def _rotate(self) -> None:
+        """Shift the rotated files up by one and start a new current file."""
+        self._close()
+        for index in range(self._backup_count, 0, -1):
+            source = f"{self.path}.{index - 1}" if index > 1 else self.path
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index}")
+        if not self._backup_count:
+            os.remove(self.path)
+        self._open()
+
+    def _close(self) -> None:
+        """Close the current file if open; the caller holds the lock."""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def capture_files(path: str) -> list:
+    """Return a capture file and its rotated files, oldest first."""
+    files = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        files.insert(0, f"{path}.{index}")
+        index += 1
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_capture(path: str):
+    """Yield the records of one capture file.
+
+    Each record is a (timestamp, latency, packet_type, outcome, request,
+    response) tuple. A record cut short by a crash ends the file.
+
+    Raises:
+        ValueError: If the file is not a capture file.
+    """
+    with open(path, "rb") as handle:
+        header = handle.read(_FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size:
+            raise ValueError(f"{path} is not a capture file")
+        magic, version, _mac = _FILE_HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} capture file")
+        while True:
+            record_header = handle.read(_RECORD_HEADER.size)
+            if len(record_header) < _RECORD_HEADER.size:
+                return
+            timestamp, latency, packet_type, outcome, request_len, response_len = (
+                _RECORD_HEADER.unpack(record_header)
+            )
+            body = handle.read(request_len + response_len)
+            if len(body) < request_len + response_len:
+                return
+            yield timestamp, latency, packet_type, outcome, body[:request_len], body[request_len:]
+
+
+class HysenReplayDevice(Hysen2PipeFanCoilDevice):
+    """A Hysen2PipeFanCoilDevice answering from recorded exchanges.
+
+    Each request is answered by the next recorded exchange with the same
+    packet type and payload. Recorded exchanges in between (typically the
+    writes of commands, which the replay does not issue again; their effect
+    is in the recorded reads that follow) are skipped and counted. Once no
+    recorded exchange matches, exhausted is set and EOFError raised.
+    """
+
+    def __init__(self, records: list, realtime: bool = False) -> None:
+        """Initialise the device.
+
+        Args:
+            records: Records from read_capture, in order.
+            realtime: Answer at the recorded pace: wait for the recorded
+                time of every exchange (relative to the first one), then
+                for its recorded latency.
+        """
+        super().__init__(host=("0.0.0.0", 80), mac=bytes(6), timeout=1, sync_clock=False, sync_hour=0)
+        self.records = records
+        self.position = 0
+        self.replayed = 0
+        self.skipped = 0
+        self.exhausted = False
+        self._realtime = realtime
+        self._started = None
+        # A trace taken mid-session starts without an authentication.
+        self._authenticated = bool(records) and records[0][2] != 0x65
+
+    def send_packet(self, packet_type: int, payload: bytes) -> bytes:
+        """Return the next matching recorded response, or raise its recorded error."""
+        payload = bytes(payload)
+        for index in range(self.position, len(self.records)):
+            timestamp, latency, recorded_type, outcome, request, response = self.records[index]
+            if recorded_type == packet_type and request == payload:
+                break
+        else:
+            self.exhausted = True
+            raise EOFError("End of the capture")
+        self.skipped += index - self.position
+        self.position = index + 1
+        self.replayed += 1
+        if self._realtime:
+            if self._started is None:
+                self._started = time.monotonic() - (timestamp - self.records[0][0])
+            time.sleep(max(0.0, self._started + timestamp - self.records[0][0] - time.monotonic()))
+            time.sleep(latency)
+        if outcome == OUTCOME_TIMEOUT:
+            raise broadlink_exceptions.NetworkTimeoutError(-4000, "Network timeout", "Replayed timeout")
+        if outcome != OUTCOME_OK:
+            raise OSError(response.decode(errors="replace"))
+        return response[:_PACKET_HEADER_SIZE] + self.encrypt(response[_PACKET_HEADER_SIZE:])
@@ -10,12 +10,16 @@ fan coil unit. Supported features vary by device state:
 
 Available HVAC and fan modes shown in the UI are dynamic and computed by the
 coordinator to prevent invalid combinations (e.g. FAN_ONLY with auto fan speed).
+
+build_state_commands turns a combined target (mode, fan, setpoint, preset)
+into the minimal ordered list of device writes; it backs the composite
+hysen2pfc.set_state service so that a scene costs one command cycle per unit.
 """
 
 import logging
 import voluptuous as vol
 import homeassistant.helpers.config_validation as cv
-from homeassistant.exceptions import ServiceValidationError
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import entity_platform
 from homeassistant.components.climate import ClimateEntity, ClimateEntityFeature
@@ -29,6 +33,8 @@ from .const import (
     DATA_KEY_POWER_STATE,
     DATA_KEY_HVAC_MODE,
     DATA_KEY_HVAC_MODES,
+    DATA_KEY_OPERATION_MODE,
+    DATA_KEY_KEY_LOCK,
     DATA_KEY_FAN_MODE,
     DATA_KEY_FAN_MODES,
     DATA_KEY_HVAC_ACTION,
@@ -54,6 +60,9 @@ from .const import (
     ATTR_HEATING_MAX_TEMP,
     ATTR_HEATING_MIN_TEMP,
     ATTR_VALVE_STATE,
+    ATTR_PENDING_COMMANDS,
+    ATTR_DATA_AGE,
+    ATTR_CACHED,
     SERVICE_TURN_ON,
     SERVICE_TURN_OFF,
     HVAC_MODES,
@@ -71,6 +80,7 @@ from .const import (
     PRESET_HASS_TO_HYSEN,
 )
 from .entity import HysenEntity
+from .settings import lock_power_args
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -86,6 +96,153 @@ async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entitie
     platform.async_register_entity_service(SERVICE_TURN_OFF, {}, "async_turn_off")
 
 
+def build_state_commands(coordinator, hvac_mode=None, fan_mode=None, temperature=None, preset_mode=None) -> list:
+    """Validate a combined target state and return the device writes for it.
+
+    Fields left as None keep their current value. The target is checked as
+    a whole, so e.g. switching to fan_only and to a manual fan speed in the
+    same call is accepted even though either change alone would be refused
+    while the fan is on auto.
+
+    Writes are ordered so that each one is valid on the device at the time
+    it is sent: mode and fan speed first (one combined write), then power
+    on, then the setpoint (checked by the device against the new mode's
+    limits), then the weekly preset. Power off is always sent last. Fields
+    that already match the coordinator data are not written.
+
+    Args:
+        coordinator: The HysenCoordinator of the target device.
+        hvac_mode: Target HVAC mode, including off.
+        fan_mode: Target fan mode.
+        temperature: Target temperature in °C.
+        preset_mode: Target weekly schedule preset.
+
+    Returns:
+        List of (func, args) tuples for coordinator.async_send_commands;
+        empty if the device already is in the requested state.
+
+    Raises:
+        ServiceValidationError: If a value is unknown, the combined target
+            violates one of the device rules, or the coordinator data does
+            not hold the device state yet.
+    """
+    device = coordinator.device
+    data = coordinator.data
+
+    if hvac_mode is not None and hvac_mode not in HVAC_MODES:
+        raise ServiceValidationError(
+            f"Invalid HVAC mode: {hvac_mode}. Valid modes are: {HVAC_MODES}.",
+            translation_domain=DOMAIN,
+            translation_key="invalid_hvac_mode",
+            translation_placeholders={"hvac_mode": str(hvac_mode), "valid_modes": ", ".join(HVAC_MODES)},
+        )
+    if fan_mode is not None and fan_mode not in FAN_MODES:
+        raise ServiceValidationError(
+            f"Invalid fan mode: {fan_mode}. Valid fan modes are: {FAN_MODES}.",
+            translation_domain=DOMAIN,
+            translation_key="invalid_fan_mode",
+            translation_placeholders={"fan_mode": str(fan_mode), "valid_modes": ", ".join(FAN_MODES)},
+        )
+    if preset_mode is not None and preset_mode not in PRESET_MODES:
+        raise ServiceValidationError(
+            f"Invalid preset mode: {preset_mode}. Valid modes are: {PRESET_MODES}.",
+            translation_domain=DOMAIN,
+            translation_key="invalid_preset_mode",
+            translation_placeholders={"preset_mode": str(preset_mode), "valid_modes": ", ".join(PRESET_MODES)},
+        )
+
+    # Current state, from the coordinator data only: until its first live
+    # poll the library device holds defaults (fan_only, unlocked, on), and
+    # after a warm restart commands run before that poll.
+    current_power = data.get(DATA_KEY_POWER_STATE)
+    current_operation = data.get(DATA_KEY_OPERATION_MODE)
+    if current_operation is None and data.get(DATA_KEY_HVAC_MODE) != HVACMode.OFF:
+        # Snapshot saved before the operation mode was part of the data.
+        current_operation = data.get(DATA_KEY_HVAC_MODE)
+    current_fan = data.get(DATA_KEY_FAN_MODE)
+    current_key_lock = data.get(DATA_KEY_KEY_LOCK)
+    if None in (current_power, current_operation, current_fan, current_key_lock):
+        raise ServiceValidationError(
+            "The state of the device is not known yet. Try again after the next poll.",
+            translation_domain=DOMAIN,
+            translation_key="device_state_unknown",
+        )
+
+    # Combined target, derived with the same rules as the coordinator.
+    if hvac_mode is None:
+        power, operation = current_power, current_operation
+    elif hvac_mode == HVACMode.OFF:
+        power, operation = STATE_OFF, current_operation
+    else:
+        power, operation = STATE_ON, hvac_mode
+    fan = fan_mode if fan_mode is not None else current_fan
+
+    if operation == HVACMode.FAN_ONLY and fan == FAN_AUTO:
+        if fan_mode == FAN_AUTO:
+            raise ServiceValidationError(
+                f"Fan mode {fan} is not allowed when HVAC mode is fan_only. "
+                "Set HVAC mode to off, heat, or cool first.",
+                translation_domain=DOMAIN,
+                translation_key="auto_fan_with_fan_only",
+                translation_placeholders={"fan_mode": str(fan)},
+            )
+        raise ServiceValidationError(
+            f"HVAC mode {operation} is not allowed when fan mode is auto. "
+            "Set fan mode to low, medium, or high first.",
+            translation_domain=DOMAIN,
+            translation_key="fan_only_with_auto_fan",
+            translation_placeholders={"hvac_mode": str(operation)},
+        )
+
+    if temperature is not None:
+        if operation == HVACMode.FAN_ONLY:
+            raise ServiceValidationError(
+                "Cannot set a target temperature in fan_only mode.",
+                translation_domain=DOMAIN,
+                translation_key="temperature_in_fan_only",
+            )
+        # Limits of the mode the device will be in, not the current one.
+        if operation == HVACMode.COOL:
+            min_temp = data.get(DATA_KEY_COOLING_MIN_TEMP)
+            max_temp = data.get(DATA_KEY_COOLING_MAX_TEMP)
+        else:
+            min_temp = data.get(DATA_KEY_HEATING_MIN_TEMP)
+            max_temp = data.get(DATA_KEY_HEATING_MAX_TEMP)
+        if min_temp is None or max_temp is None:
+            raise ServiceValidationError(
+                "Device temperature range is not set",
+                translation_domain=DOMAIN,
+                translation_key="missing_temperature_range",
+            )
+        temperature = int(round(temperature))
+        if temperature < min_temp or temperature > max_temp:
+            raise ServiceValidationError(
+                f"Temperature {temperature} is out of range. "
+                f"Valid range is {min_temp} to {max_temp}.",
+                translation_domain=DOMAIN,
+                translation_key="invalid_temperature",
+                translation_placeholders={
+                    "temperature": str(temperature),
+                    "min_temp": str(min_temp),
+                    "max_temp": str(max_temp),
+                },
+            )
+
+    commands = []
+    if operation != current_operation or fan != current_fan:
+        commands.append((device.set_mode_fan, (MODE_HASS_TO_HYSEN[operation], FAN_HASS_TO_HYSEN[fan])))
+    power_command = (device.set_lock_power, lock_power_args(current_key_lock, power))
+    if power == STATE_ON and current_power != STATE_ON:
+        commands.append(power_command)
+    if temperature is not None and temperature != data.get(DATA_KEY_TARGET_TEMP):
+        commands.append((device.set_target_temp, (temperature,)))
+    if preset_mode is not None and preset_mode != data.get(DATA_KEY_PRESET_MODE):
+        commands.append((device.set_weekly_schedule, (PRESET_HASS_TO_HYSEN[preset_mode],)))
+    if power == STATE_OFF and current_power != STATE_OFF:
+        commands.append(power_command)
+    return commands
+
+
 class HysenClimate(HysenEntity, ClimateEntity):
     """Representation of a Hysen 2 Pipe Fan Coil climate entity."""
 
@@ -228,19 +385,23 @@ class HysenClimate(HysenEntity, ClimateEntity):
             ATTR_COOLING_MIN_TEMP: self.coordinator.data.get(DATA_KEY_COOLING_MIN_TEMP),
             ATTR_HEATING_MAX_TEMP: self.coordinator.data.get(DATA_KEY_HEATING_MAX_TEMP),
             ATTR_HEATING_MIN_TEMP: self.coordinator.data.get(DATA_KEY_HEATING_MIN_TEMP),
+            ATTR_PENDING_COMMANDS: self.coordinator.command_queue.pending or None,
+            ATTR_DATA_AGE:         self.coordinator.data_age,
+            ATTR_CACHED:           self.coordinator.cached or None,
         }
         return {k: v for k, v in data.items() if v is not None}
 
     # ------------------------------------------------------------------
-    # Commands — each simply calls _async_try_command; the coordinator
-    # refresh triggered inside it propagates to all entities via their
-    # _handle_coordinator_update callback.
+    # Commands — each simply calls _async_try_command and returns its result,
+    # so that the hysen2pfc services can report writes that were rejected or
+    # queued; the coordinator refresh triggered inside it propagates to all
+    # entities via their _handle_coordinator_update callback.
     # ------------------------------------------------------------------
 
     async def async_turn_on(self):
         """Turn the entity on."""
         _LOGGER.debug("[%s] Turning on", self._host)
-        await self._async_try_command(
+        return await self._async_try_command(
             "Error in set_power",
             self.coordinator.device.set_power,
             POWER_STATE_HASS_TO_HYSEN[STATE_ON],
@@ -249,7 +410,7 @@ class HysenClimate(HysenEntity, ClimateEntity):
     async def async_turn_off(self):
         """Turn the entity off."""
         _LOGGER.debug("[%s] Turning off", self._host)
-        await self._async_try_command(
+        return await self._async_try_command(
             "Error in set_power",
             self.coordinator.device.set_power,
             POWER_STATE_HASS_TO_HYSEN[STATE_OFF],
@@ -282,7 +443,7 @@ class HysenClimate(HysenEntity, ClimateEntity):
             )
 
         _LOGGER.debug("[%s] Setting target temperature to %s", self._host, temperature)
-        await self._async_try_command(
+        return await self._async_try_command(
             "Error in set_target_temp",
             self.coordinator.device.set_target_temp,
             temperature,
@@ -311,7 +472,7 @@ class HysenClimate(HysenEntity, ClimateEntity):
 
         _LOGGER.debug("[%s] Setting HVAC mode to %s", self._host, hvac_mode)
         if hvac_mode == HVACMode.OFF:
-            await self._async_try_command(
+            return await self._async_try_command(
                 "Error in set_power",
                 self.coordinator.device.set_power,
                 POWER_STATE_HASS_TO_HYSEN[STATE_OFF],
@@ -319,13 +480,13 @@ class HysenClimate(HysenEntity, ClimateEntity):
         elif self._attr_power_state == STATE_OFF:
             # Device is off; the only available mode is the current one,
             # so turning power on is sufficient — no mode change needed.
-            await self._async_try_command(
+            return await self._async_try_command(
                 "Error in set_power",
                 self.coordinator.device.set_power,
                 POWER_STATE_HASS_TO_HYSEN[STATE_ON],
             )
         else:
-            await self._async_try_command(
+            return await self._async_try_command(
                 "Error in set_operation_mode",
                 self.coordinator.device.set_operation_mode,
                 MODE_HASS_TO_HYSEN[hvac_mode],
@@ -352,7 +513,7 @@ class HysenClimate(HysenEntity, ClimateEntity):
                 translation_key="invalid_fan_mode",
             )
         _LOGGER.debug("[%s] Setting fan mode to %s", self._host, fan_mode)
-        await self._async_try_command(
+        return await self._async_try_command(
             "Error in set_fan_mode",
             self.coordinator.device.set_fan_mode,
             FAN_HASS_TO_HYSEN[fan_mode],
@@ -370,8 +531,39 @@ class HysenClimate(HysenEntity, ClimateEntity):
                 translation_domain=DOMAIN,
                 translation_key="invalid_preset_mode",
             )
-        await self._async_try_command(
+        return await self._async_try_command(
             "Error in set_weekly_schedule",
             self.coordinator.device.set_weekly_schedule,
             PRESET_HASS_TO_HYSEN[preset_mode],
         )
+
+    async def async_set_state(self, hvac_mode=None, fan_mode=None, temperature=None, preset_mode=None):
+        """Apply mode, fan, setpoint and preset together.
+
+        The combined target is validated once and sent as one batch of
+        writes followed by a single coordinator refresh.
+
+        Raises:
+            ServiceValidationError: If the combined target is invalid.
+            HomeAssistantError: If the device rejects or misses a write.
+        """
+        commands = build_state_commands(
+            self.coordinator, hvac_mode, fan_mode, temperature, preset_mode
+        )
+        if not commands:
+            _LOGGER.debug("[%s] Already in the requested state", self._host)
+            return
+        _LOGGER.debug("[%s] Setting state with %d writes: %s", self._host, len(commands),
+                      [func.__name__ for func, _ in commands])
+        try:
+            await self.coordinator.async_send_commands(commands)
+        except Exception as exc:
+            _LOGGER.error("[%s] Error in set_state: %s", self._host, exc)
+            # Earlier writes of the batch may have been applied; resync.
+            await self.coordinator.async_request_refresh()
+            raise HomeAssistantError(
+                f"Failed to set state of {self.entity_id}: {exc}",
+                translation_domain=DOMAIN,
+                translation_key="command_failed",
+                translation_placeholders={"entity_id": self.entity_id, "error": str(exc)},
+            ) from exc
@@ -0,0 +1,200 @@
+"""
+Offline command queue for the Hysen 2 Pipe Fan Coil integration.
+
+When a device cannot be reached, a command sent from an entity is not
+dropped but parked in that device's HysenCommandQueue. The queue keeps only
+the intent that still matters: a newer command for the same setter replaces
+the older one (last write wins), and partial writes such as
+set_daily_schedule, where None means "leave unchanged", are merged field by
+field.
+
+The queue is drained by the coordinator after its next successful poll:
+every pending command is sent back to back in one I/O lane job, followed by
+a single refresh, so a fleet coming back after an outage does not replay a
+storm of individual retries.
+
+Pending commands of every device are persisted in one .storage file
+(HysenCommandQueueStore) so that they survive a Home Assistant restart.
+
+Only network failures are queued. A ValueError means that the device or
+the library rejected the command, which a retry would not fix.
+"""
+
+import logging
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from .const import (
+    STORAGE_VERSION,
+    STORAGE_KEY_COMMAND_QUEUE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Delay before pending changes are written to .storage; bursts of commands
+# queued during an outage are persisted in one write.
+_SAVE_DELAY = 10
+
+# Setters whose None arguments mean "leave this field unchanged"; queued
+# calls are merged argument by argument instead of replaced.
+_MERGED_COMMANDS = ("set_daily_schedule",)
+
+# Setters that must not be replayed late. The device clock would be set to
+# the time of the original request.
+_NOT_QUEUED_COMMANDS = ("set_time",)
+
+
+def merge_command_args(name: str, previous: tuple, args: tuple) -> tuple:
+    """Return the arguments of a command superseding a pending call.
+
+    Last write wins, except for setters in _MERGED_COMMANDS where the new
+    call only overrides the arguments it does not leave as None.
+    """
+    if name in _MERGED_COMMANDS:
+        return tuple(old if new is None else new for old, new in zip(previous, args))
+    return tuple(args)
+
+
+class HysenCommandQueueStore:
+    """Pending commands of every device, persisted in a single .storage file.
+
+    Stored in hass.data[DOMAIN][DATA_COMMAND_QUEUE_STORE] and loaded once in
+    async_setup. The data is a dict of MAC address -> list of
+    [command name, [args...]] pairs in send order.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialise the store; call async_load before use."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY_COMMAND_QUEUE)
+        self._devices: dict = {}
+
+    async def async_load(self) -> None:
+        """Load the pending commands saved by a previous run."""
+        data = await self._store.async_load()
+        self._devices = (data or {}).get("devices", {})
+        if self._devices:
+            _LOGGER.info("Restored pending commands for %d devices", len(self._devices))
+
+    def get(self, mac: str) -> list:
+        """Return the persisted [name, args] pairs of one device."""
+        return self._devices.get(mac, [])
+
+    @callback
+    def async_set(self, mac: str, commands: list) -> None:
+        """Replace the pending commands of one device and schedule a save."""
+        if commands:
+            self._devices[mac] = commands
+        else:
+            self._devices.pop(mac, None)
+        self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Return the data written to .storage."""
+        return {"devices": self._devices}
+
+
+class HysenCommandQueue:
+    """Compacted queue of commands waiting for one device to come back.
+
+    Commands are keyed by the name of the device setter they call, so each
+    setter appears at most once with its latest arguments; re-queuing a
+    setter moves it to the end to preserve the order of intents.
+    """
+
+    def __init__(self, coordinator, store: HysenCommandQueueStore, mac: str) -> None:
+        """Initialise the queue and restore persisted commands.
+
+        Args:
+            coordinator: The HysenCoordinator owning the device.
+            store: The shared HysenCommandQueueStore.
+            mac: MAC address of the device; key in the store.
+        """
+        self._coordinator = coordinator
+        self._store = store
+        self._mac = mac
+        self._pending: dict = {
+            name: tuple(args) for name, args in store.get(mac)
+            if hasattr(coordinator.device, name)
+        }
+        self._draining = False
+
+    def __len__(self) -> int:
+        """Return the number of pending commands."""
+        return len(self._pending)
+
+    @property
+    def pending(self) -> list:
+        """Return the names of the pending commands in send order."""
+        return list(self._pending)
+
+    @callback
+    def async_enqueue(self, func, args: tuple) -> bool:
+        """Queue a device command that could not be delivered.
+
+        Args:
+            func: Bound setter of coordinator.device (e.g. device.set_fan_mode).
+            args: Positional arguments of the call.
+
+        Returns:
+            True if the command was queued, False if it cannot be replayed.
+        """
+        name = getattr(func, "__name__", None)
+        if getattr(func, "__self__", None) is not self._coordinator.device or name in _NOT_QUEUED_COMMANDS:
+            return False
+        args = tuple(args)
+        previous = self._pending.pop(name, None)
+        if previous is not None:
+            args = merge_command_args(name, previous, args)
+        self._pending[name] = args
+        _LOGGER.debug("[%s] Queued %s%s (%d pending)", self._coordinator.host, name, args, len(self._pending))
+        self._async_save()
+        self._coordinator.async_update_listeners()
+        return True
+
+    async def async_drain(self) -> None:
+        """Send every pending command in one I/O lane job, then refresh.
+
+        Commands are removed once delivered or rejected by the device. If
+        the device drops off again, the undelivered remainder stays queued
+        for the next successful poll. A command re-queued while the drain
+        is running is kept as well.
+        """
+        if not self._pending or self._draining:
+            return
+        self._draining = True
+        batch = list(self._pending.items())
+        device = self._coordinator.device
+        host = self._coordinator.host
+
+        def _run_batch():
+            handled = []
+            for name, args in batch:
+                try:
+                    getattr(device, name)(*args)
+                except ValueError as exc:
+                    _LOGGER.error("[%s] Dropping queued %s: %s", host, name, exc)
+                except Exception as exc:
+                    _LOGGER.warning("[%s] Device unreachable while draining queue: %s", host, exc)
+                    break
+                handled.append((name, args))
+            return handled
+
+        try:
+            _LOGGER.info("[%s] Sending %d queued commands", host, len(batch))
+            handled = await self._coordinator.lane.async_command(_run_batch, cost=len(batch))
+        finally:
+            self._draining = False
+
+        for name, args in handled:
+            if self._pending.get(name) == args:
+                del self._pending[name]
+        self._async_save()
+        if handled:
+            await self._coordinator.async_settle_and_refresh()
+        else:
+            self._coordinator.async_update_listeners()
+
+    @callback
+    def _async_save(self) -> None:
+        """Persist the current queue."""
+        self._store.async_set(self._mac, [[name, list(args)] for name, args in self._pending.items()])
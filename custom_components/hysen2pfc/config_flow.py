@@ -21,7 +21,13 @@ and MAC directly from the discovery info, then jumps to the confirm step.
 Options flow
 ------------
 Hysen2pfcOptionsFlowHandler exposes timeout, poll interval (update_interval),
-clock sync enable (sync_clock) and sync hour (sync_hour). Saving options
+clock sync enable (sync_clock), sync hour (sync_hour) and the device write
+rate limit (write_rate writes per second, write_burst) and the stale data
+grace period (stale_grace) and whether the device is served by the local
+HTTP proxy (proxy, see proxy.py), whether its packets are recorded
+(capture, see capture.py), the event loop budget of one coordinator
+update (loop_budget in ms, 0 to turn the loop monitor off) and whether its
+commands are traced (trace, see tracing.py). Saving options
 triggers a full config entry reload so that the coordinator and device are
 recreated with the new settings.
 """
@@ -46,11 +52,25 @@ from .const import (
     CONF_SYNC_CLOCK,
     CONF_SYNC_HOUR,
     CONF_UPDATE_INTERVAL,
+    CONF_WRITE_RATE,
+    CONF_WRITE_BURST,
+    CONF_STALE_GRACE,
+    CONF_PROXY,
+    CONF_CAPTURE,
+    CONF_LOOP_BUDGET,
+    CONF_TRACE,
     DEFAULT_NAME,
     DEFAULT_TIMEOUT,
     DEFAULT_SYNC_CLOCK,
     DEFAULT_SYNC_HOUR,
     DEFAULT_UPDATE_INTERVAL,
+    DEFAULT_WRITE_RATE,
+    DEFAULT_WRITE_BURST,
+    DEFAULT_STALE_GRACE,
+    DEFAULT_PROXY,
+    DEFAULT_CAPTURE,
+    DEFAULT_LOOP_BUDGET,
+    DEFAULT_TRACE,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -331,5 +351,33 @@ class Hysen2pfcOptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_SYNC_HOUR,
                     default=opts.get(CONF_SYNC_HOUR, DEFAULT_SYNC_HOUR),
                 ): vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+                vol.Optional(
+                    CONF_WRITE_RATE,
+                    default=opts.get(CONF_WRITE_RATE, DEFAULT_WRITE_RATE),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=20)),
+                vol.Optional(
+                    CONF_WRITE_BURST,
+                    default=opts.get(CONF_WRITE_BURST, DEFAULT_WRITE_BURST),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=50)),
+                vol.Optional(
+                    CONF_STALE_GRACE,
+                    default=opts.get(CONF_STALE_GRACE, DEFAULT_STALE_GRACE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                vol.Optional(
+                    CONF_PROXY,
+                    default=opts.get(CONF_PROXY, DEFAULT_PROXY),
+                ): bool,
+                vol.Optional(
+                    CONF_CAPTURE,
+                    default=opts.get(CONF_CAPTURE, DEFAULT_CAPTURE),
+                ): bool,
+                vol.Optional(
+                    CONF_LOOP_BUDGET,
+                    default=opts.get(CONF_LOOP_BUDGET, DEFAULT_LOOP_BUDGET),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1000)),
+                vol.Optional(
+                    CONF_TRACE,
+                    default=opts.get(CONF_TRACE, DEFAULT_TRACE),
+                ): bool,
             }),
         )
@@ -76,6 +76,55 @@ from homeassistant.components.climate.const import (
 
 DOMAIN = "hysen2pfc"
 
+# hass.data[DOMAIN] keys of integration-wide objects. Every other key in
+# hass.data[DOMAIN] is a config entry ID.
+DATA_ENTITY_INDEX = "entity_index"          # entity_id/unique_id -> (coordinator, entity)
+DATA_COMMAND_QUEUE_STORE = "command_queue"  # HysenCommandQueueStore (.storage)
+DATA_RECONCILER = "reconciler"              # HysenReconciler (.storage)
+DATA_PROFILE_STORE = "profiles"             # HysenProfileStore (.storage)
+DATA_FLEET_LIMITER = "fleet_limiter"        # Semaphore shared by fleet service writes
+DATA_SNAPSHOT_STORE = "snapshots"           # HysenSnapshotStore (.storage)
+DATA_FLEET_METRICS = "fleet_metrics"        # HysenFleetMetrics of every loaded device
+DATA_PROFILER = "profiler"                  # HysenProfiler of the running profile service call
+DATA_MEMORY_TRACE = "memory_trace"          # True while a trace_memory service call runs
+
+# .storage files (config/.storage/<key>)
+STORAGE_VERSION = 1
+STORAGE_KEY_COMMAND_QUEUE = f"{DOMAIN}.command_queue"
+STORAGE_KEY_DESIRED_SETTINGS = f"{DOMAIN}.desired_settings"
+STORAGE_KEY_PROFILES = f"{DOMAIN}.profiles"
+STORAGE_KEY_SNAPSHOTS = f"{DOMAIN}.snapshots"
+
+# Packet captures (config/hysen2pfc/captures/<mac>.hcap, see capture.py)
+CAPTURE_DIR = "captures"
+CAPTURE_MAX_BYTES = 1024 * 1024   # Size of one capture file before it is rotated
+CAPTURE_BACKUP_COUNT = 4          # Rotated files kept per device (5 MiB in all)
+
+# Command traces (config/hysen2pfc/traces/<mac>.json, see tracing.py)
+TRACE_DIR = "traces"
+TRACE_MAX_BYTES = 1024 * 1024     # Size of one trace file before it is rotated
+TRACE_BACKUP_COUNT = 4            # Rotated files kept per device (5 MiB in all)
+
+# Profiles written by the profile and trace_memory services
+# (config/hysen2pfc/profiling/, see profiler.py and memory.py)
+PROFILE_DIR = "profiling"
+PROFILE_MODE_SAMPLING = "sampling"
+PROFILE_MODE_CPROFILE = "cprofile"
+PROFILE_MODES = [PROFILE_MODE_SAMPLING, PROFILE_MODE_CPROFILE]
+PROFILE_SAMPLE_INTERVAL = 0.005  # Seconds between two samples of the sampling profiler
+DEFAULT_PROFILE_DURATION = 30    # Seconds
+MAX_PROFILE_DURATION = 600
+DEFAULT_PROFILE_TOP = 20         # Functions returned in the service response
+MAX_PROFILE_TOP = 100
+MEMORY_TRACE_FRAMES = 25         # Frames kept per allocation by trace_memory
+
+# Settings backups (config/hysen2pfc/backups/<file>.json)
+BACKUP_DIR = "backups"
+BACKUP_VERSION = 1
+
+# Events fired on the HA event bus
+EVENT_RECONCILED = f"{DOMAIN}_reconciled"
+
 # HA platform types this integration registers
 PLATFORMS = [
     Platform.BINARY_SENSOR,
@@ -95,6 +144,13 @@ PLATFORMS = [
 CONF_SYNC_CLOCK = "sync_clock"       # Whether to auto-sync device clock
 CONF_SYNC_HOUR = "sync_hour"         # Hour of day at which clock is synced
 CONF_UPDATE_INTERVAL = "update_interval"  # Coordinator poll interval (seconds)
+CONF_WRITE_RATE = "write_rate"       # Sustained device writes per second (0 = unlimited)
+CONF_WRITE_BURST = "write_burst"     # Device writes allowed back to back
+CONF_STALE_GRACE = "stale_grace"     # Seconds the last good data is served after failed polls
+CONF_PROXY = "proxy"                 # Serve the device's state and commands through the HTTP proxy
+CONF_CAPTURE = "capture"             # Record the device's request/response frames (capture.py)
+CONF_LOOP_BUDGET = "loop_budget"     # Event loop ms allowed per coordinator update (0 = not monitored)
+CONF_TRACE = "trace"                 # Trace the device's commands to a file (tracing.py)
 
 # ---------------------------------------------------------------------------
 # Default values
@@ -105,12 +161,22 @@ DEFAULT_TIMEOUT = 10          # UDP socket timeout in seconds
 DEFAULT_SYNC_CLOCK = False
 DEFAULT_SYNC_HOUR = 4         # Sync at 04:00 by default to avoid peak hours
 DEFAULT_UPDATE_INTERVAL = 30  # Poll device every 30 seconds
+DEFAULT_WRITE_RATE = 0.0      # Off; opt in from the options flow
+DEFAULT_WRITE_BURST = 5       # Only used once a write rate is set
+DEFAULT_STALE_GRACE = 0       # Off; opt in from the options flow
+DEFAULT_PROXY = False
+DEFAULT_CAPTURE = False
+DEFAULT_LOOP_BUDGET = 0
+DEFAULT_TRACE = False
 DEFAULT_CURRENT_TEMP = 22
 DEFAULT_TARGET_TEMP = 22
 DEFAULT_TARGET_TEMP_STEP = 1
 DEFAULT_MIN_TEMP = 10
 DEFAULT_MAX_TEMP = 40
 DEFAULT_CALIBRATION = 0
+DEFAULT_FLEET_CONCURRENCY = 10  # Devices written in parallel by fleet services
+MAX_FLEET_CONCURRENCY = 50
+GLOBAL_FLEET_CONCURRENCY = 20  # Devices written in parallel by all fleet services together
 
 # ---------------------------------------------------------------------------
 # Coordinator data keys
@@ -123,6 +189,7 @@ DATA_KEY_VALVE_STATE = "valve_state"
 DATA_KEY_POWER_STATE = "power_state"
 DATA_KEY_HVAC_MODE = "hvac_mode"
 DATA_KEY_HVAC_MODES = "hvac_modes"      # Dynamic list shown in climate UI
+DATA_KEY_OPERATION_MODE = "operation_mode"  # Mode kept by the device while off
 DATA_KEY_FAN_MODE = "fan_mode"
 DATA_KEY_FAN_MODES = "fan_modes"        # Dynamic list shown in climate UI
 DATA_KEY_HVAC_ACTION = "hvac_action"
@@ -223,6 +290,15 @@ ATTR_SLOT2_STOP_ENABLE = "slot2_stop_enable"
 ATTR_SLOT2_STOP_TIME = "slot2_stop_time"
 ATTR_TIME_VALVE_ON = "time_valve_on"
 ATTR_VALVE_STATE = "valve_state"
+ATTR_MAX_CONCURRENCY = "max_concurrency"  # Fleet service fan-out limit
+ATTR_PENDING_COMMANDS = "pending_commands"  # Commands queued while the device is offline
+ATTR_FILE = "file"  # Settings backup file name
+ATTR_PROFILE = "profile"  # Settings profile name
+ATTR_DURATION = "duration"  # Profile service duration (s)
+ATTR_MODE = "mode"  # Profile service profiler
+ATTR_TOP = "top"  # Profile service functions returned
+ATTR_DATA_AGE = "data_age"  # Seconds since the last good poll, while stale data is served
+ATTR_CACHED = "cached"  # True while the data comes from the restart snapshot
 
 # ---------------------------------------------------------------------------
 # Service names (must match services.yaml keys)
@@ -237,6 +313,7 @@ SERVICE_SET_HYSTERESIS = "set_hysteresis"
 SERVICE_SET_CALIBRATION = "set_calibration"
 SERVICE_SET_MAX_TEMP = "set_max_temp"
 SERVICE_SET_MIN_TEMP = "set_min_temp"
+SERVICE_SET_LIMITS = "set_limits"
 SERVICE_SET_TIME = "set_time"
 SERVICE_SET_FAN_MODE = "set_fan_mode"
 SERVICE_SET_PRESET_MODE = "set_preset_mode"
@@ -250,6 +327,18 @@ SERVICE_SET_SLOT2_STOP_ENABLE = "set_slot2_stop_enable"
 SERVICE_SET_SLOT2_STOP_TIME = "set_slot2_stop_time"
 SERVICE_SET_FAN_CONTROL = "set_fan_control"
 SERVICE_SET_FROST_PROTECTION = "set_frost_protection"
+SERVICE_APPLY_SCHEDULE = "apply_schedule"
+SERVICE_SET_STATE = "set_state"
+SERVICE_SET_DESIRED_SETTINGS = "set_desired_settings"
+SERVICE_CLEAR_DESIRED_SETTINGS = "clear_desired_settings"
+SERVICE_EXPORT_SETTINGS = "export_settings"
+SERVICE_RESTORE_SETTINGS = "restore_settings"
+SERVICE_SAVE_PROFILE = "save_profile"
+SERVICE_DELETE_PROFILE = "delete_profile"
+SERVICE_APPLY_PROFILE = "apply_profile"
+SERVICE_PROFILE = "profile"
+SERVICE_MEMORY_USAGE = "memory_usage"
+SERVICE_TRACE_MEMORY = "trace_memory"
 
 # ---------------------------------------------------------------------------
 # Bidirectional value mappings between Hysen library constants and HA strings
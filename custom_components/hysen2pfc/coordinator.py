@@ -5,21 +5,49 @@ The coordinator is the single point of contact with the physical device.
 All platform entities share one coordinator instance per device and receive
 state updates through HA's listener mechanism rather than by polling the
 device individually.
+
+Each coordinator also owns the device's HysenCommandQueue (see
+command_queue.py), which is drained after every successful poll, and its
+HysenIOLane (see lane.py), through which every blocking call to the device
+is made so that polls and writes never overlap.
+
+Stale-while-revalidate: when a poll fails after all retries, the last good
+data keeps being served for the stale_grace period (an options flow
+setting) instead of raising UpdateFailed, so a single lost UDP exchange
+does not flip every entity of the device to unavailable and back. While
+stale, coordinator.stale is True and entities carry a data_age attribute;
+code that must only act on fresh data (reconciler, fleet verification,
+backups) checks coordinator.online instead of last_update_success.
+
+Warm restarts: a coordinator can start from the snapshot saved by the
+previous run (see snapshots.py) instead of a blocking first poll. Until the
+first live poll lands, coordinator.cached is True and the snapshot is served
+like stale data, with the grace period counted from the restore.
+
+Metrics: coordinator.metrics (see metrics.py) times every poll and command
+(queue wait, time on the wire, decoding, translation) and counts retries
+and failures for the diagnostic sensors. With a loop_budget set,
+coordinator.loop_monitor also times the listener fan-out of every update
+on the event loop.
 """
 
 import asyncio
 import logging
+import time
 from datetime import timedelta
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 from .const import (
     DOMAIN,
+    CONF_MAC,
     DATA_KEY_FWVERSION,
     DATA_KEY_KEY_LOCK,
     DATA_KEY_VALVE_STATE,
     DATA_KEY_POWER_STATE,
     DATA_KEY_HVAC_MODE,
     DATA_KEY_HVAC_MODES,
+    DATA_KEY_OPERATION_MODE,
     DATA_KEY_FAN_MODE,
     DATA_KEY_FAN_MODES,
     DATA_KEY_HVAC_ACTION,
@@ -72,6 +100,10 @@ from .const import (
     FAN_CONTROL_HYSEN_TO_HASS,
     FROST_PROTECTION_HYSEN_TO_HASS,
 )
+from .command_queue import HysenCommandQueue
+from .lane import HysenIOLane
+from .metrics import HysenLoopMonitor, HysenMetrics
+from .tracing import command_span, current_trace, span
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -80,6 +112,130 @@ _RETRY_COUNT = 2
 # Base delay between retries in seconds; multiplied by (attempt + 1) for
 # simple exponential backoff: 0.5 s, 1.0 s.
 _RETRY_DELAY = 0.5
+# Time given to the device firmware to apply a change before polling again;
+# enforced by the I/O lane.
+_COMMAND_SETTLE_DELAY = 0.2
+
+
+def translate_status(device) -> dict:
+    """Translate the raw status of a polled device into coordinator data.
+
+    Maps all raw Hysen values to HA-compatible types and derives the state
+    that depends on several of them (HVAC mode list, HVAC action, active
+    temperature limits). Pure and free of I/O, so it can be measured in
+    isolation (see tools/microbench.py).
+
+    Args:
+        device: A Hysen2PipeFanCoilDevice after get_device_status, or any
+            object with the same attributes.
+
+    Returns:
+        A dict keyed by DATA_KEY_* constants containing the current device
+        state ready for consumption by entity properties.
+    """
+    _power_state = POWER_STATE_HYSEN_TO_HASS.get(device.power_state)
+    _operation_mode = MODE_HYSEN_TO_HASS.get(device.operation_mode)
+    _valve_state = VALVE_STATE_HYSEN_TO_HASS.get(device.valve_state)
+
+    # Derive hvac_mode: when the device is off the mode is HVACMode.OFF
+    # regardless of the underlying operation mode stored in the device.
+    if _power_state == STATE_OFF:
+        _hvac_mode = HVACMode.OFF
+    else:
+        _hvac_mode = _operation_mode
+
+    _fan_mode = FAN_HYSEN_TO_HASS.get(device.fan_mode)
+
+    # Build the list of selectable HVAC modes for the climate card.
+    # When the device is off, only the current operation mode is
+    # shown so the user "turns on in the current mode" — this is
+    # intentional UX to avoid inadvertently switching modes.
+    if _power_state == STATE_OFF:
+        if _operation_mode == HVACMode.COOL:
+            _hvac_modes = HVAC_MODES_COOL
+        elif _operation_mode == HVACMode.HEAT:
+            _hvac_modes = HVAC_MODES_HEAT
+        else:
+            _hvac_modes = HVAC_MODES_FAN_ONLY
+    else:
+        if _operation_mode == HVACMode.FAN_ONLY:
+            # All modes available in fan-only; no temperature target.
+            _hvac_modes = HVAC_MODES
+        elif _fan_mode == FAN_AUTO:
+            # FAN_ONLY is incompatible with auto fan — exclude it.
+            _hvac_modes = HVAC_MODES_NO_FAN
+        else:
+            _hvac_modes = HVAC_MODES
+
+    # Fan-only mode does not support the auto fan speed.
+    if _operation_mode == HVACMode.FAN_ONLY:
+        _fan_modes = FAN_MODES_MANUAL
+    else:
+        _fan_modes = FAN_MODES
+
+    # Derive the HVAC action (what the device is actually doing now).
+    if _power_state == STATE_OFF:
+        _hvac_action = HVACAction.OFF
+    else:
+        _hvac_action = HVACAction.IDLE
+        if _hvac_mode == HVACMode.HEAT and _valve_state == STATE_OPEN:
+            _hvac_action = HVACAction.HEATING
+        elif _hvac_mode == HVACMode.COOL and _valve_state == STATE_OPEN:
+            _hvac_action = HVACAction.COOLING
+        elif _hvac_mode == HVACMode.FAN_ONLY:
+            _hvac_action = HVACAction.FAN
+
+    # Temperature limits depend on the active mode.
+    _cooling_min_temp = device.cooling_min_temp
+    _cooling_max_temp = device.cooling_max_temp
+    _heating_min_temp = device.heating_min_temp
+    _heating_max_temp = device.heating_max_temp
+    if _hvac_mode == HVACMode.COOL:
+        _min_temp = _cooling_min_temp
+        _max_temp = _cooling_max_temp
+    else:
+        _min_temp = _heating_min_temp
+        _max_temp = _heating_max_temp
+
+    return {
+        DATA_KEY_FWVERSION: device.fwversion,
+        DATA_KEY_KEY_LOCK: KEY_LOCK_HYSEN_TO_HASS.get(device.key_lock_type),
+        DATA_KEY_VALVE_STATE: _valve_state,
+        DATA_KEY_POWER_STATE: _power_state,
+        DATA_KEY_HVAC_MODE: _hvac_mode,
+        DATA_KEY_HVAC_MODES: _hvac_modes,
+        DATA_KEY_OPERATION_MODE: _operation_mode,
+        DATA_KEY_FAN_MODE: _fan_mode,
+        DATA_KEY_FAN_MODES: _fan_modes,
+        DATA_KEY_HVAC_ACTION: _hvac_action,
+        DATA_KEY_PRESET_MODE: PRESET_HYSEN_TO_HASS.get(device.schedule),
+        DATA_KEY_CURRENT_TEMP: device.room_temp,
+        DATA_KEY_TARGET_TEMP: device.target_temp,
+        DATA_KEY_HYSTERESIS: HYSTERESIS_HYSEN_TO_HASS.get(device.hysteresis),
+        DATA_KEY_CALIBRATION: device.calibration,
+        DATA_KEY_MIN_TEMP: _min_temp,
+        DATA_KEY_MAX_TEMP: _max_temp,
+        DATA_KEY_COOLING_MIN_TEMP: _cooling_min_temp,
+        DATA_KEY_COOLING_MAX_TEMP: _cooling_max_temp,
+        DATA_KEY_HEATING_MIN_TEMP: _heating_min_temp,
+        DATA_KEY_HEATING_MAX_TEMP: _heating_max_temp,
+        DATA_KEY_FAN_CONTROL: FAN_CONTROL_HYSEN_TO_HASS.get(device.fan_control),
+        DATA_KEY_FROST_PROTECTION: FROST_PROTECTION_HYSEN_TO_HASS.get(device.frost_protection),
+        DATA_KEY_CLOCK_HOUR: device.clock_hour,
+        DATA_KEY_CLOCK_MINUTE: device.clock_minute,
+        DATA_KEY_CLOCK_SECOND: device.clock_second,
+        DATA_KEY_CLOCK_WEEKDAY: device.clock_weekday,
+        # Slot enable values are stored as booleans (True/False).
+        DATA_KEY_SLOT1_START_ENABLE: SLOT_ENABLED_HYSEN_TO_HASS.get(device.period1_start_enabled),
+        DATA_KEY_SLOT1_START_TIME: f"{device.period1_start_hour}:{device.period1_start_min:02d}",
+        DATA_KEY_SLOT1_STOP_ENABLE: SLOT_ENABLED_HYSEN_TO_HASS.get(device.period1_end_enabled),
+        DATA_KEY_SLOT1_STOP_TIME: f"{device.period1_end_hour}:{device.period1_end_min:02d}",
+        DATA_KEY_SLOT2_START_ENABLE: SLOT_ENABLED_HYSEN_TO_HASS.get(device.period2_start_enabled),
+        DATA_KEY_SLOT2_START_TIME: f"{device.period2_start_hour}:{device.period2_start_min:02d}",
+        DATA_KEY_SLOT2_STOP_ENABLE: SLOT_ENABLED_HYSEN_TO_HASS.get(device.period2_end_enabled),
+        DATA_KEY_SLOT2_STOP_TIME: f"{device.period2_end_hour}:{device.period2_end_min:02d}",
+        DATA_KEY_TIME_VALVE_ON: device.time_valve_on,
+    }
 
 
 class HysenCoordinator(DataUpdateCoordinator):
@@ -90,8 +246,12 @@ class HysenCoordinator(DataUpdateCoordinator):
     the currently applicable HVAC mode list, HVAC action) is computed here
     so that entity classes remain thin.
 
-    Transient network errors are retried up to _RETRY_COUNT times before
-    raising UpdateFailed, which marks all entities as unavailable.
+    Transient network errors are retried up to _RETRY_COUNT times. If all
+    attempts fail within stale_grace seconds of the last successful poll
+    (or of the snapshot restore), the previous data is kept and marked
+    stale, so entities stay available with their last values. Once the
+    window is over, or when stale_grace is 0, UpdateFailed is raised and
+    all entities become unavailable.
     """
 
     def __init__(
@@ -101,6 +261,11 @@ class HysenCoordinator(DataUpdateCoordinator):
         host: str,
         config_entry,
         update_interval: int = 30,
+        command_queue_store=None,
+        write_rate: float = 0.0,
+        write_burst: int = 1,
+        stale_grace: int = 0,
+        loop_budget: int = 0,
     ) -> None:
         """Initialise the coordinator.
 
@@ -111,6 +276,15 @@ class HysenCoordinator(DataUpdateCoordinator):
             config_entry: The ConfigEntry this coordinator belongs to; stored
                 by DataUpdateCoordinator as self.config_entry.
             update_interval: Polling interval in seconds (default 30).
+            command_queue_store: The shared HysenCommandQueueStore holding
+                commands queued while the device was unreachable.
+            write_rate: Sustained device writes per second allowed by the
+                I/O lane's token bucket; 0 disables the limit.
+            write_burst: Device writes allowed back to back.
+            stale_grace: Seconds after the last successful poll during which
+                failed polls keep serving the last data; 0 disables it.
+            loop_budget: Event loop milliseconds allowed for the listener
+                fan-out of one update; 0 disables the loop monitor.
         """
         super().__init__(
             hass,
@@ -121,13 +295,71 @@ class HysenCoordinator(DataUpdateCoordinator):
         )
         self.device = device
         self.host = host
+        self.metrics = HysenMetrics()
+        self.metrics.attach(device)
+        self.lane = HysenIOLane(hass, host, _COMMAND_SETTLE_DELAY, write_rate, write_burst, self.metrics)
+        self.loop_monitor = HysenLoopMonitor(host, loop_budget) if loop_budget else None
+        # HysenTracer, set by async_setup_entry when the trace option is on.
+        self.tracer = None
+        self.command_queue = HysenCommandQueue(self, command_queue_store, config_entry.data[CONF_MAC])
+        self.stale = False
+        self.cached = False
+        self.last_success = None
+        self._restored_at = None
+        self._stale_grace = stale_grace
+
+    @property
+    def online(self) -> bool:
+        """Return True if the data comes from a successful last poll."""
+        return self.last_update_success and not self.stale and not self.cached
+
+    @property
+    def data_age(self) -> int | None:
+        """Return the seconds since the last successful poll while stale or cached, else None."""
+        if not (self.stale or self.cached) or self.last_success is None:
+            return None
+        return int((dt_util.utcnow() - self.last_success).total_seconds())
+
+    def async_restore_snapshot(self, snapshot: dict) -> None:
+        """Start from a snapshot of the previous run instead of a first poll.
+
+        Args:
+            snapshot: {"updated": ISO timestamp, "data": coordinator data}
+                from HysenSnapshotStore.
+        """
+        self.data = snapshot["data"]
+        self.last_success = dt_util.parse_datetime(snapshot["updated"])
+        self._restored_at = dt_util.utcnow()
+        self.cached = True
+        _LOGGER.info("Restored %s from the snapshot of %s", self.host, snapshot["updated"])
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all listeners, timing the fan-out for the loop monitor and the current trace."""
+        trace = current_trace()
+        if self.loop_monitor is None and trace is None:
+            super().async_update_listeners()
+            return
+        if self.loop_monitor is not None:
+            self.loop_monitor.start_batch()
+        start = time.monotonic()
+        try:
+            super().async_update_listeners()
+        finally:
+            end = time.monotonic()
+            if self.loop_monitor is not None:
+                self.loop_monitor.end_batch(end - start, len(self._listeners))
+            if trace is not None:
+                trace.add("listener_fanout", start, end, listeners=len(self._listeners))
 
     async def _async_update_data(self) -> dict:
         """Fetch and translate the full device status.
 
         Runs the blocking get_device_status call in the executor and maps
         all raw Hysen values to HA-compatible types. Retries up to
-        _RETRY_COUNT times on failure before raising UpdateFailed.
+        _RETRY_COUNT times on failure; then the previous data is returned
+        (marked stale) if the last success is within the grace period,
+        otherwise UpdateFailed is raised.
 
         Returns:
             A dict keyed by DATA_KEY_* constants containing the current
@@ -135,125 +367,43 @@ class HysenCoordinator(DataUpdateCoordinator):
 
         Raises:
             UpdateFailed: If communication with the device fails on all
-                attempts, marking all entities as unavailable.
+                attempts and the grace period is over, marking all entities
+                as unavailable.
         """
         _LOGGER.debug("Fetching data for device at %s", self.host)
         last_exc: Exception | None = None
 
         for attempt in range(_RETRY_COUNT + 1):
             try:
-                # get_device_status is blocking (UDP socket I/O) so it must
-                # run in a thread pool executor to avoid stalling the event loop.
-                await self.hass.async_add_executor_job(self.device.get_device_status)
-
-                _power_state = POWER_STATE_HYSEN_TO_HASS.get(self.device.power_state)
-                _operation_mode = MODE_HYSEN_TO_HASS.get(self.device.operation_mode)
-                _valve_state = VALVE_STATE_HYSEN_TO_HASS.get(self.device.valve_state)
-
-                # Derive hvac_mode: when the device is off the mode is HVACMode.OFF
-                # regardless of the underlying operation mode stored in the device.
-                if _power_state == STATE_OFF:
-                    _hvac_mode = HVACMode.OFF
-                else:
-                    _hvac_mode = _operation_mode
-
-                _fan_mode = FAN_HYSEN_TO_HASS.get(self.device.fan_mode)
-
-                # Build the list of selectable HVAC modes for the climate card.
-                # When the device is off, only the current operation mode is
-                # shown so the user "turns on in the current mode" — this is
-                # intentional UX to avoid inadvertently switching modes.
-                if _power_state == STATE_OFF:
-                    if _operation_mode == HVACMode.COOL:
-                        _hvac_modes = HVAC_MODES_COOL
-                    elif _operation_mode == HVACMode.HEAT:
-                        _hvac_modes = HVAC_MODES_HEAT
-                    else:
-                        _hvac_modes = HVAC_MODES_FAN_ONLY
-                else:
-                    if _operation_mode == HVACMode.FAN_ONLY:
-                        # All modes available in fan-only; no temperature target.
-                        _hvac_modes = HVAC_MODES
-                    elif _fan_mode == FAN_AUTO:
-                        # FAN_ONLY is incompatible with auto fan — exclude it.
-                        _hvac_modes = HVAC_MODES_NO_FAN
-                    else:
-                        _hvac_modes = HVAC_MODES
-
-                # Fan-only mode does not support the auto fan speed.
-                if _operation_mode == HVACMode.FAN_ONLY:
-                    _fan_modes = FAN_MODES_MANUAL
-                else:
-                    _fan_modes = FAN_MODES
+                # get_device_status is blocking (UDP socket I/O); the lane runs
+                # it in the executor, after any queued command, and merges it
+                # with a poll that is already waiting.
+                await self.lane.async_poll(self.device.get_device_status)
 
-                # Derive the HVAC action (what the device is actually doing now).
-                if _power_state == STATE_OFF:
-                    _hvac_action = HVACAction.OFF
-                else:
-                    _hvac_action = HVACAction.IDLE
-                    if _hvac_mode == HVACMode.HEAT and _valve_state == STATE_OPEN:
-                        _hvac_action = HVACAction.HEATING
-                    elif _hvac_mode == HVACMode.COOL and _valve_state == STATE_OPEN:
-                        _hvac_action = HVACAction.COOLING
-                    elif _hvac_mode == HVACMode.FAN_ONLY:
-                        _hvac_action = HVACAction.FAN
-
-                # Temperature limits depend on the active mode.
-                _cooling_min_temp = self.device.cooling_min_temp
-                _cooling_max_temp = self.device.cooling_max_temp
-                _heating_min_temp = self.device.heating_min_temp
-                _heating_max_temp = self.device.heating_max_temp
-                if _hvac_mode == HVACMode.COOL:
-                    _min_temp = _cooling_min_temp
-                    _max_temp = _cooling_max_temp
-                else:
-                    _min_temp = _heating_min_temp
-                    _max_temp = _heating_max_temp
-
-                data = {
-                    DATA_KEY_FWVERSION: self.device.fwversion,
-                    DATA_KEY_KEY_LOCK: KEY_LOCK_HYSEN_TO_HASS.get(self.device.key_lock_type),
-                    DATA_KEY_VALVE_STATE: _valve_state,
-                    DATA_KEY_POWER_STATE: _power_state,
-                    DATA_KEY_HVAC_MODE: _hvac_mode,
-                    DATA_KEY_HVAC_MODES: _hvac_modes,
-                    DATA_KEY_FAN_MODE: _fan_mode,
-                    DATA_KEY_FAN_MODES: _fan_modes,
-                    DATA_KEY_HVAC_ACTION: _hvac_action,
-                    DATA_KEY_PRESET_MODE: PRESET_HYSEN_TO_HASS.get(self.device.schedule),
-                    DATA_KEY_CURRENT_TEMP: self.device.room_temp,
-                    DATA_KEY_TARGET_TEMP: self.device.target_temp,
-                    DATA_KEY_HYSTERESIS: HYSTERESIS_HYSEN_TO_HASS.get(self.device.hysteresis),
-                    DATA_KEY_CALIBRATION: self.device.calibration,
-                    DATA_KEY_MIN_TEMP: _min_temp,
-                    DATA_KEY_MAX_TEMP: _max_temp,
-                    DATA_KEY_COOLING_MIN_TEMP: _cooling_min_temp,
-                    DATA_KEY_COOLING_MAX_TEMP: _cooling_max_temp,
-                    DATA_KEY_HEATING_MIN_TEMP: _heating_min_temp,
-                    DATA_KEY_HEATING_MAX_TEMP: _heating_max_temp,
-                    DATA_KEY_FAN_CONTROL: FAN_CONTROL_HYSEN_TO_HASS.get(self.device.fan_control),
-                    DATA_KEY_FROST_PROTECTION: FROST_PROTECTION_HYSEN_TO_HASS.get(self.device.frost_protection),
-                    DATA_KEY_CLOCK_HOUR: self.device.clock_hour,
-                    DATA_KEY_CLOCK_MINUTE: self.device.clock_minute,
-                    DATA_KEY_CLOCK_SECOND: self.device.clock_second,
-                    DATA_KEY_CLOCK_WEEKDAY: self.device.clock_weekday,
-                    # Slot enable values are stored as booleans (True/False).
-                    DATA_KEY_SLOT1_START_ENABLE: SLOT_ENABLED_HYSEN_TO_HASS.get(self.device.period1_start_enabled),
-                    DATA_KEY_SLOT1_START_TIME: f"{self.device.period1_start_hour}:{self.device.period1_start_min:02d}",
-                    DATA_KEY_SLOT1_STOP_ENABLE: SLOT_ENABLED_HYSEN_TO_HASS.get(self.device.period1_end_enabled),
-                    DATA_KEY_SLOT1_STOP_TIME: f"{self.device.period1_end_hour}:{self.device.period1_end_min:02d}",
-                    DATA_KEY_SLOT2_START_ENABLE: SLOT_ENABLED_HYSEN_TO_HASS.get(self.device.period2_start_enabled),
-                    DATA_KEY_SLOT2_START_TIME: f"{self.device.period2_start_hour}:{self.device.period2_start_min:02d}",
-                    DATA_KEY_SLOT2_STOP_ENABLE: SLOT_ENABLED_HYSEN_TO_HASS.get(self.device.period2_end_enabled),
-                    DATA_KEY_SLOT2_STOP_TIME: f"{self.device.period2_end_hour}:{self.device.period2_end_min:02d}",
-                    DATA_KEY_TIME_VALVE_ON: self.device.time_valve_on,
-                }
+                translate_start = time.monotonic()
+                data = translate_status(self.device)
+                self.metrics.record("translate", time.monotonic() - translate_start)
+                self.metrics.count("polls")
                 _LOGGER.debug("Updated coordinator data for %s: %s", self.host, data)
+                if self.stale:
+                    _LOGGER.info("Device %s is reachable again", self.host)
+                self.stale = False
+                self.cached = False
+                self.last_success = dt_util.utcnow()
+                if self.command_queue:
+                    # The device is reachable again: deliver what was queued
+                    # while it was not, once this update has been published.
+                    self.config_entry.async_create_background_task(
+                        self.hass,
+                        self.command_queue.async_drain(),
+                        f"{DOMAIN}_{self.host}_drain_command_queue",
+                    )
                 return data
 
             except Exception as exc:
                 last_exc = exc
                 if attempt < _RETRY_COUNT:
+                    self.metrics.record_error("poll_retries", exc)
                     delay = _RETRY_DELAY * (attempt + 1)
                     _LOGGER.warning(
                         "Failed to fetch data for %s (attempt %d/%d): %s — retrying in %.1fs",
@@ -261,9 +411,74 @@ class HysenCoordinator(DataUpdateCoordinator):
                     )
                     await asyncio.sleep(delay)
                 else:
+                    self.metrics.record_error("poll_failures", exc)
                     _LOGGER.error(
                         "Failed to update device data for %s after %d attempts: %s",
                         self.host, _RETRY_COUNT + 1, exc,
                     )
 
+        if self.data is not None and self.last_success is not None:
+            # Cached data has no live poll yet; its grace starts at the restore.
+            since = self._restored_at if self.cached else self.last_success
+            age = (dt_util.utcnow() - since).total_seconds()
+            if age < self._stale_grace:
+                if not self.stale:
+                    _LOGGER.warning("Serving the last data of %s for up to %ds while it is unreachable",
+                                    self.host, self._stale_grace)
+                self.stale = True
+                return self.data
+
         raise UpdateFailed(f"Error communicating with device: {last_exc}") from last_exc
+
+    async def async_send_command(self, func, *args) -> None:
+        """Execute a single blocking device command and refresh state.
+
+        Convenience wrapper around async_send_commands for the common
+        one-write case.
+
+        Args:
+            func: Blocking callable (e.g. device.set_fan_mode).
+            *args: Positional arguments forwarded to func.
+
+        Raises:
+            Exception: Whatever func raises; the caller decides how to report it.
+        """
+        await self.async_send_commands([(func, args)])
+
+    async def async_send_commands(self, commands: list) -> None:
+        """Execute a batch of blocking device commands and refresh once.
+
+        All commands run back to back as a single job of the I/O lane, ahead
+        of any queued poll, so that a multi-write change costs one thread
+        hand-off, one settle delay and one coordinator refresh instead of
+        one of each per write. The lane's write rate limit may hold the
+        batch back; a single write may then be compacted with a newer write
+        to the same setter. With the trace option on, the batch and its
+        refresh are traced (tracing.py).
+
+        Args:
+            commands: List of (func, args) tuples executed in order.
+
+        Raises:
+            Exception: The first exception raised by a command; commands
+                after it are not executed.
+        """
+        if not commands:
+            return
+        with command_span(self.tracer):
+            try:
+                await self.lane.async_commands(commands)
+            except Exception as exc:
+                self.metrics.record_error("command_failures", exc)
+                raise
+            self.metrics.count("commands")
+            with span("refresh_poll"):
+                await self.async_settle_and_refresh()
+
+    async def async_settle_and_refresh(self) -> None:
+        """Refresh immediately after a batch of writes to the device."""
+        # The lane holds the poll back for _COMMAND_SETTLE_DELAY so that the
+        # firmware can apply the change, merging it with a poll already
+        # queued. async_refresh is immediate (not debounced), ensuring all
+        # entities update in the same event loop cycle.
+        await self.async_refresh()
@@ -0,0 +1,161 @@
+"""
+Diagnostics for the Hysen 2 Pipe Fan Coil integration.
+
+One download (config entry or device; an entry has exactly one device)
+holds what is needed to triage a slow or flaky device without debug
+logging:
+
+- entry         Config entry data and options (host and MAC redacted).
+- settings      Effective poll interval, socket timeout, retries, settle
+                delay, write rate limit, stale grace, clock sync and the
+                capture, loop monitor and trace options.
+- state         Whether the data is live, stale or cached, the time of the
+                last successful poll and the age of the data.
+- data          The current coordinator data.
+- snapshot      Time of the snapshot saved for warm restarts (snapshots.py).
+- desired       Settings the reconciler keeps on the device (reconciler.py).
+- retries       Poll/command counters and the last error class; there is no
+                circuit breaker, the equivalent protection being the stale
+                grace period and the offline command queue listed here.
+- lane          I/O lane depth and statistics (lane.py).
+- timings       Poll and command histograms (metrics.py).
+- loop          Event loop time of coordinator updates, if the loop monitor
+                is on.
+- entity_writes Writes requested by each entity.
+- frames        The last exchanges with the device, oldest first. Responses
+                are decrypted here, on demand; authentication frames (which
+                carry the session key) are redacted, as are the MAC address
+                and device ID in the packet headers.
+"""
+
+from homeassistant.components.diagnostics import REDACTED, async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.device_registry import DeviceEntry
+from homeassistant.util import dt as dt_util
+from .const import (
+    DOMAIN,
+    DATA_SNAPSHOT_STORE,
+    DATA_RECONCILER,
+    CONF_HOST,
+    CONF_MAC,
+    CONF_STALE_GRACE,
+    CONF_SYNC_CLOCK,
+    CONF_SYNC_HOUR,
+    CONF_WRITE_BURST,
+    CONF_WRITE_RATE,
+    CONF_PROXY,
+    CONF_CAPTURE,
+    CONF_LOOP_BUDGET,
+    CONF_TRACE,
+    DEFAULT_STALE_GRACE,
+    DEFAULT_SYNC_CLOCK,
+    DEFAULT_SYNC_HOUR,
+    DEFAULT_WRITE_BURST,
+    DEFAULT_WRITE_RATE,
+    DEFAULT_PROXY,
+    DEFAULT_CAPTURE,
+    DEFAULT_LOOP_BUDGET,
+    DEFAULT_TRACE,
+)
+from .coordinator import _COMMAND_SETTLE_DELAY, _RETRY_COUNT, _RETRY_DELAY
+
+TO_REDACT = {CONF_HOST, CONF_MAC, "unique_id"}
+
+_AUTH_PACKET = 0x65
+_PACKET_HEADER_SIZE = 0x38
+# MAC address and device ID in the packet header.
+_HEADER_REDACTED = slice(0x2A, 0x34)
+
+
+def _frame(frame: tuple) -> dict:
+    """Return one recorded exchange as a redacted dict."""
+    sent, packet_type, latency, request, response, cipher, error = frame
+    result = {
+        "sent": dt_util.utc_from_timestamp(sent).isoformat(),
+        "packet_type": f"0x{packet_type:02x}",
+        "latency_ms": round(latency * 1000, 1),
+        "error": error,
+    }
+    if packet_type == _AUTH_PACKET:
+        result["request"] = REDACTED
+        result["response"] = REDACTED if response is not None else None
+        return result
+    result["request"] = request.hex(" ")
+    if response is None:
+        result["response"] = None
+        return result
+    header = bytearray(response[:_PACKET_HEADER_SIZE])
+    header[_HEADER_REDACTED] = bytes(_HEADER_REDACTED.stop - _HEADER_REDACTED.start)
+    decryptor = cipher.decryptor()
+    payload = decryptor.update(bytes(response[_PACKET_HEADER_SIZE:])) + decryptor.finalize()
+    result["response_header"] = header.hex(" ")
+    result["response"] = payload.hex(" ")
+    return result
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return diagnostics for a config entry."""
+    device_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    diagnostics = {
+        "entry": {
+            "title": entry.title,
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+    }
+    if device_data is None:
+        diagnostics["loaded"] = False
+        return diagnostics
+
+    coordinator = device_data["coordinator"]
+    metrics = coordinator.metrics
+    options = entry.options
+    snapshot = hass.data[DOMAIN][DATA_SNAPSHOT_STORE].get(device_data["mac"])
+    diagnostics.update({
+        "loaded": True,
+        "settings": {
+            "update_interval": coordinator.update_interval.total_seconds() if coordinator.update_interval else None,
+            "timeout": device_data["timeout"],
+            "retry_count": _RETRY_COUNT,
+            "retry_delay": _RETRY_DELAY,
+            "command_settle_delay": _COMMAND_SETTLE_DELAY,
+            "write_rate": options.get(CONF_WRITE_RATE, DEFAULT_WRITE_RATE),
+            "write_burst": options.get(CONF_WRITE_BURST, DEFAULT_WRITE_BURST),
+            "stale_grace": options.get(CONF_STALE_GRACE, DEFAULT_STALE_GRACE),
+            "sync_clock": options.get(CONF_SYNC_CLOCK, DEFAULT_SYNC_CLOCK),
+            "sync_hour": options.get(CONF_SYNC_HOUR, DEFAULT_SYNC_HOUR),
+            "proxy": options.get(CONF_PROXY, DEFAULT_PROXY),
+            "capture": options.get(CONF_CAPTURE, DEFAULT_CAPTURE),
+            "loop_budget": options.get(CONF_LOOP_BUDGET, DEFAULT_LOOP_BUDGET),
+            "trace": options.get(CONF_TRACE, DEFAULT_TRACE),
+        },
+        "state": {
+            "online": coordinator.online,
+            "last_update_success": coordinator.last_update_success,
+            "stale": coordinator.stale,
+            "cached": coordinator.cached,
+            "last_success": coordinator.last_success.isoformat() if coordinator.last_success else None,
+            "data_age": coordinator.data_age,
+        },
+        "data": coordinator.data,
+        "snapshot": {"updated": snapshot["updated"]} if snapshot else None,
+        "desired": hass.data[DOMAIN][DATA_RECONCILER].get_desired(device_data["mac"]),
+        "retries": {
+            **metrics.counters,
+            "last_error": metrics.last_error,
+            "last_error_at": metrics.last_error_at.isoformat() if metrics.last_error_at else None,
+            "pending_commands": coordinator.command_queue.pending,
+        },
+        "lane": {"depth": coordinator.lane.depth, **coordinator.lane.stats},
+        "timings": {name: histogram.summary() for name, histogram in metrics.histograms.items()},
+        "loop": coordinator.loop_monitor.summary() if coordinator.loop_monitor else None,
+        "entity_writes": dict(metrics.entity_writes),
+        "frames": [_frame(frame) for frame in list(metrics.frames)],
+    })
+    return diagnostics
+
+
+async def async_get_device_diagnostics(hass: HomeAssistant, entry: ConfigEntry, device: DeviceEntry) -> dict:
+    """Return diagnostics for a device; the same as its config entry."""
+    return await async_get_config_entry_diagnostics(hass, entry)
@@ -4,24 +4,74 @@ Base entity class for the Hysen 2 Pipe Fan Coil integration.
 All platform entities (climate, switch, sensor, etc.) inherit from
 HysenEntity, which wires them up to the shared HysenCoordinator and
 provides the common _async_try_command helper for sending device commands.
+
+HysenEntityIndex maps every live entity of this integration, by entity_id
+and by unique_id, to its (coordinator, entity) pair so that service
+handlers can validate against the coordinator snapshot and call entity
+methods directly instead of going through the state machine.
 """
 
-import asyncio
 import logging
+import time
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC
 from homeassistant.core import callback
-from .const import DOMAIN
+from .const import DOMAIN, DATA_ENTITY_INDEX, DATA_RECONCILER, ATTR_DATA_AGE, ATTR_CACHED
+from .tracing import current_trace
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class HysenEntityIndex:
+    """Index of live Hysen entities keyed by entity_id and unique_id.
+
+    Stored in hass.data[DOMAIN][DATA_ENTITY_INDEX]. Entities add themselves
+    when they are added to hass and remove themselves before removal, so a
+    lookup never returns an entity that is no longer registered (renaming
+    an entity_id removes and re-adds the entity).
+    """
+
+    def __init__(self) -> None:
+        """Initialise empty lookup tables."""
+        self._by_entity_id: dict = {}
+        self._by_unique_id: dict = {}
+
+    @callback
+    def async_add(self, entity) -> None:
+        """Index an entity that has just been added to hass."""
+        ref = (entity.coordinator, entity)
+        self._by_entity_id[entity.entity_id] = ref
+        self._by_unique_id[entity.unique_id] = ref
+
+    @callback
+    def async_remove(self, entity) -> None:
+        """Drop an entity that is about to be removed from hass."""
+        if self._by_entity_id.get(entity.entity_id, (None, None))[1] is entity:
+            del self._by_entity_id[entity.entity_id]
+        if self._by_unique_id.get(entity.unique_id, (None, None))[1] is entity:
+            del self._by_unique_id[entity.unique_id]
+
+    def get(self, entity_id_or_unique_id: str):
+        """Return (coordinator, entity) for an entity_id or unique_id, or None."""
+        ref = self._by_entity_id.get(entity_id_or_unique_id)
+        if ref is None:
+            ref = self._by_unique_id.get(entity_id_or_unique_id)
+        return ref
+
+    def entities(self) -> list:
+        """Return every indexed (coordinator, entity) pair."""
+        return list(self._by_entity_id.values())
+
+
 class HysenEntity(CoordinatorEntity):
     """Base class for all Hysen 2 Pipe Fan Coil entities.
 
     Inheriting from CoordinatorEntity provides:
     - Automatic subscription/unsubscription to coordinator updates.
-    - available property tied to coordinator.last_update_success.
+    - available property tied to coordinator.last_update_success, which
+      stays True while the coordinator serves stale data within its grace
+      period; the data_age attribute is then added to every entity (and
+      cached: true while the data comes from the restart snapshot).
     - should_poll = False (updates are push-based via the coordinator).
     - _handle_coordinator_update callback invoked on every coordinator refresh.
 
@@ -60,13 +110,57 @@ class HysenEntity(CoordinatorEntity):
             "configuration_url": f"http://{self._host}",
         }
 
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """Return the age of the data while the coordinator serves stale or cached data."""
+        data_age = self.coordinator.data_age
+        if data_age is None:
+            return None
+        if self.coordinator.cached:
+            return {ATTR_DATA_AGE: data_age, ATTR_CACHED: True}
+        return {ATTR_DATA_AGE: data_age}
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Write the state, timed for the loop monitor and the current trace."""
+        monitor = self.coordinator.loop_monitor
+        trace = current_trace()
+        if monitor is None and trace is None:
+            super().async_write_ha_state()
+            return
+        start = time.monotonic()
+        super().async_write_ha_state()
+        end = time.monotonic()
+        if monitor is not None:
+            monitor.record_write(self.entity_id, end - start)
+        if trace is not None:
+            trace.add("state_write", start, end, entity_id=self.entity_id)
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the coordinator and add the entity to the index."""
+        await super().async_added_to_hass()
+        self.hass.data[DOMAIN][DATA_ENTITY_INDEX].async_add(self)
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Remove the entity from the index before it leaves hass."""
+        self.hass.data[DOMAIN][DATA_ENTITY_INDEX].async_remove(self)
+        await super().async_will_remove_from_hass()
+
     async def _async_try_command(self, error_msg: str, func, *args) -> bool:
         """Execute a blocking device command in the executor and refresh state.
 
-        Runs the provided callable in a thread pool executor (to avoid
-        blocking the event loop), waits 200 ms for the device to stabilise,
-        then triggers an immediate coordinator refresh so that all entities
-        reflect the new state.
+        Runs the provided callable through the coordinator's I/O lane (in a
+        thread pool executor, ahead of queued polls), then triggers a
+        coordinator refresh, held back 200 ms for the device to stabilise,
+        so that all entities reflect the new state.
+
+        If the device cannot be reached, the command is parked in the
+        coordinator's command queue and delivered after the next successful
+        poll. Commands rejected by the device (ValueError) are not queued.
+
+        A successful write of a configuration setting updates the device's
+        desired configuration if it already holds that setting (see
+        reconciler.py).
 
         Args:
             error_msg: Message logged at ERROR level if the command fails.
@@ -76,14 +170,18 @@ class HysenEntity(CoordinatorEntity):
         Returns:
             True if the command succeeded, False otherwise.
         """
+        self.coordinator.metrics.count_write(self.entity_id)
         try:
-            await self.hass.async_add_executor_job(func, *args)
-            # Allow the device firmware to apply the change before polling.
-            await asyncio.sleep(0.2)
-            # async_refresh is immediate (not debounced), ensuring all
-            # entities update in the same event loop cycle.
-            await self.coordinator.async_refresh()
+            await self.coordinator.async_send_command(func, *args)
+            self.hass.data[DOMAIN][DATA_RECONCILER].async_update_from_command(self._mac, func, args)
             return True
-        except Exception as exc:
+        except ValueError as exc:
             _LOGGER.error("[%s] %s: %s", self._host, error_msg, exc)
             return False
+        except Exception as exc:
+            if self.coordinator.command_queue.async_enqueue(func, args):
+                _LOGGER.warning("[%s] %s: %s; queued until the device is reachable",
+                                self._host, error_msg, exc)
+            else:
+                _LOGGER.error("[%s] %s: %s", self._host, error_msg, exc)
+            return False
@@ -0,0 +1,357 @@
+"""
+Fleet-wide operations for the Hysen 2 Pipe Fan Coil integration.
+
+The services in this module act on many physical devices at once. Targets
+are resolved from the standard HA target selector (entity, device, area or
+label) to one entry per physical device, and the device writes are fanned
+out concurrently up to a per-call limit. A building-wide change therefore
+takes roughly as long as the slowest device instead of the sum of all of
+them.
+
+Every fleet service reports a per-device result through SupportsResponse so
+that a rollout can be verified from the same automation that started it.
+"""
+
+import asyncio
+import logging
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+from .const import (
+    DOMAIN,
+    DATA_ENTITY_INDEX,
+    DATA_RECONCILER,
+    DATA_FLEET_LIMITER,
+    DEFAULT_FLEET_CONCURRENCY,
+    DATA_KEY_PRESET_MODE,
+    DATA_KEY_SLOT1_START_ENABLE,
+    DATA_KEY_SLOT1_START_TIME,
+    DATA_KEY_SLOT1_STOP_ENABLE,
+    DATA_KEY_SLOT1_STOP_TIME,
+    DATA_KEY_SLOT2_START_ENABLE,
+    DATA_KEY_SLOT2_START_TIME,
+    DATA_KEY_SLOT2_STOP_ENABLE,
+    DATA_KEY_SLOT2_STOP_TIME,
+    ATTR_PRESET_MODE,
+    ATTR_MAX_CONCURRENCY,
+    ATTR_SLOT1_START_ENABLE,
+    ATTR_SLOT1_START_TIME,
+    ATTR_SLOT1_STOP_ENABLE,
+    ATTR_SLOT1_STOP_TIME,
+    ATTR_SLOT2_START_ENABLE,
+    ATTR_SLOT2_START_TIME,
+    ATTR_SLOT2_STOP_ENABLE,
+    ATTR_SLOT2_STOP_TIME,
+    PRESET_MODES,
+    PRESET_HASS_TO_HYSEN,
+    SLOT_ENABLED_HASS_TO_HYSEN,
+)
+from .settings import settings_commands, settings_differences, validate_limits
+
+_LOGGER = logging.getLogger(__name__)
+
+# Per-device outcome reported in the service response.
+RESULT_UPDATED = "updated"
+RESULT_UNCHANGED = "unchanged"
+RESULT_FAILED = "failed"
+
+# The four schedule edges in the argument order of device.set_daily_schedule:
+# (enable service field, time service field, enable data key, time data key).
+SCHEDULE_EDGES = (
+    (ATTR_SLOT1_START_ENABLE, ATTR_SLOT1_START_TIME, DATA_KEY_SLOT1_START_ENABLE, DATA_KEY_SLOT1_START_TIME),
+    (ATTR_SLOT1_STOP_ENABLE, ATTR_SLOT1_STOP_TIME, DATA_KEY_SLOT1_STOP_ENABLE, DATA_KEY_SLOT1_STOP_TIME),
+    (ATTR_SLOT2_START_ENABLE, ATTR_SLOT2_START_TIME, DATA_KEY_SLOT2_START_ENABLE, DATA_KEY_SLOT2_START_TIME),
+    (ATTR_SLOT2_STOP_ENABLE, ATTR_SLOT2_STOP_TIME, DATA_KEY_SLOT2_STOP_ENABLE, DATA_KEY_SLOT2_STOP_TIME),
+)
+
+# Every service field that makes up a schedule definition.
+SCHEDULE_FIELDS = (ATTR_PRESET_MODE,) + tuple(
+    field for enable_attr, time_attr, _, _ in SCHEDULE_EDGES for field in (enable_attr, time_attr)
+)
+
+# Fields of a (partial) schedule definition, shared by the services and the
+# backup parser.
+SCHEDULE_SCHEMA = {
+    vol.Optional(ATTR_PRESET_MODE): vol.In(PRESET_MODES),
+    vol.Optional(ATTR_SLOT1_START_ENABLE): cv.boolean,
+    vol.Optional(ATTR_SLOT1_START_TIME): cv.time,
+    vol.Optional(ATTR_SLOT1_STOP_ENABLE): cv.boolean,
+    vol.Optional(ATTR_SLOT1_STOP_TIME): cv.time,
+    vol.Optional(ATTR_SLOT2_START_ENABLE): cv.boolean,
+    vol.Optional(ATTR_SLOT2_START_TIME): cv.time,
+    vol.Optional(ATTR_SLOT2_STOP_ENABLE): cv.boolean,
+    vol.Optional(ATTR_SLOT2_STOP_TIME): cv.time,
+}
+
+
+# ---------------------------------------------------------------------------
+# Target resolution, concurrent fan-out and batched configuration writes
+# ---------------------------------------------------------------------------
+
+def async_resolve_devices(hass: HomeAssistant, service_call: ServiceCall) -> list:
+    """Resolve the targets of a service call to one device_data dict per device.
+
+    Accepts any combination of entity_id, device_id, area_id and label_id.
+    Every referenced entity is looked up in the shared HysenEntityIndex and
+    mapped to its coordinator's config entry, so a device targeted through
+    several of its entities (e.g. by area) is only written once. Entities of
+    other integrations and of unloaded entries are not indexed and are
+    ignored.
+
+    Args:
+        hass: The Home Assistant instance.
+        service_call: The service call carrying the target.
+
+    Returns:
+        List of device_data dicts from hass.data[DOMAIN], one per loaded device.
+    """
+    selected = async_extract_referenced_entity_ids(hass, service_call)
+    index = hass.data[DOMAIN][DATA_ENTITY_INDEX]
+    devices = {}
+    for entity_id in selected.referenced | selected.indirectly_referenced:
+        ref = index.get(entity_id)
+        if ref is None:
+            continue
+        entry_id = ref[0].config_entry.entry_id
+        device_data = hass.data[DOMAIN].get(entry_id)
+        if device_data is None:
+            _LOGGER.debug("Skipping %s: config entry is not loaded", entity_id)
+            continue
+        devices.setdefault(entry_id, device_data)
+    return list(devices.values())
+
+
+def async_require_devices(hass: HomeAssistant, service_call: ServiceCall) -> list:
+    """Resolve the targets of a fleet service call, rejecting a call with none.
+
+    Raises:
+        ServiceValidationError: If no loaded Hysen device is targeted.
+    """
+    devices = async_resolve_devices(hass, service_call)
+    if not devices:
+        _LOGGER.error("No valid entity IDs provided")
+        raise ServiceValidationError(
+            "No valid entity IDs provided",
+            translation_domain=DOMAIN,
+            translation_key="no_valid_entity_ids",
+        )
+    return devices
+
+
+async def async_fan_out(items, func, max_concurrency: int = DEFAULT_FLEET_CONCURRENCY, limiter=None) -> list:
+    """Await func(item) for every item with at most max_concurrency in flight.
+
+    Exceptions do not cancel the remaining calls; they are returned in place
+    of the result so that callers can report partial failures.
+
+    Args:
+        items: Iterable of arguments, one call per item.
+        func: Coroutine function taking a single item.
+        max_concurrency: Upper bound on simultaneously running calls.
+        limiter: Optional semaphore shared with other callers (the
+            integration-wide DATA_FLEET_LIMITER); each call holds it as well,
+            so concurrent service calls together stay under its bound.
+
+    Returns:
+        List of results or exception instances, in the order of items.
+    """
+    semaphore = asyncio.BoundedSemaphore(max_concurrency)
+
+    async def _run(item):
+        async with semaphore:
+            if limiter is None:
+                return await func(item)
+            async with limiter:
+                return await func(item)
+
+    return await asyncio.gather(*(_run(item) for item in items), return_exceptions=True)
+
+
+async def async_apply_configuration(
+    hass: HomeAssistant,
+    devices: list,
+    settings: dict,
+    schedule: dict,
+    max_concurrency: int,
+    service: str,
+) -> dict:
+    """Bring every device in line with the given settings and schedule.
+
+    Devices whose coordinator data already matches are skipped without any
+    device I/O. The others receive only the fields that differ, as a single
+    batch of writes (see settings_commands and schedule_commands) followed
+    by one refresh, which is then compared with the definition again so
+    that each result carries a 'verified' flag. Device writes of all fleet
+    services share the integration-wide DATA_FLEET_LIMITER.
+
+    The settings become the desired settings of every device (see
+    reconciler.py), so that the reconciler keeps rather than reverts them.
+    Every device is validated before anything is recorded or written, as
+    in set_desired_settings: settings that would invert a min/max limit
+    pair of one device (combined with its recorded settings and current
+    limits) reject the whole call, rather than failing that device and
+    leaving the reconciler to retry an impossible configuration.
+
+    Args:
+        hass: The Home Assistant instance.
+        devices: device_data dicts, e.g. from async_require_devices.
+        settings: Wanted settings keyed by setting name (may be empty).
+        schedule: Wanted schedule fields restricted to SCHEDULE_FIELDS
+            (may be empty).
+        max_concurrency: Upper bound on devices written at the same time
+            by this call.
+        service: Service name used in log messages.
+
+    Returns:
+        Dict with a per-device 'devices' list and a 'summary' of counts,
+        where 'compliant' counts the devices that match after the call.
+
+    Raises:
+        ServiceValidationError: If a min/max limit pair would be inverted
+            on any device.
+    """
+    reconciler = hass.data[DOMAIN][DATA_RECONCILER]
+    validate_limits(settings)
+    for device_data in devices:
+        merged = {**reconciler.get_desired(device_data["mac"]), **settings}
+        validate_limits(merged, device_data["coordinator"].data)
+
+    async def _apply(device_data: dict) -> dict:
+        coordinator = device_data["coordinator"]
+        result = {"name": device_data["name"], "mac": device_data["mac"]}
+        reconciler.async_set_desired(device_data["mac"], settings)
+        changed_schedule = schedule_differences(schedule, coordinator.data)
+        changed = list(settings_differences(settings, coordinator.data)) + changed_schedule
+        if not changed:
+            result.update(result=RESULT_UNCHANGED, changed=[], verified=True)
+            return result
+        try:
+            commands = settings_commands(coordinator.device, settings, coordinator.data)
+            commands += schedule_commands(coordinator.device, schedule, changed_schedule)
+            await coordinator.async_send_commands(commands)
+        except Exception as exc:
+            _LOGGER.error("[%s] Error in %s: %s", device_data["host"], service, exc)
+            result.update(result=RESULT_FAILED, changed=changed, verified=False, error=str(exc))
+            return result
+        remaining = settings_differences(settings, coordinator.data) or schedule_differences(schedule, coordinator.data)
+        result.update(
+            result=RESULT_UPDATED,
+            changed=changed,
+            verified=coordinator.online and not remaining,
+        )
+        return result
+
+    _LOGGER.debug("%s: applying %s %s to %d devices (max %d concurrent)",
+                  service, settings, schedule, len(devices), max_concurrency)
+    results = await async_fan_out(devices, _apply, max_concurrency, hass.data[DOMAIN][DATA_FLEET_LIMITER])
+
+    summary = {RESULT_UPDATED: 0, RESULT_UNCHANGED: 0, RESULT_FAILED: 0}
+    for result in results:
+        summary[result["result"]] += 1
+    summary["compliant"] = sum(1 for result in results if result["verified"])
+    _LOGGER.info("%s finished: %s", service, summary)
+    return {"devices": results, "summary": summary}
+
+
+# ---------------------------------------------------------------------------
+# apply_schedule
+# ---------------------------------------------------------------------------
+
+def _hour_minute(value):
+    """Return (hour, minute) for a datetime.time or a coordinator 'H:MM' string."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        hour, minute = map(int, value.split(":")[:2])
+        return hour, minute
+    return value.hour, value.minute
+
+
+def validate_schedule_order(schedule: dict) -> None:
+    """Reject a schedule whose four times are not strictly increasing.
+
+    The device refuses such schedules anyway; checking once up front turns
+    one failure per device into a single validation error. Only complete
+    definitions are checked because partial ones merge with per-device data.
+    """
+    times = [_hour_minute(schedule.get(time_attr)) for _, time_attr, _, _ in SCHEDULE_EDGES]
+    if None in times:
+        return
+    if any(earlier >= later for earlier, later in zip(times, times[1:])):
+        _LOGGER.error("Schedule times must be strictly increasing: %s", times)
+        raise ServiceValidationError(
+            "Schedule times must be strictly increasing: slot 1 start < slot 1 stop < slot 2 start < slot 2 stop.",
+            translation_domain=DOMAIN,
+            translation_key="invalid_schedule_order",
+        )
+
+
+def schedule_differences(schedule: dict, data: dict) -> list:
+    """Return the schedule fields whose requested value differs from data.
+
+    Args:
+        schedule: Service data restricted to SCHEDULE_FIELDS.
+        data: Coordinator data dict of one device.
+
+    Returns:
+        List of service field names that need to be written.
+    """
+    changed = []
+    for enable_attr, time_attr, enable_key, time_key in SCHEDULE_EDGES:
+        if enable_attr in schedule and data.get(enable_key) != schedule[enable_attr]:
+            changed.append(enable_attr)
+        if time_attr in schedule and _hour_minute(data.get(time_key)) != _hour_minute(schedule[time_attr]):
+            changed.append(time_attr)
+    if ATTR_PRESET_MODE in schedule and data.get(DATA_KEY_PRESET_MODE) != schedule[ATTR_PRESET_MODE]:
+        changed.append(ATTR_PRESET_MODE)
+    return changed
+
+
+def schedule_commands(device, schedule: dict, changed: list) -> list:
+    """Build the minimal list of (func, args) writes for the changed fields.
+
+    All slot edges are folded into a single set_daily_schedule call (None
+    leaves a field untouched) and the preset costs one extra write.
+    """
+    commands = []
+    daily_args = []
+    for enable_attr, time_attr, _, _ in SCHEDULE_EDGES:
+        if enable_attr in changed:
+            daily_args.append(SLOT_ENABLED_HASS_TO_HYSEN[schedule[enable_attr]])
+        else:
+            daily_args.append(None)
+        if time_attr in changed:
+            daily_args.extend(_hour_minute(schedule[time_attr]))
+        else:
+            daily_args.extend((None, None))
+    if any(arg is not None for arg in daily_args):
+        commands.append((device.set_daily_schedule, tuple(daily_args)))
+    if ATTR_PRESET_MODE in changed:
+        commands.append((device.set_weekly_schedule, (PRESET_HASS_TO_HYSEN[schedule[ATTR_PRESET_MODE]],)))
+    return commands
+
+
+async def async_apply_schedule(hass: HomeAssistant, service_call: ServiceCall) -> dict:
+    """Apply one schedule definition to every targeted device.
+
+    Only the differing fields are written, see async_apply_configuration.
+
+    Args:
+        hass: The Home Assistant instance.
+        service_call: The hysen2pfc.apply_schedule service call.
+
+    Returns:
+        Dict with a per-device 'devices' list and a 'summary' of counts.
+
+    Raises:
+        ServiceValidationError: If no Hysen device is targeted or the
+            schedule times are out of order.
+    """
+    schedule = {key: value for key, value in service_call.data.items() if key in SCHEDULE_FIELDS}
+    max_concurrency = service_call.data.get(ATTR_MAX_CONCURRENCY, DEFAULT_FLEET_CONCURRENCY)
+    validate_schedule_order(schedule)
+
+    devices = async_require_devices(hass, service_call)
+    return await async_apply_configuration(hass, devices, {}, schedule, max_concurrency, "apply_schedule")
@@ -0,0 +1,353 @@
+"""
+Per-device I/O lane for the Hysen 2 Pipe Fan Coil integration.
+
+Hysen2PipeFanCoilDevice is not thread safe: every request shares one UDP
+socket and one packet counter, and the library setters are
+read-modify-write sequences. Before the lane, coordinator polls and entity
+writes were independent executor jobs that could interleave on the device,
+and a write issued during a slow poll (with retries) simply waited for a
+free thread and raced it.
+
+HysenIOLane serializes all device I/O of one coordinator through a small
+priority queue served by a single worker:
+
+- Commands (PRIORITY_COMMAND) are always taken before queued polls
+  (PRIORITY_POLL), so a user action never waits behind more than the one
+  request that is already on the wire. Commands keep their arrival order.
+- Polls are merged: while a poll is queued, further poll requests share
+  its result instead of queuing another device read. After a command, a
+  queued poll is held back for the settle delay so that the refresh that
+  follows the command merges with it rather than reading the device twice.
+- Writes pass a token bucket (write_rate writes per second, bursts of up
+  to write_burst) that protects the device firmware from bursty
+  automations. A write that finds the bucket empty waits in the queue; a
+  newer single-setter write for the same setter is compacted into it
+  (last write wins, see command_queue.merge_command_args) instead of
+  adding another device write. Nothing is dropped.
+- Queue depth, merged polls, throttled and compacted writes and wait times
+  are kept in HysenIOLane.stats and exposed by the I/O Queue and Throttled
+  Writes diagnostic sensors.
+- While the profile service runs, calls are handed to its profiler
+  (profiler.py), which needs to see the executor jobs of cProfile runs.
+- A call made during a traced command (tracing.py) records its time in the
+  queue (and why it was held back), for an executor thread and on the
+  device as spans of that trace.
+
+The worker is started on demand and exits when the queue is empty, so an
+idle device costs no task.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from homeassistant.core import HomeAssistant
+from .command_queue import merge_command_args
+from .const import DOMAIN, DATA_PROFILER
+from .metrics import KIND_COMMAND, KIND_POLL
+from .tracing import current_trace
+
+_LOGGER = logging.getLogger(__name__)
+
+PRIORITY_COMMAND = 0
+PRIORITY_POLL = 1
+
+# Weight of the newest sample in the average wait times.
+_WAIT_AVERAGE_WEIGHT = 0.2
+
+
+class _Job:
+    """One blocking device call waiting for the lane.
+
+    key is the setter name of a single-setter write that later writes to
+    the same setter may be compacted into, None otherwise; cost is the
+    number of device writes the call makes. trace is the HysenTrace of the
+    command that queued the call, traced_at the time it joined that trace
+    and held_at the time the lane first held the call back.
+    """
+
+    __slots__ = (
+        "priority", "func", "args", "future", "queued_at", "key", "cost", "throttled",
+        "trace", "traced_at", "held_at",
+    )
+
+    def __init__(self, priority: int, func, args: tuple, future: asyncio.Future, key=None, cost: int = 0) -> None:
+        self.priority = priority
+        self.func = func
+        self.args = args
+        self.future = future
+        self.queued_at = time.monotonic()
+        self.key = key
+        self.cost = cost
+        self.throttled = False
+        self.trace = current_trace()
+        self.traced_at = self.queued_at
+        self.held_at = None
+
+
+class _TokenBucket:
+    """Token bucket refilled at rate tokens per second up to burst tokens."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self._rate = rate
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def delay(self, cost: int) -> float:
+        """Return the seconds until cost tokens are available (0 if now).
+
+        A call costing more than the burst only needs a full bucket.
+        """
+        if self._rate <= 0:
+            return 0.0
+        self._refill()
+        missing = min(cost, self._burst) - self._tokens
+        return max(0.0, missing / self._rate)
+
+    def take(self, cost: int) -> None:
+        """Consume cost tokens; the balance may go negative for big batches."""
+        if self._rate > 0:
+            self._refill()
+            self._tokens -= cost
+
+
+class HysenIOLane:
+    """Serialized, prioritized access to one Hysen device."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        host: str,
+        settle_delay: float = 0.0,
+        write_rate: float = 0.0,
+        write_burst: int = 1,
+        metrics=None,
+    ) -> None:
+        """Initialise an idle lane.
+
+        Args:
+            hass: The Home Assistant instance.
+            host: Device IP address, used for logging and the worker name.
+            settle_delay: Time a queued poll is held back after a command.
+            write_rate: Sustained device writes per second; 0 disables the
+                rate limit.
+            write_burst: Writes allowed back to back before write_rate
+                applies.
+            metrics: The device's HysenMetrics, timing every call; None
+                to skip timing.
+        """
+        self._hass = hass
+        self._host = host
+        self._settle_delay = settle_delay
+        self._bucket = _TokenBucket(write_rate, write_burst)
+        self._metrics = metrics
+        self._heap: list = []
+        self._sequence = itertools.count()
+        self._queued_poll: _Job | None = None
+        self._poll_not_before = 0.0
+        # Highest depth since the last pop_peak_depth.
+        self._peak_depth = 0
+        self._wakeup = asyncio.Event()
+        self._worker = None
+        self.stats = {
+            "max_depth": 0,
+            "commands": 0,
+            "polls": 0,
+            "merged_polls": 0,
+            "throttled_writes": 0,
+            "compacted_writes": 0,
+            "last_command_wait": 0.0,
+            "avg_command_wait": 0.0,
+            "max_command_wait": 0.0,
+            "last_poll_wait": 0.0,
+            "avg_poll_wait": 0.0,
+            "max_poll_wait": 0.0,
+        }
+
+    @property
+    def depth(self) -> int:
+        """Return the number of calls waiting for the device."""
+        return len(self._heap)
+
+    def pop_peak_depth(self) -> int:
+        """Return the highest depth since the previous call and start over.
+
+        The depth is measured as calls are queued, so a call that waited
+        counts even if the queue is empty again by the time it is read.
+        """
+        peak = max(self._peak_depth, len(self._heap))
+        self._peak_depth = len(self._heap)
+        return peak
+
+    async def async_command(self, func, *args, cost: int = 1):
+        """Run a blocking device call that writes, ahead of queued polls.
+
+        Args:
+            func: Blocking callable.
+            *args: Positional arguments forwarded to func.
+            cost: Number of device writes func makes, charged to the token
+                bucket.
+
+        Returns:
+            Whatever func returns.
+
+        Raises:
+            Exception: Whatever func raises.
+        """
+        return await self._async_submit(PRIORITY_COMMAND, func, args, cost=cost)
+
+    async def async_commands(self, commands: list) -> None:
+        """Run a batch of (func, args) device writes back to back.
+
+        A single-setter batch that finds an earlier write to the same setter
+        still queued is compacted into it, and both callers get its result.
+
+        Raises:
+            Exception: The first exception raised by a command; commands
+                after it are not executed.
+        """
+        if len(commands) == 1:
+            func, args = commands[0]
+            key = getattr(func, "__name__", None)
+            for _, _, job in self._heap:
+                if job.key is not None and job.key == key and job.func == func and not job.future.done():
+                    job.args = merge_command_args(key, job.args, tuple(args))
+                    self.stats["compacted_writes"] += 1
+                    _LOGGER.debug("[%s] Compacted %s into a queued write", self._host, key)
+                    return await asyncio.shield(job.future)
+            return await self._async_submit(PRIORITY_COMMAND, func, tuple(args), key=key, cost=1)
+
+        def _run_commands():
+            for func, args in commands:
+                func(*args)
+
+        return await self._async_submit(PRIORITY_COMMAND, _run_commands, (), cost=len(commands))
+
+    async def async_poll(self, func, *args):
+        """Run a blocking device read in the lane, merged with a queued read.
+
+        Args:
+            func: The status read (e.g. device.get_device_status); all polls
+                of a lane must be interchangeable since they are merged.
+
+        Returns:
+            Whatever func returns.
+
+        Raises:
+            Exception: Whatever func raises.
+        """
+        if self._queued_poll is not None and not self._queued_poll.future.done():
+            self.stats["merged_polls"] += 1
+            if self._queued_poll.trace is None:
+                self._queued_poll.trace = current_trace()
+                self._queued_poll.traced_at = time.monotonic()
+            return await asyncio.shield(self._queued_poll.future)
+        return await self._async_submit(PRIORITY_POLL, func, args)
+
+    async def _async_submit(self, priority: int, func, args: tuple, key=None, cost: int = 0):
+        """Queue a call, start the worker if needed and wait for the result."""
+        future = self._hass.loop.create_future()
+        # The result may be abandoned by a cancelled caller; never let the
+        # exception go unretrieved.
+        future.add_done_callback(lambda fut: fut.cancelled() or fut.exception())
+        job = _Job(priority, func, args, future, key, cost)
+        heapq.heappush(self._heap, (priority, next(self._sequence), job))
+        if priority == PRIORITY_POLL:
+            self._queued_poll = job
+        self.stats["max_depth"] = max(self.stats["max_depth"], len(self._heap))
+        self._peak_depth = max(self._peak_depth, len(self._heap))
+        self._wakeup.set()
+        if self._worker is None or self._worker.done():
+            self._worker = self._hass.async_create_background_task(
+                self._async_run(), f"hysen2pfc_{self._host}_io_lane"
+            )
+        return await asyncio.shield(future)
+
+    async def _async_run(self) -> None:
+        """Serve queued calls one at a time until the queue is empty."""
+        while self._heap:
+            priority, _, job = self._heap[0]
+            if priority == PRIORITY_POLL:
+                delay = self._poll_not_before - time.monotonic()
+                if delay > 0:
+                    if job.held_at is None:
+                        job.held_at = time.monotonic()
+                    # Hold the poll back; a new command wakes us up early.
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+            else:
+                delay = self._bucket.delay(job.cost)
+                if delay > 0:
+                    if not job.throttled:
+                        job.throttled = True
+                        job.held_at = time.monotonic()
+                        self.stats["throttled_writes"] += job.cost
+                        _LOGGER.debug("[%s] Write rate exceeded; holding %d writes for %.2fs",
+                                      self._host, job.cost, delay)
+                    # Wait for tokens; newer writes can be compacted meanwhile.
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                self._bucket.take(job.cost)
+            heapq.heappop(self._heap)
+            if job is self._queued_poll:
+                self._queued_poll = None
+            if job.future.done():
+                continue
+            self._record_wait(job)
+            func = job.func
+            if self._metrics is not None:
+                kind = KIND_COMMAND if priority == PRIORITY_COMMAND else KIND_POLL
+                func = self._metrics.timed(kind, func, job.queued_at)
+            if job.trace is not None:
+                func = self._trace(job, func)
+            profiler = self._hass.data.get(DOMAIN, {}).get(DATA_PROFILER)
+            if profiler is not None:
+                func = profiler.wrap(func)
+            try:
+                result = await self._hass.async_add_executor_job(func, *job.args)
+            except Exception as exc:
+                if not job.future.done():
+                    job.future.set_exception(exc)
+            else:
+                if not job.future.done():
+                    job.future.set_result(result)
+            if priority == PRIORITY_COMMAND:
+                self._poll_not_before = time.monotonic() + self._settle_delay
+
+    def _trace(self, job: _Job, func):
+        """Record a job's time in the queue and wrap it to trace the rest."""
+        handed_off = time.monotonic()
+        job.trace.add("lane_queue", job.traced_at, handed_off)
+        if job.held_at is not None:
+            reason = "settle_sleep" if job.priority == PRIORITY_POLL else "write_rate_limit"
+            job.trace.add(reason, max(job.held_at, job.traced_at), handed_off)
+        name = "device_read" if job.priority == PRIORITY_POLL else "device_write"
+        return job.trace.wrap(name, func, handed_off)
+
+    def _record_wait(self, job: _Job) -> None:
+        """Update the wait time statistics with a job leaving the queue."""
+        wait = round(time.monotonic() - job.queued_at, 3)
+        kind = "command" if job.priority == PRIORITY_COMMAND else "poll"
+        self.stats[f"{kind}s"] += 1
+        self.stats[f"last_{kind}_wait"] = wait
+        self.stats[f"max_{kind}_wait"] = max(self.stats[f"max_{kind}_wait"], wait)
+        average = self.stats[f"avg_{kind}_wait"]
+        self.stats[f"avg_{kind}_wait"] = round(average + _WAIT_AVERAGE_WEIGHT * (wait - average), 3)
+        if wait > 1:
+            _LOGGER.debug("[%s] %s waited %.3fs for the device (%d queued)",
+                          self._host, getattr(job.func, "__name__", job.func), wait, len(self._heap))
@@ -0,0 +1,267 @@
+"""
+Memory accounting for the Hysen 2 Pipe Fan Coil integration.
+
+Two admin services:
+
+- hysen2pfc.memory_usage returns, for every targeted device, the bytes
+  retained by its objects, by part:
+
+      data           The coordinator data dict.
+      device         The library device (socket, cipher, raw status).
+      metrics        Histograms, counters and recent frames (metrics.py),
+                     with the loop monitor if any.
+      lane           The I/O lane and its queued jobs (lane.py).
+      command_queue  Commands waiting for the device (command_queue.py).
+      caches         The device's entries in the shared stores: restart
+                     snapshot, desired settings and persisted command queue.
+      entities       Every entity of the device.
+      coordinator    The coordinator itself: listeners, timers and whatever
+                     is not in the parts above.
+
+  Sizes are sys.getsizeof summed over the objects reachable from each part,
+  each object counted once, in the order above. The walk stops at objects
+  the device shares with others (Home Assistant, its registries, config
+  entries and entity platforms, event loop, loggers, the integration's
+  shared stores and other devices) and at classes, modules and code, so
+  the sum is about what unloading the device would free. Runs on the event loop,
+  a few ms per device.
+- hysen2pfc.trace_memory traces allocations with tracemalloc for a number
+  of seconds and returns the allocation sites in the integration and the
+  hysen and broadlink libraries that grew the most in between, i.e. what
+  polls and commands keep allocating. An allocation is charged to the
+  innermost frame of its stack in that code, so memory allocated by the
+  standard library on behalf of the integration counts as well. Both
+  snapshots, restricted to those allocations, are written to
+  <config>/hysen2pfc/profiling/ for tracemalloc.Snapshot.load. Tracing
+  slows every allocation of Home Assistant down while it runs; a tracing
+  already started (e.g. PYTHONTRACEMALLOC) is used as is and left running.
+"""
+
+import asyncio
+import collections
+import gc
+import logging
+import os
+import sys
+import tracemalloc
+import types
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers.device_registry import DeviceEntry
+from homeassistant.helpers.entity_platform import EntityPlatform
+from homeassistant.helpers.entity_registry import RegistryEntry
+from homeassistant.util import dt as dt_util
+from .const import (
+    DOMAIN,
+    DATA_ENTITY_INDEX,
+    DATA_COMMAND_QUEUE_STORE,
+    DATA_RECONCILER,
+    DATA_SNAPSHOT_STORE,
+    DATA_MEMORY_TRACE,
+    PROFILE_DIR,
+    MEMORY_TRACE_FRAMES,
+    DEFAULT_PROFILE_DURATION,
+    DEFAULT_PROFILE_TOP,
+    ATTR_DURATION,
+    ATTR_TOP,
+)
+from .fleet import async_require_devices
+from .profiler import _SCOPE, _in_scope
+
+_LOGGER = logging.getLogger(__name__)
+
+# Objects shared with the rest of Home Assistant; never walked into.
+_SHARED_TYPES = (
+    type,
+    types.ModuleType,
+    types.CodeType,
+    types.BuiltinFunctionType,
+    HomeAssistant,
+    ConfigEntry,
+    EntityPlatform,
+    RegistryEntry,
+    DeviceEntry,
+    asyncio.AbstractEventLoop,
+    logging.Logger,
+)
+
+
+def _shared_ids(hass: HomeAssistant, device_data: dict) -> set:
+    """Return the ids of the objects a device shares with others."""
+    shared = {id(vars(module)) for module in list(sys.modules.values()) if module is not None}
+    shared.update((id(hass.data), id(hass.data[DOMAIN])))
+    for key, value in hass.data[DOMAIN].items():
+        if isinstance(value, dict) and "coordinator" in value:
+            if value is not device_data:
+                shared.update((id(value), id(value["coordinator"])))
+        else:
+            # HysenEntityIndex, stores, fleet metrics, limiter, ...
+            shared.add(id(value))
+    return shared
+
+
+def _retained_size(roots: list, seen: set, stop: set) -> int:
+    """Return the bytes of the objects reachable from roots and not yet seen.
+
+    Objects in stop (by id), shared objects and functions without a
+    closure (module level functions and methods) are not counted or walked
+    into; counted objects are added to seen.
+    """
+    size = 0
+    pending = list(roots)
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or id(obj) in stop or isinstance(obj, _SHARED_TYPES):
+            continue
+        if isinstance(obj, types.FunctionType) and obj.__closure__ is None:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        pending.extend(gc.get_referents(obj))
+    return size
+
+
+def measure_device(hass: HomeAssistant, device_data: dict) -> dict:
+    """Return the retained size of one device's objects, by part.
+
+    Returns:
+        Dict with the number of 'entities' and the 'bytes' of every part
+        (see the module docstring) and their 'total'.
+    """
+    coordinator = device_data["coordinator"]
+    mac = device_data["mac"]
+    domain_data = hass.data[DOMAIN]
+    entities = [entity for owner, entity in domain_data[DATA_ENTITY_INDEX].entities() if owner is coordinator]
+    caches = [
+        domain_data[DATA_SNAPSHOT_STORE].get(mac),
+        domain_data[DATA_RECONCILER].get_desired(mac),
+        domain_data[DATA_COMMAND_QUEUE_STORE].get(mac),
+    ]
+    parts = {
+        "data": [coordinator.data],
+        "device": [coordinator.device],
+        "metrics": [coordinator.metrics, coordinator.loop_monitor],
+        "lane": [coordinator.lane],
+        "command_queue": [coordinator.command_queue],
+        "caches": [cache for cache in caches if cache is not None],
+        "entities": entities,
+        "coordinator": [coordinator, device_data],
+    }
+    shared = _shared_ids(hass, device_data)
+    roots = {id(root) for part_roots in parts.values() for root in part_roots if root is not None}
+    seen = set()
+    sizes = {}
+    for part, part_roots in parts.items():
+        part_roots = [root for root in part_roots if root is not None]
+        # The roots of the other parts are counted in their own part.
+        stop = shared | (roots - {id(root) for root in part_roots})
+        sizes[part] = _retained_size(part_roots, seen, stop)
+    sizes["total"] = sum(sizes.values())
+    return {"entities": len(entities), "bytes": sizes}
+
+
+async def async_memory_usage(hass: HomeAssistant, service_call: ServiceCall) -> dict:
+    """Return the memory retained by every targeted device.
+
+    Args:
+        hass: The Home Assistant instance.
+        service_call: The hysen2pfc.memory_usage service call.
+
+    Returns:
+        Dict with a per-device 'devices' list (name, mac and
+        measure_device's result) and the 'total' bytes.
+
+    Raises:
+        ServiceValidationError: If no Hysen device is targeted.
+    """
+    devices = async_require_devices(hass, service_call)
+    results = [
+        {"name": device_data["name"], "mac": device_data["mac"], **measure_device(hass, device_data)}
+        for device_data in devices
+    ]
+    return {"devices": results, "total": sum(result["bytes"]["total"] for result in results)}
+
+
+def _take_snapshot(path: str) -> tracemalloc.Snapshot:
+    """Take a snapshot of the allocations made by integration code and dump it."""
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(True, f"{directory}*", all_frames=True) for directory in _SCOPE]
+    )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    snapshot.dump(path)
+    return snapshot
+
+
+def _allocation_diff(first: tracemalloc.Snapshot, second: tracemalloc.Snapshot, top: int) -> dict:
+    """Return the allocation sites that grew the most between two snapshots."""
+    sites = collections.defaultdict(lambda: [0, 0, 0])
+    for stat in second.compare_to(first, "traceback"):
+        frame = next((frame for frame in reversed(stat.traceback) if _in_scope(frame.filename)), None)
+        if frame is None or frame.filename == __file__:
+            continue
+        site = sites[(frame.filename, frame.lineno)]
+        site[0] += stat.size_diff
+        site[1] += stat.count_diff
+        site[2] += stat.size
+    ranked = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)
+    return {
+        "size_diff": sum(site[0] for site in sites.values()),
+        "count_diff": sum(site[1] for site in sites.values()),
+        "top": [
+            {
+                "site": f"{os.path.basename(filename)}:{lineno}",
+                "size_diff": size_diff,
+                "count_diff": count_diff,
+                "size": size,
+            }
+            for (filename, lineno), (size_diff, count_diff, size) in ranked[:top]
+        ],
+    }
+
+
+async def async_trace_memory(hass: HomeAssistant, service_call: ServiceCall) -> dict:
+    """Trace the integration's allocations for the requested duration.
+
+    Args:
+        hass: The Home Assistant instance.
+        service_call: The hysen2pfc.trace_memory service call.
+
+    Returns:
+        Dict with the duration, the two snapshot file names (in
+        <config>/hysen2pfc/profiling/), the total size and count
+        differences and the 'top' sites by size difference.
+
+    Raises:
+        ServiceValidationError: If a trace is already running.
+    """
+    duration = service_call.data.get(ATTR_DURATION, DEFAULT_PROFILE_DURATION)
+    top = service_call.data.get(ATTR_TOP, DEFAULT_PROFILE_TOP)
+    if hass.data[DOMAIN].get(DATA_MEMORY_TRACE):
+        _LOGGER.error("A memory trace is already running")
+        raise ServiceValidationError(
+            "A memory trace is already running",
+            translation_domain=DOMAIN,
+            translation_key="memory_trace_running",
+        )
+
+    directory = hass.config.path(DOMAIN, PROFILE_DIR)
+    stamp = dt_util.now().strftime("%Y%m%d_%H%M%S")
+    files = (f"memory_{stamp}_start.snap", f"memory_{stamp}_end.snap")
+    started = not tracemalloc.is_tracing()
+    hass.data[DOMAIN][DATA_MEMORY_TRACE] = True
+    try:
+        if started:
+            tracemalloc.start(MEMORY_TRACE_FRAMES)
+        _LOGGER.info("Tracing memory allocations for %d s", duration)
+        first = await hass.async_add_executor_job(_take_snapshot, os.path.join(directory, files[0]))
+        await asyncio.sleep(duration)
+        second = await hass.async_add_executor_job(_take_snapshot, os.path.join(directory, files[1]))
+    finally:
+        if started:
+            tracemalloc.stop()
+        hass.data[DOMAIN].pop(DATA_MEMORY_TRACE, None)
+
+    diff = await hass.async_add_executor_job(_allocation_diff, first, second, top)
+    _LOGGER.info("Wrote memory snapshots %s and %s", *files)
+    return {"duration": duration, "files": list(files), **diff}
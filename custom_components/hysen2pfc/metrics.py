@@ -0,0 +1,380 @@
+"""
+Poll and command metrics for the Hysen 2 Pipe Fan Coil integration.
+
+Every device call that goes through the I/O lane (see lane.py) is split
+into three timings, taken in the executor thread that runs it:
+
+- queue_wait   From the call being queued in the lane until an executor
+               thread starts it (lane queue plus waiting for a free thread).
+- rtt          Time on the wire: the sum of the library's send_packet calls
+               (UDP request to response, retries and timeouts included).
+- decode       The rest of the call: encryption, CRC checks and parsing of
+               the responses.
+
+Polls additionally time translate (coordinator.translate_status). Each
+timing is kept in a HysenHistogram with fixed buckets, so memory does not
+grow with uptime, separately for polls and commands. Counters record
+polls, commands, poll retries, polls that failed on every attempt, failed
+commands and the class of the last error.
+
+HysenMetrics belongs to one coordinator (coordinator.metrics) and is shown
+by the Poll Time and Poll Failures diagnostic sensors of the device;
+HysenFleetMetrics aggregates every device for the fleet summary sensor.
+Both kinds of sensor are disabled by default.
+
+HysenLoopMonitor (coordinator.loop_monitor, only with the loop_budget
+option set) measures the event loop time this integration takes per device
+and poll: the coordinator's listener fan-out (every entity's
+_handle_coordinator_update, state writes included) and, within it, the
+time spent in HysenEntity.async_write_ha_state. It keeps p50/p99 for the
+Loop Time diagnostic sensor and logs a warning when one fan-out exceeds
+the budget.
+
+HysenMetrics also keeps the last RECENT_FRAMES exchanges with the device
+and the number of writes made by each entity, for diagnostics.py. A frame
+keeps the raw response and a reference to the cipher it was encrypted
+with, so nothing is decrypted unless diagnostics are downloaded.
+"""
+
+import logging
+import time
+from collections import deque
+from homeassistant.core import callback
+from homeassistant.util import dt as dt_util
+
+# Upper bounds of the histogram buckets, in milliseconds; a last bucket
+# holds everything slower.
+_BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+# Finer buckets for synchronous event loop work.
+_LOOP_BUCKET_BOUNDS_MS = (0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Exchanges with the device kept for diagnostics.
+RECENT_FRAMES = 20
+
+KIND_POLL = "poll"
+KIND_COMMAND = "command"
+
+TIMINGS = (
+    "poll_queue_wait",
+    "poll_rtt",
+    "poll_decode",
+    "translate",
+    "command_queue_wait",
+    "command_rtt",
+    "command_decode",
+)
+
+COUNTERS = (
+    "polls",
+    "poll_retries",
+    "poll_failures",
+    "commands",
+    "command_failures",
+)
+
+
+class HysenHistogram:
+    """Fixed-memory latency histogram with log-spaced buckets."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: tuple = _BUCKET_BOUNDS_MS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Add one sample."""
+        value = seconds * 1000
+        index = 0
+        while index < len(self.bounds) and value > self.bounds[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "HysenHistogram") -> None:
+        """Add the samples of another histogram with the same bounds."""
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction: float) -> float | None:
+        """Return the upper bound (ms) of the bucket holding the percentile, or None."""
+        if not self.count:
+            return None
+        wanted = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted and count:
+                if index == len(self.bounds):
+                    return round(self.max, 2)
+                return float(min(self.bounds[index], round(self.max, 2)))
+        return round(self.max, 2)
+
+    def summary(self) -> dict:
+        """Return count, mean, p50, p95 and max in milliseconds."""
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 2) if self.count else None,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "max": round(self.max, 2) if self.count else None,
+        }
+
+
+class HysenMetrics:
+    """Timings and counters of one device.
+
+    Timings are recorded from the executor thread that runs the device
+    call; the lane runs one call per device at a time.
+    """
+
+    def __init__(self) -> None:
+        """Initialise empty histograms and counters."""
+        self.histograms = {name: HysenHistogram() for name in TIMINGS}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.last_error = None
+        self.last_error_at = None
+        self.entity_writes: dict = {}
+        # (sent at, packet type, latency, request payload, raw response or
+        # None, cipher of the response, error class or None)
+        self.frames: deque = deque(maxlen=RECENT_FRAMES)
+        self._wire = 0.0
+
+    def attach(self, device) -> None:
+        """Time and keep every packet the device sends from now on."""
+        send_packet = device.send_packet
+
+        def _send_packet(packet_type: int, payload: bytes) -> bytes:
+            start = time.monotonic()
+            response = error = None
+            try:
+                response = send_packet(packet_type, payload)
+                return response
+            except Exception as exc:
+                error = type(exc).__name__
+                raise
+            finally:
+                latency = time.monotonic() - start
+                self._wire += latency
+                self.frames.append(
+                    (time.time() - latency, packet_type, latency, bytes(payload), response, device.aes, error)
+                )
+
+        device.send_packet = _send_packet
+
+    def timed(self, kind: str, func, queued_at: float):
+        """Return func wrapped to record its queue_wait, rtt and decode times.
+
+        Args:
+            kind: KIND_POLL or KIND_COMMAND.
+            func: The blocking device call.
+            queued_at: time.monotonic() at which the call was queued.
+        """
+
+        def _timed(*args):
+            start = time.monotonic()
+            self.histograms[f"{kind}_queue_wait"].record(start - queued_at)
+            self._wire = 0.0
+            try:
+                return func(*args)
+            finally:
+                elapsed = time.monotonic() - start
+                self.histograms[f"{kind}_rtt"].record(self._wire)
+                self.histograms[f"{kind}_decode"].record(max(0.0, elapsed - self._wire))
+
+        return _timed
+
+    def record(self, timing: str, seconds: float) -> None:
+        """Add one sample to a histogram measured outside the lane."""
+        self.histograms[timing].record(seconds)
+
+    def count(self, counter: str) -> None:
+        """Increment a counter."""
+        self.counters[counter] += 1
+
+    def count_write(self, entity_id: str) -> None:
+        """Count a write requested by an entity."""
+        self.entity_writes[entity_id] = self.entity_writes.get(entity_id, 0) + 1
+
+    def record_error(self, counter: str, exc: Exception) -> None:
+        """Increment a failure counter and remember the error class."""
+        self.counters[counter] += 1
+        self.last_error = type(exc).__name__
+        self.last_error_at = dt_util.utcnow()
+
+    def summary(self) -> dict:
+        """Return the counters, last error and timing summaries."""
+        return {
+            **self.counters,
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at.isoformat() if self.last_error_at else None,
+            **{name: histogram.summary() for name, histogram in self.histograms.items()},
+        }
+
+
+class HysenLoopMonitor:
+    """Event loop time taken by one device's coordinator updates."""
+
+    def __init__(self, host: str, budget_ms: int) -> None:
+        """Initialise the monitor.
+
+        Args:
+            host: Device IP address, used for logging.
+            budget_ms: Fan-out time above which a warning is logged.
+        """
+        self._host = host
+        self.budget_ms = budget_ms
+        self.batches = HysenHistogram(_LOOP_BUCKET_BOUNDS_MS)
+        self.writes = HysenHistogram(_LOOP_BUCKET_BOUNDS_MS)
+        self.over_budget = 0
+        self.slowest_entity = None
+        self._in_batch = False
+        self._batch_writes = 0.0
+        self._batch_slowest = (None, 0.0)
+
+    def start_batch(self) -> None:
+        """Mark the start of a listener fan-out."""
+        self._in_batch = True
+        self._batch_writes = 0.0
+        self._batch_slowest = (None, 0.0)
+
+    def record_write(self, entity_id: str, seconds: float) -> None:
+        """Add the time of one async_write_ha_state call."""
+        if not self._in_batch:
+            return
+        self._batch_writes += seconds
+        if seconds > self._batch_slowest[1]:
+            self._batch_slowest = (entity_id, seconds)
+
+    def end_batch(self, seconds: float, listeners: int) -> None:
+        """Record a finished fan-out and warn if it was over budget."""
+        self._in_batch = False
+        self.batches.record(seconds)
+        self.writes.record(self._batch_writes)
+        self.slowest_entity = self._batch_slowest[0]
+        elapsed_ms = seconds * 1000
+        if elapsed_ms > self.budget_ms:
+            self.over_budget += 1
+            entity_id, slowest = self._batch_slowest
+            _LOGGER.warning(
+                "[%s] Coordinator update took %.1f ms of event loop time for %d listeners "
+                "(budget %d ms; state writes %.1f ms, slowest %s %.1f ms)",
+                self._host, elapsed_ms, listeners, self.budget_ms,
+                self._batch_writes * 1000, entity_id, slowest * 1000,
+            )
+
+    def summary(self) -> dict:
+        """Return p50/p99 of the fan-outs and their state writes, in ms."""
+        return {
+            "budget_ms": self.budget_ms,
+            "updates": self.batches.count,
+            "over_budget": self.over_budget,
+            "update_p50": self.batches.percentile(0.50),
+            "update_p99": self.batches.percentile(0.99),
+            "update_max": round(self.batches.max, 2) if self.batches.count else None,
+            "state_writes_p50": self.writes.percentile(0.50),
+            "state_writes_p99": self.writes.percentile(0.99),
+            "slowest_entity": self.slowest_entity,
+        }
+
+
+class HysenFleetMetrics:
+    """Metrics of every loaded device, for the fleet summary sensor.
+
+    Stored in hass.data[DOMAIN][DATA_FLEET_METRICS]. The summary sensor is
+    added by the sensor platform of the first loaded entry; when that entry
+    unloads it is added again through another loaded entry.
+    """
+
+    def __init__(self) -> None:
+        """Initialise an empty fleet."""
+        self._devices: dict = {}
+        self._platforms: dict = {}
+        self._sensor_owner = None
+
+    @callback
+    def async_track(self, mac: str, metrics: HysenMetrics):
+        """Include a device's metrics in the summary.
+
+        Returns:
+            Callable that stops tracking; pass it to entry.async_on_unload.
+        """
+        self._devices[mac] = metrics
+
+        @callback
+        def _async_untrack() -> None:
+            if self._devices.get(mac) is metrics:
+                del self._devices[mac]
+
+        return _async_untrack
+
+    @callback
+    def async_add_platform(self, entry_id: str, async_add_entities, sensor_factory):
+        """Offer an entry's sensor platform to host the summary sensor.
+
+        Args:
+            entry_id: The config entry of the platform.
+            async_add_entities: The platform's entity adder.
+            sensor_factory: Callable returning a new summary sensor.
+
+        Returns:
+            Callable withdrawing the offer; pass it to entry.async_on_unload.
+        """
+        self._platforms[entry_id] = (async_add_entities, sensor_factory)
+        if self._sensor_owner is None:
+            self._async_add_sensor(entry_id)
+
+        @callback
+        def _async_remove_platform() -> None:
+            self._platforms.pop(entry_id, None)
+            if self._sensor_owner == entry_id:
+                self._sensor_owner = None
+                if self._platforms:
+                    self._async_add_sensor(next(iter(self._platforms)))
+
+        return _async_remove_platform
+
+    @callback
+    def _async_add_sensor(self, entry_id: str) -> None:
+        """Add the summary sensor through one entry's platform."""
+        async_add_entities, sensor_factory = self._platforms[entry_id]
+        self._sensor_owner = entry_id
+        async_add_entities([sensor_factory()])
+
+    def summary(self) -> dict:
+        """Return the fleet counters, last error and merged timing summaries."""
+        counters = dict.fromkeys(COUNTERS, 0)
+        histograms = {name: HysenHistogram() for name in TIMINGS}
+        last_error = last_error_at = last_error_device = None
+        for mac, metrics in self._devices.items():
+            for counter, value in metrics.counters.items():
+                counters[counter] += value
+            for name, histogram in metrics.histograms.items():
+                histograms[name].merge(histogram)
+            if metrics.last_error_at is not None and (last_error_at is None or metrics.last_error_at > last_error_at):
+                last_error, last_error_at, last_error_device = metrics.last_error, metrics.last_error_at, mac
+        return {
+            "devices": len(self._devices),
+            **counters,
+            "last_error": last_error,
+            "last_error_at": last_error_at.isoformat() if last_error_at else None,
+            "last_error_device": last_error_device,
+            **{name: histogram.summary() for name, histogram in histograms.items()},
+        }
+
+    def poll_rtt_p95(self) -> float | None:
+        """Return the fleet's 95th percentile poll round trip in ms."""
+        merged = HysenHistogram()
+        for metrics in self._devices.values():
+            merged.merge(metrics.histograms["poll_rtt"])
+        return merged.percentile(0.95)
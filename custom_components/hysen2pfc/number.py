@@ -14,17 +14,28 @@ Provides three NumberEntity instances:
 - HysenMinTempNumber — lower bound for the setpoint in the active HVAC mode.
   Available only when the device is on in COOL or HEAT mode. Its maximum
   slider bound is dynamically set to min(mode_max, target_temp, mode_max_temp).
+
+Both limit entities also handle hysen2pfc.set_limits, which moves the min
+and max of one mode together: the pair is validated as a whole and written
+as a single set_options frame followed by one refresh, so a range can move
+past its old bounds (e.g. 18-26 to 27-30) without an ordered pair of calls.
+The service is declared in services.py; async_resolve_limit_entities maps
+its targets to one limit entity per device, so a device or area target
+still costs one write per device.
 """
 
 import logging
 import voluptuous as vol
-from homeassistant.core import HomeAssistant, callback
-from homeassistant.exceptions import ServiceValidationError
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
 from homeassistant.helpers import entity_platform
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
 from homeassistant.components.number import NumberEntity
 from homeassistant.components.climate import HVACMode
 from .const import (
     DOMAIN,
+    DATA_ENTITY_INDEX,
+    DATA_RECONCILER,
     UnitOfTemperature,
     STATE_OFF,
     PRECISION_WHOLE,
@@ -42,6 +53,11 @@ from .const import (
     ATTR_CALIBRATION,
     ATTR_MAX_TEMP,
     ATTR_MIN_TEMP,
+    ATTR_HVAC_MODE,
+    ATTR_COOLING_MAX_TEMP,
+    ATTR_COOLING_MIN_TEMP,
+    ATTR_HEATING_MAX_TEMP,
+    ATTR_HEATING_MIN_TEMP,
     SERVICE_SET_CALIBRATION,
     SERVICE_SET_MAX_TEMP,
     SERVICE_SET_MIN_TEMP,
@@ -53,12 +69,32 @@ from .const import (
     HYSEN2PFC_HEATING_MIN_TEMP,
 )
 from .entity import HysenEntity
+from .settings import settings_commands, validate_limits
 
 _LOGGER = logging.getLogger(__name__)
 
 _TEMP_RANGE_MIN = min(HYSEN2PFC_COOLING_MIN_TEMP, HYSEN2PFC_HEATING_MIN_TEMP)
 _TEMP_RANGE_MAX = max(HYSEN2PFC_COOLING_MAX_TEMP, HYSEN2PFC_HEATING_MAX_TEMP)
 
+# HVAC mode -> (min setting, max setting) of its setpoint limits.
+_MODE_LIMITS = {
+    HVACMode.COOL: (ATTR_COOLING_MIN_TEMP, ATTR_COOLING_MAX_TEMP),
+    HVACMode.HEAT: (ATTR_HEATING_MIN_TEMP, ATTR_HEATING_MAX_TEMP),
+}
+
+# Service fields of hysen2pfc.set_limits.
+SET_LIMITS_SCHEMA = {
+    vol.Required(ATTR_MIN_TEMP): vol.All(
+        vol.Coerce(int),
+        vol.Range(min=_TEMP_RANGE_MIN, max=_TEMP_RANGE_MAX),
+    ),
+    vol.Required(ATTR_MAX_TEMP): vol.All(
+        vol.Coerce(int),
+        vol.Range(min=_TEMP_RANGE_MIN, max=_TEMP_RANGE_MAX),
+    ),
+    vol.Optional(ATTR_HVAC_MODE): vol.In(list(_MODE_LIMITS)),
+}
+
 
 async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entities):
     """Set up the Hysen number entities from a config entry."""
@@ -102,6 +138,47 @@ async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entitie
     )
 
 
+def async_resolve_limit_entities(hass: HomeAssistant, service_call: ServiceCall) -> list:
+    """Resolve the targets of a set_limits call to one limit entity per device.
+
+    Entity, device, area and label targets are accepted. Indirectly targeted
+    entities that are not limit entities (e.g. the calibration number of a
+    targeted device) are skipped, and a device reached through both its max
+    and min entity is only returned once.
+
+    Raises:
+        ServiceValidationError: If an explicitly targeted entity is not a
+            limit entity, or if no limit entity is targeted.
+    """
+    selected = async_extract_referenced_entity_ids(hass, service_call)
+    index = hass.data[DOMAIN][DATA_ENTITY_INDEX]
+    targets = {}
+    for entity_id in sorted(selected.referenced | selected.indirectly_referenced):
+        ref = index.get(entity_id)
+        if ref is None:
+            continue
+        coordinator, entity = ref
+        if not isinstance(entity, HysenLimitNumber):
+            if entity_id in selected.referenced:
+                _LOGGER.error("%s is not a max or min temperature entity", entity_id)
+                raise ServiceValidationError(
+                    f"{entity_id} is not a max or min temperature entity",
+                    translation_domain=DOMAIN,
+                    translation_key="not_a_limit_entity",
+                    translation_placeholders={"entity_id": entity_id},
+                )
+            continue
+        targets.setdefault(coordinator, entity)
+    if not targets:
+        _LOGGER.error("No valid entity IDs provided")
+        raise ServiceValidationError(
+            "No valid entity IDs provided",
+            translation_domain=DOMAIN,
+            translation_key="no_valid_entity_ids",
+        )
+    return list(targets.values())
+
+
 # ---------------------------------------------------------------------------
 # Calibration
 # ---------------------------------------------------------------------------
@@ -144,11 +221,79 @@ class HysenCalibrationNumber(HysenEntity, NumberEntity):
         await self.async_set_native_value(calibration)
 
 
+# ---------------------------------------------------------------------------
+# Limits (shared by max and min temperature)
+# ---------------------------------------------------------------------------
+
+class HysenLimitNumber(HysenEntity, NumberEntity):
+    """Base class of the setpoint limit entities; handles set_limits."""
+
+    async def async_set_limits(self, min_temp, max_temp, hvac_mode=None):
+        """Set the min and max setpoint of one HVAC mode together.
+
+        Args:
+            min_temp: New minimum setpoint.
+            max_temp: New maximum setpoint.
+            hvac_mode: cool or heat; defaults to the current HVAC mode.
+
+        Raises:
+            ServiceValidationError: If the mode has no limits, min exceeds
+                max, or the current target temperature of that mode would
+                fall outside the new range.
+            HomeAssistantError: If the device rejects or misses the write.
+        """
+        current_mode = self.coordinator.data.get(DATA_KEY_HVAC_MODE)
+        hvac_mode = hvac_mode or current_mode
+        if hvac_mode not in _MODE_LIMITS:
+            raise ServiceValidationError(
+                f"Cannot set temperature limits in {hvac_mode} mode",
+                translation_domain=DOMAIN,
+                translation_key="invalid_hvac_mode_for_temp",
+            )
+        min_setting, max_setting = _MODE_LIMITS[hvac_mode]
+        settings = {min_setting: int(min_temp), max_setting: int(max_temp)}
+        validate_limits(settings)
+
+        # The setpoint only constrains the limits of the mode it belongs to.
+        target_temp = self.coordinator.data.get(DATA_KEY_TARGET_TEMP)
+        mode_name = "cooling" if hvac_mode == HVACMode.COOL else "heating"
+        if hvac_mode == current_mode and target_temp is not None:
+            if min_temp > target_temp:
+                raise ServiceValidationError(
+                    f"{mode_name.capitalize()} min temperature ({min_temp}°C) must not be higher than target temperature ({target_temp}°C)",
+                    translation_domain=DOMAIN,
+                    translation_key=f"{mode_name}_min_above_target",
+                )
+            if max_temp < target_temp:
+                raise ServiceValidationError(
+                    f"{mode_name.capitalize()} max temperature ({max_temp}°C) must not be lower than target temperature ({target_temp}°C)",
+                    translation_domain=DOMAIN,
+                    translation_key=f"{mode_name}_max_below_target",
+                )
+
+        commands = settings_commands(self.coordinator.device, settings, self.coordinator.data)
+        if not commands:
+            _LOGGER.debug("[%s] %s limits already %s-%s", self._host, mode_name, min_temp, max_temp)
+            return
+        _LOGGER.debug("[%s] Setting %s limits to %s-%s", self._host, mode_name, min_temp, max_temp)
+        try:
+            await self.coordinator.async_send_commands(commands)
+        except Exception as exc:
+            _LOGGER.error("[%s] Error in set_limits: %s", self._host, exc)
+            raise HomeAssistantError(
+                f"Failed to set limits of {self.entity_id}: {exc}",
+                translation_domain=DOMAIN,
+                translation_key="command_failed",
+                translation_placeholders={"entity_id": self.entity_id, "error": str(exc)},
+            ) from exc
+        self.hass.data[DOMAIN][DATA_RECONCILER].async_set_desired(self._mac, settings)
+
+
 # ---------------------------------------------------------------------------
 # Max Temperature
 # ---------------------------------------------------------------------------
 
-class HysenMaxTempNumber(HysenEntity, NumberEntity):
+class HysenMaxTempNumber(HysenLimitNumber):
     """Maximum allowed setpoint temperature (mode-dependent)."""
 
     def __init__(self, device_data):
@@ -275,7 +420,7 @@ class HysenMaxTempNumber(HysenEntity, NumberEntity):
 # Min Temperature
 # ---------------------------------------------------------------------------
 
-class HysenMinTempNumber(HysenEntity, NumberEntity):
+class HysenMinTempNumber(HysenLimitNumber):
     """Minimum allowed setpoint temperature (mode-dependent)."""
 
     def __init__(self, device_data):
@@ -0,0 +1,278 @@
+"""
+On-demand profiling for the Hysen 2 Pipe Fan Coil integration.
+
+hysen2pfc.profile (admin only) profiles the running instance for a given
+number of seconds, writes the result to <config>/hysen2pfc/profiling/ and
+returns the top functions of the integration and of the hysen and
+broadlink libraries, so hot-path data can be taken from production without
+restarting Home Assistant under a profiler. Two profilers are available:
+
+- sampling (default): a thread takes the stacks of every thread every
+  PROFILE_SAMPLE_INTERVAL seconds and keeps those that run integration or
+  library code, i.e. the coroutines on the event loop and the device I/O
+  in the executor. Each sample is charged to the innermost such frame
+  (self) and to every such frame on the stack (cumulative); times are
+  wall-clock, so a device call blocked on the socket counts as well. The
+  overhead does not depend on what runs. Written as collapsed stacks
+  (sampling_<time>.txt), one "frame;frame;... count" line per stack, for
+  flamegraph.pl or speedscope.
+- cprofile: cProfile on the event loop thread; before Python 3.12 cProfile
+  only sees the thread that enabled it, so every executor job of the I/O
+  lanes (lane.py) then gets a profiler of its own, merged at the end.
+  Exact call counts, but everything on the event loop is slowed down while
+  it runs. Written as pstats data (cprofile_<time>.prof), for python -m
+  pstats or snakeviz.
+
+The files hold every function seen; only the summary returned by the
+service is restricted to the integration and its libraries. One profile
+runs at a time.
+"""
+
+import asyncio
+import cProfile
+import collections
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import broadlink
+import hysen
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.util import dt as dt_util
+from .const import (
+    DOMAIN,
+    DATA_PROFILER,
+    PROFILE_DIR,
+    PROFILE_MODE_CPROFILE,
+    PROFILE_MODE_SAMPLING,
+    PROFILE_SAMPLE_INTERVAL,
+    DEFAULT_PROFILE_DURATION,
+    DEFAULT_PROFILE_TOP,
+    ATTR_DURATION,
+    ATTR_MODE,
+    ATTR_TOP,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Source directories whose functions the summary is restricted to.
+_SCOPE = tuple(
+    os.path.dirname(os.path.abspath(path)) + os.sep
+    for path in (__file__, hysen.__file__, broadlink.__file__)
+)
+
+# From Python 3.12 cProfile is built on sys.monitoring and sees every thread.
+_CPROFILE_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+def _in_scope(filename: str) -> bool:
+    """Return True for a source file of the integration or its libraries."""
+    return filename.startswith(_SCOPE) and filename != __file__
+
+
+def _label(filename: str, lineno: int, name: str) -> str:
+    """Return the short pstats-like name of a function."""
+    return f"{os.path.basename(filename)}:{lineno}({name})"
+
+
+class HysenProfiler:
+    """One profiling session; started and stopped on the event loop."""
+
+    def __init__(self, mode: str) -> None:
+        """Initialise the session.
+
+        Args:
+            mode: PROFILE_MODE_SAMPLING or PROFILE_MODE_CPROFILE.
+        """
+        self.mode = mode
+        self._profile = None
+        self._job_profiles = []
+        self._sampler = None
+        self._stopped = threading.Event()
+        self._ticks = 0
+        self._elapsed = 0.0
+        self._stacks = collections.Counter()
+        self._self = collections.Counter()
+        self._cumulative = collections.Counter()
+
+    def start(self) -> None:
+        """Start profiling.
+
+        Raises:
+            ValueError: If another profiler is active (cprofile mode).
+        """
+        if self.mode == PROFILE_MODE_CPROFILE:
+            profile = cProfile.Profile()
+            profile.enable()
+            self._profile = profile
+            return
+        self._sampler = threading.Thread(target=self._run_sampler, name=f"{DOMAIN}_profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        """Stop profiling; the sampler thread finishes on its own."""
+        self._stopped.set()
+        if self._profile is not None:
+            self._profile.disable()
+
+    def wrap(self, func):
+        """Return an executor job wrapped to be profiled in its own thread.
+
+        Only needed by cProfile before Python 3.12; func is returned as is
+        otherwise.
+        """
+        if self.mode != PROFILE_MODE_CPROFILE or _CPROFILE_ALL_THREADS:
+            return func
+
+        def _profiled(*args):
+            if self._stopped.is_set():
+                return func(*args)
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return func(*args)
+            finally:
+                profile.disable()
+                self._job_profiles.append(profile)
+
+        return _profiled
+
+    def _run_sampler(self) -> None:
+        """Sample the stacks of every other thread until stopped."""
+        own = threading.get_ident()
+        start = time.monotonic()
+        while not self._stopped.wait(PROFILE_SAMPLE_INTERVAL):
+            self._ticks += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                scoped = [code for code in stack if _in_scope(code.co_filename)]
+                if not scoped:
+                    continue
+                self._stacks[tuple(reversed(stack))] += 1
+                self._self[scoped[0]] += 1
+                for code in set(scoped):
+                    self._cumulative[code] += 1
+        self._elapsed = time.monotonic() - start
+
+    def write(self, path: str, top: int) -> dict:
+        """Write the profile to path and return its summary; blocking.
+
+        Returns:
+            Dict with the number of 'samples' (sampling) or 'calls'
+            (cprofile) seen in scope and the 'top' functions by self time,
+            each with its calls (cprofile only), self_ms and cumulative_ms.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.mode == PROFILE_MODE_CPROFILE:
+            return self._write_cprofile(path, top)
+        self._sampler.join()
+        return self._write_sampling(path, top)
+
+    def _write_cprofile(self, path: str, top: int) -> dict:
+        """Write the merged pstats data and summarize it."""
+        stats = pstats.Stats(self._profile)
+        for profile in list(self._job_profiles):
+            stats.add(profile)
+        stats.dump_stats(path)
+        scoped = [
+            (key, calls, tottime, cumtime)
+            for key, (_, calls, tottime, cumtime, _) in stats.stats.items()
+            if _in_scope(key[0])
+        ]
+        scoped.sort(key=lambda entry: entry[2], reverse=True)
+        return {
+            "calls": sum(entry[1] for entry in scoped),
+            "top": [
+                {
+                    "function": _label(*key),
+                    "calls": calls,
+                    "self_ms": round(tottime * 1000, 3),
+                    "cumulative_ms": round(cumtime * 1000, 3),
+                }
+                for key, calls, tottime, cumtime in scoped[:top]
+            ],
+        }
+
+    def _write_sampling(self, path: str, top: int) -> dict:
+        """Write the collapsed stacks and summarize the samples."""
+        with open(path, "w", encoding="utf-8") as handle:
+            for stack, count in self._stacks.most_common():
+                frames = ";".join(f"{os.path.basename(code.co_filename)}:{code.co_name}" for code in stack)
+                handle.write(f"{frames} {count}\n")
+        # The actual interval, which the GIL and the host can stretch.
+        sample_ms = self._elapsed * 1000 / self._ticks if self._ticks else 0.0
+        return {
+            "samples": sum(self._stacks.values()),
+            "sample_ms": round(sample_ms, 3),
+            "top": [
+                {
+                    "function": _label(code.co_filename, code.co_firstlineno, code.co_name),
+                    "self_ms": round(count * sample_ms, 3),
+                    "cumulative_ms": round(self._cumulative[code] * sample_ms, 3),
+                }
+                for code, count in self._self.most_common(top)
+            ],
+        }
+
+
+async def async_profile(hass: HomeAssistant, service_call: ServiceCall) -> dict:
+    """Profile the integration for the requested duration.
+
+    Args:
+        hass: The Home Assistant instance.
+        service_call: The hysen2pfc.profile service call.
+
+    Returns:
+        Dict with the mode, duration, file name (in
+        <config>/hysen2pfc/profiling/) and the summary of HysenProfiler.write.
+
+    Raises:
+        ServiceValidationError: If a profile is already running, or if
+            another profiler is active (cprofile mode).
+    """
+    mode = service_call.data.get(ATTR_MODE, PROFILE_MODE_SAMPLING)
+    duration = service_call.data.get(ATTR_DURATION, DEFAULT_PROFILE_DURATION)
+    top = service_call.data.get(ATTR_TOP, DEFAULT_PROFILE_TOP)
+    if hass.data[DOMAIN].get(DATA_PROFILER) is not None:
+        _LOGGER.error("A profile is already running")
+        raise ServiceValidationError(
+            "A profile is already running",
+            translation_domain=DOMAIN,
+            translation_key="profile_running",
+        )
+
+    profiler = HysenProfiler(mode)
+    try:
+        profiler.start()
+    except ValueError as exc:
+        # Another cProfile or sys.monitoring tool, e.g. the profiler integration.
+        _LOGGER.error("Cannot start the profiler: %s", exc)
+        raise ServiceValidationError(
+            f"Cannot start the profiler: {exc}",
+            translation_domain=DOMAIN,
+            translation_key="profiler_unavailable",
+            translation_placeholders={"error": str(exc)},
+        ) from exc
+    hass.data[DOMAIN][DATA_PROFILER] = profiler
+    _LOGGER.info("Profiling for %d s (%s)", duration, mode)
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        hass.data[DOMAIN].pop(DATA_PROFILER, None)
+        profiler.stop()
+
+    stamp = dt_util.now().strftime("%Y%m%d_%H%M%S")
+    file = f"{mode}_{stamp}" + (".prof" if mode == PROFILE_MODE_CPROFILE else ".txt")
+    summary = await hass.async_add_executor_job(
+        profiler.write, os.path.join(hass.config.path(DOMAIN, PROFILE_DIR), file), top
+    )
+    _LOGGER.info("Wrote profile %s", file)
+    return {"mode": mode, "duration": duration, "file": file, **summary}
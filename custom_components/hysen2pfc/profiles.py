@@ -0,0 +1,155 @@
+"""
+Named settings profiles for the Hysen 2 Pipe Fan Coil integration.
+
+A profile is a reusable, named configuration such as "office cooling" or
+"storage frost-guard": any subset of the settings (see settings.py) plus
+any subset of the schedule fields (see fleet.py). Fields left out of a
+profile are never touched when it is applied.
+
+Profiles are kept in one .storage file (HysenProfileStore) and managed with
+hysen2pfc.save_profile and hysen2pfc.delete_profile.
+hysen2pfc.apply_profile pushes one profile to any number of devices through
+fleet.async_apply_configuration: devices already in compliance cost no
+device I/O, the others receive only the non-compliant fields, and the
+response reports the compliance of every device.
+"""
+
+import logging
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers.storage import Store
+from .const import (
+    DOMAIN,
+    DATA_PROFILE_STORE,
+    STORAGE_VERSION,
+    STORAGE_KEY_PROFILES,
+    DEFAULT_FLEET_CONCURRENCY,
+    ATTR_PROFILE,
+    ATTR_MAX_CONCURRENCY,
+)
+from .fleet import (
+    SCHEDULE_FIELDS,
+    async_apply_configuration,
+    async_require_devices,
+    validate_schedule_order,
+)
+from .settings import SETTINGS, validate_limits
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HysenProfileStore:
+    """Named profiles, persisted in a single .storage file.
+
+    Stored in hass.data[DOMAIN][DATA_PROFILE_STORE] and loaded once in
+    async_setup. The data is a dict of profile name ->
+    {"settings": {...}, "schedule": {...}}.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialise the store; call async_load before use."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY_PROFILES)
+        self._profiles: dict = {}
+
+    async def async_load(self) -> None:
+        """Load the profiles saved by a previous run."""
+        data = await self._store.async_load()
+        self._profiles = (data or {}).get("profiles", {})
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Return the data written to .storage."""
+        return {"profiles": self._profiles}
+
+    def get(self, name: str) -> dict:
+        """Return a profile.
+
+        Raises:
+            ServiceValidationError: If no profile has this name.
+        """
+        profile = self._profiles.get(name)
+        if profile is None:
+            _LOGGER.error("Unknown profile %s", name)
+            raise ServiceValidationError(
+                f"Unknown profile {name}",
+                translation_domain=DOMAIN,
+                translation_key="unknown_profile",
+                translation_placeholders={"profile": name},
+            )
+        return profile
+
+    @callback
+    def async_save(self, name: str, settings: dict, schedule: dict) -> None:
+        """Create or replace a profile."""
+        self._profiles[name] = {"settings": settings, "schedule": schedule}
+        self._store.async_delay_save(self._data_to_save)
+
+    @callback
+    def async_delete(self, name: str) -> None:
+        """Delete a profile.
+
+        Raises:
+            ServiceValidationError: If no profile has this name.
+        """
+        self.get(name)
+        del self._profiles[name]
+        self._store.async_delay_save(self._data_to_save)
+
+
+async def async_save_profile(hass: HomeAssistant, service_call: ServiceCall) -> dict:
+    """Create or replace a profile from the service data.
+
+    Raises:
+        ServiceValidationError: If a min/max limit pair is inverted or the
+            schedule times are out of order.
+    """
+    name = service_call.data[ATTR_PROFILE]
+    settings = {key: value for key, value in service_call.data.items() if key in SETTINGS}
+    schedule = {key: value for key, value in service_call.data.items() if key in SCHEDULE_FIELDS}
+    validate_limits(settings)
+    validate_schedule_order(schedule)
+    # Times are stored like the coordinator data ("H:MM") so that the
+    # profile is JSON serialisable and compares directly with a device.
+    schedule = {
+        key: f"{value.hour}:{value.minute:02d}" if hasattr(value, "hour") else value
+        for key, value in schedule.items()
+    }
+    hass.data[DOMAIN][DATA_PROFILE_STORE].async_save(name, settings, schedule)
+    _LOGGER.info("Saved profile %s: %s %s", name, settings, schedule)
+    return {"profile": name, "settings": settings, "schedule": schedule}
+
+
+async def async_delete_profile(hass: HomeAssistant, service_call: ServiceCall) -> None:
+    """Delete a profile.
+
+    Raises:
+        ServiceValidationError: If no profile has this name.
+    """
+    hass.data[DOMAIN][DATA_PROFILE_STORE].async_delete(service_call.data[ATTR_PROFILE])
+
+
+async def async_apply_profile(hass: HomeAssistant, service_call: ServiceCall) -> dict:
+    """Push a profile to every targeted device.
+
+    Args:
+        hass: The Home Assistant instance.
+        service_call: The hysen2pfc.apply_profile service call.
+
+    Returns:
+        Dict with a per-device 'devices' list ('changed' lists the fields
+        that were out of compliance, 'verified' whether the device complies
+        now) and a 'summary' of counts.
+
+    Raises:
+        ServiceValidationError: If the profile does not exist, no Hysen
+            device is targeted, or the profile breaks a limit on any
+            targeted device.
+    """
+    name = service_call.data[ATTR_PROFILE]
+    profile = hass.data[DOMAIN][DATA_PROFILE_STORE].get(name)
+    max_concurrency = service_call.data.get(ATTR_MAX_CONCURRENCY, DEFAULT_FLEET_CONCURRENCY)
+    devices = async_require_devices(hass, service_call)
+    response = await async_apply_configuration(
+        hass, devices, profile["settings"], profile["schedule"], max_concurrency, f"apply_profile {name}"
+    )
+    return {"profile": name, **response}
@@ -0,0 +1,178 @@
+"""
+Local state proxy for the Hysen 2 Pipe Fan Coil integration.
+
+The devices are small Wi-Fi controllers that cope badly with concurrent
+sessions, yet a building often has several consumers of the same units
+(a second Home Assistant instance, dashboards, scripts). With the proxy
+option enabled on a device, those consumers use Home Assistant's HTTP API
+instead of talking to the device, so the integration stays the only
+party that polls it:
+
+    GET  /api/hysen2pfc/devices
+         Cached state of every proxied device.
+    GET  /api/hysen2pfc/devices/{mac}
+         Cached state of one device: the coordinator data of the last poll
+         plus online, cached, data_age and updated.
+    POST /api/hysen2pfc/devices/{mac}/commands   (admin only)
+         {"command": "set_target_temp", "args": [22]} — one validating
+         library setter (PROXY_COMMANDS) with raw Hysen arguments. It goes through the device's I/O lane
+         (write rate limit, compaction) like an entity write. If the device
+         is unreachable, the command is parked in the offline command queue
+         and the response is 202 with "queued": true.
+
+Reads never cause device I/O. Requests need a Home Assistant access token
+(e.g. a long-lived token), like the rest of /api. The MAC may be given with
+or without separators.
+"""
+
+import logging
+from http import HTTPStatus
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView, require_admin
+from homeassistant.core import HomeAssistant, callback
+from .const import DOMAIN, DATA_RECONCILER
+
+_LOGGER = logging.getLogger(__name__)
+
+# Library setters accepted by the commands endpoint: only those that check
+# their value against the device state, as the entities do. The raw frame
+# writers (set_mode_fan, set_lock_power, set_options) are left out, since
+# they would accept combinations the integration rejects (e.g. fan_only
+# with the auto fan, or limits that exclude the setpoint). set_time is left
+# out as well: the clock is kept by the integration's own sync.
+PROXY_COMMANDS = (
+    "set_power",
+    "set_operation_mode",
+    "set_fan_mode",
+    "set_target_temp",
+    "set_key_lock",
+    "set_hysteresis",
+    "set_calibration",
+    "set_cooling_max_temp",
+    "set_cooling_min_temp",
+    "set_heating_max_temp",
+    "set_heating_min_temp",
+    "set_fan_control",
+    "set_frost_protection",
+    "set_weekly_schedule",
+    "set_daily_schedule",
+)
+
+
+def _normalize_mac(mac: str) -> str:
+    """Return a MAC address as lower-case hex digits only."""
+    return "".join(char for char in mac.lower() if char in "0123456789abcdef")
+
+
+def _proxied_devices(hass: HomeAssistant) -> list:
+    """Return the device_data of every loaded device with the proxy enabled."""
+    devices = []
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        device_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+        if device_data is not None and device_data.get("proxy"):
+            devices.append(device_data)
+    return devices
+
+
+def _find_device(hass: HomeAssistant, mac: str) -> dict | None:
+    """Return the proxied device_data with this MAC address, or None."""
+    wanted = _normalize_mac(mac)
+    for device_data in _proxied_devices(hass):
+        if _normalize_mac(device_data["mac"]) == wanted:
+            return device_data
+    return None
+
+
+def _device_state(device_data: dict) -> dict:
+    """Return the cached state of one device; no device I/O."""
+    coordinator = device_data["coordinator"]
+    return {
+        "name": device_data["name"],
+        "mac": device_data["mac"],
+        "online": coordinator.online,
+        "cached": coordinator.cached,
+        "data_age": coordinator.data_age,
+        "updated": coordinator.last_success.isoformat() if coordinator.last_success else None,
+        "data": coordinator.data,
+    }
+
+
+class HysenDevicesView(HomeAssistantView):
+    """Cached state of every proxied device."""
+
+    url = "/api/hysen2pfc/devices"
+    name = "api:hysen2pfc:devices"
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Return the cached state of every proxied device."""
+        hass = request.app["hass"]
+        return self.json([_device_state(device_data) for device_data in _proxied_devices(hass)])
+
+
+class HysenDeviceView(HomeAssistantView):
+    """Cached state of one proxied device."""
+
+    url = "/api/hysen2pfc/devices/{mac}"
+    name = "api:hysen2pfc:device"
+
+    async def get(self, request: web.Request, mac: str) -> web.Response:
+        """Return the cached state of one device."""
+        device_data = _find_device(request.app["hass"], mac)
+        if device_data is None:
+            return self.json_message(f"Unknown device {mac}", HTTPStatus.NOT_FOUND)
+        return self.json(_device_state(device_data))
+
+
+class HysenDeviceCommandView(HomeAssistantView):
+    """Commands submitted to one proxied device."""
+
+    url = "/api/hysen2pfc/devices/{mac}/commands"
+    name = "api:hysen2pfc:device:commands"
+
+    @require_admin
+    async def post(self, request: web.Request, mac: str) -> web.Response:
+        """Send one library setter call to the device.
+
+        Responds 200 once the device accepted the command, 202 if it was
+        queued because the device is unreachable, 400 for an unknown
+        command or arguments rejected by the library.
+        """
+        hass = request.app["hass"]
+        device_data = _find_device(hass, mac)
+        if device_data is None:
+            return self.json_message(f"Unknown device {mac}", HTTPStatus.NOT_FOUND)
+        try:
+            body = await request.json()
+        except ValueError:
+            return self.json_message("Invalid JSON", HTTPStatus.BAD_REQUEST)
+        if not isinstance(body, dict):
+            return self.json_message("Expected a JSON object", HTTPStatus.BAD_REQUEST)
+        command = body.get("command")
+        args = body.get("args", [])
+        if command not in PROXY_COMMANDS or not isinstance(args, list):
+            return self.json_message(f"Unsupported command {command}", HTTPStatus.BAD_REQUEST)
+
+        coordinator = device_data["coordinator"]
+        func = getattr(coordinator.device, command)
+        try:
+            await coordinator.async_send_command(func, *args)
+        except (TypeError, ValueError) as exc:
+            _LOGGER.error("[%s] Proxy %s%s rejected: %s", coordinator.host, command, tuple(args), exc)
+            return self.json_message(str(exc), HTTPStatus.BAD_REQUEST)
+        except Exception as exc:
+            queued = coordinator.command_queue.async_enqueue(func, tuple(args))
+            _LOGGER.warning("[%s] Proxy %s failed: %s%s", coordinator.host, command, exc,
+                            "; queued until the device is reachable" if queued else "")
+            if not queued:
+                return self.json_message(str(exc), HTTPStatus.SERVICE_UNAVAILABLE)
+            return self.json({"command": command, "queued": True}, HTTPStatus.ACCEPTED)
+        hass.data[DOMAIN][DATA_RECONCILER].async_update_from_command(device_data["mac"], func, tuple(args))
+        return self.json({"command": command, "queued": False})
+
+
+@callback
+def async_register_views(hass: HomeAssistant) -> None:
+    """Register the proxy views; called once from async_setup."""
+    hass.http.register_view(HysenDevicesView())
+    hass.http.register_view(HysenDeviceView())
+    hass.http.register_view(HysenDeviceCommandView())
@@ -0,0 +1,286 @@
+"""
+Desired-state reconciler for the Hysen 2 Pipe Fan Coil integration.
+
+A power cut or the device's front panel can silently change configuration
+settings (see settings.py). The reconciler remembers the configuration each
+device should have and puts it back.
+
+- Desired settings are only recorded explicitly: by
+  hysen2pfc.set_desired_settings, hysen2pfc.set_limits,
+  hysen2pfc.restore_settings and hysen2pfc.apply_profile. They are kept
+  per MAC address in one .storage file and listed in the device's
+  diagnostics (diagnostics.py). A device without recorded settings is never
+  touched; hysen2pfc.clear_desired_settings forgets them.
+- A write from an entity (or the local proxy) does not add a desired
+  setting, but updates one already recorded, so that the reconciler does
+  not revert a deliberate change of a setting it keeps.
+- Every coordinator update is compared against the desired settings. A
+  device that drifted is queued for correction.
+- A single worker corrects one device at a time with the minimal writes
+  (one set_options and/or one set_lock_power), pausing between devices so
+  that a fleet-wide power cut does not turn into a write storm. A device is
+  not corrected again within _COOLDOWN seconds of its last attempt.
+- Every correction fires a hysen2pfc_reconciled event with the drift found
+  and the outcome.
+"""
+
+import asyncio
+import logging
+import time
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.helpers.storage import Store
+from .const import (
+    DOMAIN,
+    DATA_RECONCILER,
+    STORAGE_VERSION,
+    STORAGE_KEY_DESIRED_SETTINGS,
+    EVENT_RECONCILED,
+)
+from .fleet import async_require_devices
+from .settings import (
+    SETTINGS,
+    SETTER_SETTINGS,
+    settings_commands,
+    settings_differences,
+    validate_limits,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Delay before desired settings are written to .storage.
+_SAVE_DELAY = 10
+# Pause between two device corrections, fleet wide.
+_SPACING = 2.0
+# Minimum time between two correction attempts on the same device.
+_COOLDOWN = 300
+
+# Outcome reported in the hysen2pfc_reconciled event.
+RESULT_UPDATED = "updated"
+RESULT_FAILED = "failed"
+
+
+class HysenReconciler:
+    """Fleet-wide keeper of desired device settings.
+
+    Stored in hass.data[DOMAIN][DATA_RECONCILER] and loaded once in
+    async_setup. Devices are registered with async_track from
+    async_setup_entry.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialise the reconciler; call async_load before use."""
+        self._hass = hass
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY_DESIRED_SETTINGS)
+        self._desired: dict = {}
+        # MAC -> device_data of every tracked (loaded) device.
+        self._devices: dict = {}
+        # MACs waiting for correction, in arrival order.
+        self._queue: dict = {}
+        self._last_attempt: dict = {}
+        self._worker = None
+
+    async def async_load(self) -> None:
+        """Load the desired settings saved by a previous run."""
+        data = await self._store.async_load()
+        self._desired = (data or {}).get("devices", {})
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Return the data written to .storage."""
+        return {"devices": self._desired}
+
+    # ------------------------------------------------------------------
+    # Desired state
+    # ------------------------------------------------------------------
+
+    def get_desired(self, mac: str) -> dict:
+        """Return the desired settings recorded for a device."""
+        return dict(self._desired.get(mac, {}))
+
+    @callback
+    def async_set_desired(self, mac: str, settings: dict) -> None:
+        """Merge settings into the desired configuration of a device."""
+        if not settings:
+            return
+        self._desired.setdefault(mac, {}).update(settings)
+        self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+        _LOGGER.debug("[%s] Desired settings: %s", mac, self._desired[mac])
+
+    @callback
+    def async_clear_desired(self, mac: str) -> None:
+        """Forget the desired configuration of a device."""
+        if self._desired.pop(mac, None) is not None:
+            self._queue.pop(mac, None)
+            self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+
+    @callback
+    def async_update_from_command(self, mac: str, func, args: tuple) -> None:
+        """Update a desired setting to the value of a successful entity write.
+
+        Settings that are not in the device's desired configuration are
+        left alone; a write never adds one.
+        """
+        mapping = SETTER_SETTINGS.get(getattr(func, "__name__", None))
+        if mapping is None or not args:
+            return
+        setting, to_hass = mapping
+        if setting not in self._desired.get(mac, {}):
+            return
+        self.async_set_desired(mac, {setting: to_hass(args[0])})
+
+    # ------------------------------------------------------------------
+    # Drift detection and correction
+    # ------------------------------------------------------------------
+
+    @callback
+    def async_track(self, device_data: dict):
+        """Start comparing a device's coordinator updates with its desired settings.
+
+        Returns:
+            Callable that stops tracking; pass it to entry.async_on_unload.
+        """
+        mac = device_data["mac"]
+        coordinator = device_data["coordinator"]
+        self._devices[mac] = device_data
+
+        @callback
+        def _async_check() -> None:
+            if coordinator.online:
+                self.async_check(mac)
+
+        remove_listener = coordinator.async_add_listener(_async_check)
+
+        @callback
+        def _async_untrack() -> None:
+            remove_listener()
+            self._devices.pop(mac, None)
+            self._queue.pop(mac, None)
+
+        return _async_untrack
+
+    @callback
+    def async_check(self, mac: str, force: bool = False) -> None:
+        """Queue a device for correction if it drifted from its desired settings.
+
+        Args:
+            mac: MAC address of a tracked device.
+            force: Ignore the per-device cooldown (explicit requests).
+        """
+        desired = self._desired.get(mac)
+        device_data = self._devices.get(mac)
+        if not desired or device_data is None or mac in self._queue:
+            return
+        if not settings_differences(desired, device_data["coordinator"].data):
+            return
+        if not force and time.monotonic() - self._last_attempt.get(mac, -_COOLDOWN) < _COOLDOWN:
+            return
+        self._queue[mac] = None
+        if self._worker is None or self._worker.done():
+            self._worker = self._hass.async_create_background_task(
+                self._async_run(), f"{DOMAIN}_reconciler"
+            )
+
+    async def _async_run(self) -> None:
+        """Correct queued devices one at a time."""
+        while self._queue:
+            mac = next(iter(self._queue))
+            self._queue.pop(mac)
+            if mac in self._devices and await self._async_reconcile(self._devices[mac]):
+                await asyncio.sleep(_SPACING)
+
+    async def _async_reconcile(self, device_data: dict) -> bool:
+        """Write the desired settings to one device and report the outcome.
+
+        Drift is computed again here rather than when the device was queued:
+        an entity write refreshes the coordinator before it is recorded, so
+        the drift seen by the listener may already be the new desired value.
+
+        Returns:
+            True if the device was written to.
+        """
+        mac = device_data["mac"]
+        coordinator = device_data["coordinator"]
+        desired = self._desired.get(mac, {})
+        drift = settings_differences(desired, coordinator.data)
+        if not drift:
+            return False
+        self._last_attempt[mac] = time.monotonic()
+        event = {"mac": mac, "name": device_data["name"], "drift": drift}
+        _LOGGER.info("[%s] Correcting drifted settings: %s", device_data["host"], drift)
+        try:
+            await coordinator.async_send_commands(settings_commands(coordinator.device, desired, coordinator.data))
+        except Exception as exc:
+            _LOGGER.error("[%s] Error in reconcile: %s", device_data["host"], exc)
+            event.update(result=RESULT_FAILED, verified=False, error=str(exc))
+        else:
+            event.update(
+                result=RESULT_UPDATED,
+                verified=coordinator.online
+                and not settings_differences(desired, coordinator.data),
+            )
+        self._hass.bus.async_fire(EVENT_RECONCILED, event)
+        return True
+
+
+# ---------------------------------------------------------------------------
+# set_desired_settings / clear_desired_settings
+# ---------------------------------------------------------------------------
+
+async def async_set_desired_settings(hass: HomeAssistant, service_call: ServiceCall) -> dict:
+    """Record desired settings for every targeted device and correct drift now.
+
+    The settings are merged into each device's recorded configuration. Every
+    device is validated before anything is recorded, so an inverted min/max
+    pair on one device rejects the whole call. Devices that differ are
+    queued for the reconciler immediately, bypassing the cooldown.
+
+    Args:
+        hass: The Home Assistant instance.
+        service_call: The hysen2pfc.set_desired_settings service call.
+
+    Returns:
+        Dict with a per-device 'devices' list holding the drift that will be
+        corrected.
+
+    Raises:
+        ServiceValidationError: If no Hysen device is targeted or a min/max
+            limit pair would be inverted.
+    """
+    reconciler = hass.data[DOMAIN][DATA_RECONCILER]
+    settings = {key: value for key, value in service_call.data.items() if key in SETTINGS}
+    validate_limits(settings)
+    devices = async_require_devices(hass, service_call)
+
+    desired = {}
+    for device_data in devices:
+        merged = {**reconciler.get_desired(device_data["mac"]), **settings}
+        validate_limits(merged, device_data["coordinator"].data)
+        desired[device_data["mac"]] = merged
+
+    results = []
+    for device_data in devices:
+        mac = device_data["mac"]
+        reconciler.async_set_desired(mac, settings)
+        reconciler.async_check(mac, force=True)
+        results.append({
+            "name": device_data["name"],
+            "mac": mac,
+            "drift": settings_differences(desired[mac], device_data["coordinator"].data),
+        })
+    return {"devices": results}
+
+
+async def async_clear_desired_settings(hass: HomeAssistant, service_call: ServiceCall) -> None:
+    """Forget the desired settings of every targeted device.
+
+    Args:
+        hass: The Home Assistant instance.
+        service_call: The hysen2pfc.clear_desired_settings service call.
+
+    Raises:
+        ServiceValidationError: If no Hysen device is targeted.
+    """
+    reconciler = hass.data[DOMAIN][DATA_RECONCILER]
+    for device_data in async_require_devices(hass, service_call):
+        reconciler.async_clear_desired(device_data["mac"])
+        _LOGGER.info("[%s] Cleared desired settings", device_data["host"])
@@ -6,14 +6,34 @@ Provides the following sensors:
 - HysenDeviceTimeSensor   — the device's internal clock (date/time/weekday).
 - HysenIPSensor           — device IP address (diagnostic).
 - HysenMACSensor          — device MAC address (diagnostic).
+- HysenIOQueueSensor      — most calls waiting in the device's I/O lane
+                            since the previous update, with lane
+                            statistics as attributes (diagnostic).
+- HysenThrottledWritesSensor — device writes held back by the write rate
+                            limit (diagnostic).
+- HysenPollTimeSensor     — 95th percentile poll round trip, with every
+                            poll and command timing as attributes
+                            (diagnostic, disabled by default).
+- HysenPollFailuresSensor — polls that failed on every attempt, with the
+                            retry and command failure counters and the last
+                            error class (diagnostic, disabled by default).
+- HysenLoopTimeSensor     — event loop time of the device's coordinator
+                            updates, p50/p99; only with the loop_budget
+                            option set (diagnostic, disabled by default).
+- HysenFleetMetricsSensor — the same timings and counters summed over every
+                            device; one for the whole integration
+                            (diagnostic, disabled by default).
+
+See metrics.py for what each timing measures.
 """
 
 import logging
-from homeassistant.core import HomeAssistant
-from homeassistant.components.sensor import SensorEntity, SensorDeviceClass
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass
 from homeassistant.const import EntityCategory
 from .const import (
     DOMAIN,
+    DATA_FLEET_METRICS,
     UnitOfTime,
     DATA_KEY_TIME_VALVE_ON,
     DATA_KEY_CLOCK_HOUR,
@@ -50,12 +70,22 @@ async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entitie
         async_add_entities: Callback used to register new entities with HA.
     """
     device_data = hass.data[DOMAIN][config_entry.entry_id]
+    fleet_metrics = hass.data[DOMAIN][DATA_FLEET_METRICS]
     async_add_entities([
         HysenTimeValveOnSensor(device_data),
         HysenDeviceTimeSensor(device_data),
         HysenIPSensor(device_data),
         HysenMACSensor(device_data),
+        HysenIOQueueSensor(device_data),
+        HysenThrottledWritesSensor(device_data),
+        HysenPollTimeSensor(device_data),
+        HysenPollFailuresSensor(device_data),
     ])
+    if device_data["coordinator"].loop_monitor is not None:
+        async_add_entities([HysenLoopTimeSensor(device_data)])
+    config_entry.async_on_unload(fleet_metrics.async_add_platform(
+        config_entry.entry_id, async_add_entities, lambda: HysenFleetMetricsSensor(fleet_metrics)
+    ))
 
 
 class HysenTimeValveOnSensor(HysenEntity, SensorEntity):
@@ -140,16 +170,17 @@ class HysenDeviceTimeSensor(HysenEntity, SensorEntity):
         parsing the state string.
 
         Returns:
-            Dict with time component keys, or an empty dict if data is
-            incomplete.
+            Dict with time component keys (plus data_age while the data is
+            stale), or an empty dict if data is incomplete.
         """
         hour = self.coordinator.data.get(DATA_KEY_CLOCK_HOUR)
         minute = self.coordinator.data.get(DATA_KEY_CLOCK_MINUTE)
         second = self.coordinator.data.get(DATA_KEY_CLOCK_SECOND)
         weekday = self.coordinator.data.get(DATA_KEY_CLOCK_WEEKDAY)
 
+        attributes = super().extra_state_attributes or {}
         if None in (hour, minute, second, weekday):
-            return {}
+            return attributes
 
         return {
             "hour": hour,
@@ -157,6 +188,7 @@ class HysenDeviceTimeSensor(HysenEntity, SensorEntity):
             "second": second,
             "weekday": weekday,
             "weekday_name": WEEKDAY_MAP.get(weekday, "Unknown"),
+            **attributes,
         }
 
 
@@ -221,3 +253,236 @@ class HysenMACSensor(HysenEntity, SensorEntity):
             MAC address string in 'aa:bb:cc:dd:ee:ff' format.
         """
         return self._mac
+
+
+class HysenIOQueueSensor(HysenEntity, SensorEntity):
+    """Diagnostic sensor exposing the device's I/O lane (see lane.py).
+
+    The state is the highest number of device calls waiting at once since
+    the previous coordinator update (the poll itself included, so 1 means
+    no call waited behind another). Updates run once the lane has served
+    the poll, when the queue is almost always empty again, so the current
+    depth would hardly ever show a backlog. Attributes carry the lane counters (commands, polls, merged
+    polls, maximum depth) and the last, average and maximum time commands
+    and polls waited for the device, in seconds.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_icon = "mdi:tray-full"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, device_data: dict) -> None:
+        """Initialise the I/O queue sensor.
+
+        Args:
+            device_data: Device-specific data dict from hass.data[DOMAIN].
+        """
+        super().__init__(device_data["coordinator"], device_data)
+        self._attr_unique_id = f"{device_data['mac']}_io_queue"
+        self._attr_name = f"{device_data['name']} I/O Queue"
+        self._attr_native_value = self.coordinator.lane.pop_peak_depth()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Take the peak depth since the previous update."""
+        self._attr_native_value = self.coordinator.lane.pop_peak_depth()
+        super()._handle_coordinator_update()
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the lane statistics."""
+        return {**self.coordinator.lane.stats, **(super().extra_state_attributes or {})}
+
+
+class HysenThrottledWritesSensor(HysenEntity, SensorEntity):
+    """Diagnostic counter of writes held back by the write rate limit.
+
+    The state is the number of device writes that had to wait for the
+    lane's token bucket since the integration started; compacted_writes
+    counts the writes merged into an earlier queued write to the same
+    setter while waiting.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_icon = "mdi:speedometer-slow"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, device_data: dict) -> None:
+        """Initialise the throttled writes sensor.
+
+        Args:
+            device_data: Device-specific data dict from hass.data[DOMAIN].
+        """
+        super().__init__(device_data["coordinator"], device_data)
+        self._attr_unique_id = f"{device_data['mac']}_throttled_writes"
+        self._attr_name = f"{device_data['name']} Throttled Writes"
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of writes that waited for the rate limit."""
+        return self.coordinator.lane.stats["throttled_writes"]
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the compaction counter."""
+        return {
+            "compacted_writes": self.coordinator.lane.stats["compacted_writes"],
+            **(super().extra_state_attributes or {}),
+        }
+
+
+class HysenPollTimeSensor(HysenEntity, SensorEntity):
+    """Diagnostic sensor of the device's poll and command timings.
+
+    The state is the 95th percentile time on the wire of a poll, in ms.
+    Attributes hold count, mean, p50, p95 and max (ms) of every timing in
+    metrics.TIMINGS. Percentiles are bucket bounds, not exact values.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = "mdi:timer-outline"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, device_data: dict) -> None:
+        """Initialise the poll time sensor.
+
+        Args:
+            device_data: Device-specific data dict from hass.data[DOMAIN].
+        """
+        super().__init__(device_data["coordinator"], device_data)
+        self._attr_unique_id = f"{device_data['mac']}_poll_time"
+        self._attr_name = f"{device_data['name']} Poll Time"
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the 95th percentile poll round trip in ms."""
+        return self.coordinator.metrics.histograms["poll_rtt"].percentile(0.95)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the summary of every timing."""
+        return {
+            **{name: histogram.summary() for name, histogram in self.coordinator.metrics.histograms.items()},
+            **(super().extra_state_attributes or {}),
+        }
+
+
+class HysenPollFailuresSensor(HysenEntity, SensorEntity):
+    """Diagnostic counter of polls that failed on every attempt.
+
+    Stays available while the device is unreachable, so failures can be
+    followed as they happen. Attributes hold the other counters (polls,
+    poll_retries, commands, command_failures) and the class and time of the
+    last error.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = "mdi:alert-circle-outline"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, device_data: dict) -> None:
+        """Initialise the poll failures sensor.
+
+        Args:
+            device_data: Device-specific data dict from hass.data[DOMAIN].
+        """
+        super().__init__(device_data["coordinator"], device_data)
+        self._attr_unique_id = f"{device_data['mac']}_poll_failures"
+        self._attr_name = f"{device_data['name']} Poll Failures"
+
+    @property
+    def available(self) -> bool:
+        """Return True; the counters are meaningful while the device is unreachable."""
+        return True
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of polls that failed on every attempt."""
+        return self.coordinator.metrics.counters["poll_failures"]
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the other counters and the last error."""
+        metrics = self.coordinator.metrics
+        return {
+            **{name: value for name, value in metrics.counters.items() if name != "poll_failures"},
+            "last_error": metrics.last_error,
+            "last_error_at": metrics.last_error_at.isoformat() if metrics.last_error_at else None,
+            **(super().extra_state_attributes or {}),
+        }
+
+
+class HysenLoopTimeSensor(HysenEntity, SensorEntity):
+    """Diagnostic sensor of the event loop time of coordinator updates.
+
+    The state is the 99th percentile time, in ms, of one update's listener
+    fan-out (every entity's _handle_coordinator_update and state write).
+    Attributes hold the budget, the number of updates and of updates over
+    budget, p50/p99/max of the fan-out, p50/p99 of the state writes within
+    it and the slowest entity of the last update.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = "mdi:timer-sand"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, device_data: dict) -> None:
+        """Initialise the loop time sensor.
+
+        Args:
+            device_data: Device-specific data dict from hass.data[DOMAIN].
+        """
+        super().__init__(device_data["coordinator"], device_data)
+        self._attr_unique_id = f"{device_data['mac']}_loop_time"
+        self._attr_name = f"{device_data['name']} Loop Time"
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the 99th percentile fan-out time in ms."""
+        return self.coordinator.loop_monitor.batches.percentile(0.99)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the loop monitor summary."""
+        return {**self.coordinator.loop_monitor.summary(), **(super().extra_state_attributes or {})}
+
+
+class HysenFleetMetricsSensor(SensorEntity):
+    """Diagnostic summary of the poll metrics of every device.
+
+    Not tied to a device; refreshed by Home Assistant's sensor polling. The
+    state is the fleet's 95th percentile poll round trip in ms; attributes
+    hold the device count, the summed counters, the most recent error (with
+    the MAC of its device) and the merged timing summaries.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = "mdi:chart-box-outline"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_unique_id = f"{DOMAIN}_fleet_metrics"
+    _attr_name = "Hysen Fleet Poll Time"
+
+    def __init__(self, fleet_metrics) -> None:
+        """Initialise the fleet sensor.
+
+        Args:
+            fleet_metrics: The HysenFleetMetrics of the integration.
+        """
+        self._fleet_metrics = fleet_metrics
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the fleet's 95th percentile poll round trip in ms."""
+        return self._fleet_metrics.poll_rtt_p95()
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the fleet summary."""
+        return self._fleet_metrics.summary()
@@ -0,0 +1,598 @@
+"""
+Domain services for the Hysen 2 Pipe Fan Coil integration.
+
+All hysen2pfc.* services that are not bound to a single entity platform are
+declared in the SERVICES table and registered exactly once from async_setup,
+so adding, reloading or removing config entries never touches the service
+registry.
+
+Each table entry is one of two kinds:
+
+- Climate services ('fields', 'method', optional 'validator'): the targets
+  are resolved through the shared HysenEntityIndex, every target is
+  validated against its coordinator snapshot, and the entity method is
+  called directly on all targets concurrently.
+- Fleet services ('handler'): the handler receives (hass, service_call) and
+  resolves its own targets, typically one write batch per physical device
+  (see fleet.py, reconciler.py, backup.py and profiles.py).
+
+Services marked 'admin' (profile, see profiler.py; memory_usage and
+trace_memory, see memory.py) reject calls from non-admin users, like Home
+Assistant's own admin services.
+
+set_limits moves the min and max of one mode together on the limit number
+entities (number.py), one write per targeted device.
+
+set_state is the composite climate service: mode, fan, setpoint and preset
+are validated together and written as one batch per unit, so a scene costs
+one command cycle instead of up to five.
+
+Adding a service therefore means adding one declarative entry here plus its
+services.yaml and translation strings.
+
+The standard HA climate services (climate.set_hvac_mode etc.) do not respect the
+dynamic mode lists that the coordinator provides. The custom climate services
+replicate that behaviour with the same validation logic used by the climate
+entity, so that automations see the same constraints as the UI.
+"""
+
+import logging
+import time
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError, Unauthorized, UnknownUser
+from homeassistant.helpers import config_validation as cv
+from .const import (
+    DOMAIN,
+    DATA_ENTITY_INDEX,
+    DATA_KEY_HVAC_MODE,
+    DATA_KEY_FAN_MODE,
+    DATA_KEY_MIN_TEMP,
+    DATA_KEY_MAX_TEMP,
+    DEFAULT_MIN_TEMP,
+    DEFAULT_MAX_TEMP,
+    DEFAULT_FLEET_CONCURRENCY,
+    MAX_FLEET_CONCURRENCY,
+    DEFAULT_PROFILE_DURATION,
+    MAX_PROFILE_DURATION,
+    DEFAULT_PROFILE_TOP,
+    MAX_PROFILE_TOP,
+    PROFILE_MODES,
+    PROFILE_MODE_SAMPLING,
+    ATTR_ENTITY_ID,
+    ATTR_HVAC_MODE,
+    ATTR_MIN_TEMP,
+    ATTR_MAX_TEMP,
+    ATTR_TEMPERATURE,
+    ATTR_FAN_MODE,
+    ATTR_PRESET_MODE,
+    ATTR_MAX_CONCURRENCY,
+    HVAC_MODES_NO_FAN,
+    FAN_AUTO,
+    FAN_MODES_MANUAL,
+    SERVICE_SET_TEMPERATURE,
+    SERVICE_SET_HVAC_MODE,
+    SERVICE_SET_FAN_MODE,
+    SERVICE_SET_PRESET_MODE,
+    SERVICE_SET_STATE,
+    SERVICE_SET_LIMITS,
+    SERVICE_APPLY_SCHEDULE,
+    SERVICE_SET_DESIRED_SETTINGS,
+    SERVICE_CLEAR_DESIRED_SETTINGS,
+    SERVICE_EXPORT_SETTINGS,
+    SERVICE_RESTORE_SETTINGS,
+    SERVICE_SAVE_PROFILE,
+    SERVICE_DELETE_PROFILE,
+    SERVICE_APPLY_PROFILE,
+    SERVICE_PROFILE,
+    SERVICE_MEMORY_USAGE,
+    SERVICE_TRACE_MEMORY,
+    ATTR_FILE,
+    ATTR_PROFILE,
+    ATTR_DURATION,
+    ATTR_MODE,
+    ATTR_TOP,
+    HVACMode,
+)
+from .backup import async_export_settings, async_restore_settings
+from .climate import build_state_commands
+from .fleet import SCHEDULE_FIELDS, SCHEDULE_SCHEMA, async_apply_schedule, async_fan_out
+from .memory import async_memory_usage, async_trace_memory
+from .number import SET_LIMITS_SCHEMA, async_resolve_limit_entities
+from .profiler import async_profile
+from .profiles import async_save_profile, async_delete_profile, async_apply_profile
+from .reconciler import async_set_desired_settings, async_clear_desired_settings
+from .settings import SETTINGS, SETTINGS_SCHEMA
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Per-entity validators
+# ---------------------------------------------------------------------------
+# Called with (coordinator, entity_id, data) for every target before any
+# write is sent, where data holds the service fields that were provided;
+# they raise ServiceValidationError to reject the whole call.
+
+def _validate_hvac_mode(coordinator, entity_id: str, data: dict) -> None:
+    """Reject fan_only while the device runs the fan in auto mode."""
+    hvac_mode = data[ATTR_HVAC_MODE]
+    if hvac_mode != HVACMode.FAN_ONLY:
+        return
+    fan_mode = coordinator.data.get(DATA_KEY_FAN_MODE)
+    _LOGGER.debug("[%s] Current fan mode: %s", entity_id, fan_mode)
+    if fan_mode == FAN_AUTO:
+        _LOGGER.error("[%s] HVAC mode %s is not allowed when fan mode is auto. Valid fan modes are: %s",
+                      entity_id, hvac_mode, ", ".join(FAN_MODES_MANUAL))
+        raise ServiceValidationError(
+            f"HVAC mode {hvac_mode} is not allowed when fan mode is auto. Set fan mode to low, medium, or high first.",
+            translation_domain=DOMAIN,
+            translation_key="fan_only_with_auto_fan",
+        )
+
+
+def _validate_temperature(coordinator, entity_id: str, data: dict) -> None:
+    """Reject a temperature outside the live limits of the current mode."""
+    temperature = data[ATTR_TEMPERATURE]
+    min_temp = coordinator.data.get(DATA_KEY_MIN_TEMP)
+    if min_temp is None:
+        min_temp = DEFAULT_MIN_TEMP
+    max_temp = coordinator.data.get(DATA_KEY_MAX_TEMP)
+    if max_temp is None:
+        max_temp = DEFAULT_MAX_TEMP
+    try:
+        temp_value = float(temperature)
+    except (TypeError, ValueError):
+        _LOGGER.error("Invalid temperature type: %s (expected a number)", temperature)
+        raise ServiceValidationError(
+            f"Invalid temperature type: {temperature} (expected a number)",
+            translation_domain=DOMAIN,
+            translation_key="invalid_temperature_type",
+        )
+    if temp_value < min_temp or temp_value > max_temp:
+        _LOGGER.error(
+            "[%s] Temperature %s is out of range. Valid range is %s to %s",
+            entity_id, temp_value, min_temp, max_temp
+        )
+        raise ServiceValidationError(
+            f"Temperature {temp_value} is out of range for {entity_id}. Valid range is {min_temp} to {max_temp}.",
+            translation_domain=DOMAIN,
+            translation_key="temperature_out_of_range",
+        )
+
+
+def _validate_fan_mode(coordinator, entity_id: str, data: dict) -> None:
+    """Reject the auto fan mode while the device is in fan_only."""
+    fan_mode = data[ATTR_FAN_MODE]
+    if fan_mode != FAN_AUTO:
+        return
+    hvac_mode = coordinator.data.get(DATA_KEY_HVAC_MODE)
+    _LOGGER.debug("[%s] Current HVAC mode: %s", entity_id, hvac_mode)
+    if hvac_mode == HVACMode.FAN_ONLY:
+        _LOGGER.error("[%s] fan mode %s is not allowed when HVAC mode is fan_only. Valid HVAC modes are: %s",
+                      entity_id, fan_mode, ", ".join(HVAC_MODES_NO_FAN))
+        raise ServiceValidationError(
+            f"fan mode {fan_mode} is not allowed when HVAC mode is fan_only. Set HVAC mode to off, heat, or cool first.",
+            translation_domain=DOMAIN,
+            translation_key="auto_fan_with_fan_only",
+        )
+
+
+def _validate_state(coordinator, entity_id: str, data: dict) -> None:
+    """Check the combined set_state target with the climate entity's rules."""
+    build_state_commands(coordinator, **data)
+
+
+# ---------------------------------------------------------------------------
+# Number services
+# ---------------------------------------------------------------------------
+
+async def _async_set_limits(hass: HomeAssistant, service_call: ServiceCall) -> None:
+    """Set the limits of every targeted device, with one write per device."""
+    entities = async_resolve_limit_entities(hass, service_call)
+    data = {
+        field: service_call.data[field]
+        for field in (ATTR_MIN_TEMP, ATTR_MAX_TEMP, ATTR_HVAC_MODE)
+        if field in service_call.data
+    }
+    await _async_dispatch_to_entities(
+        service_call, f"{DOMAIN}.{service_call.service}", entities, "async_set_limits", **data
+    )
+
+
+# ---------------------------------------------------------------------------
+# Service table
+# ---------------------------------------------------------------------------
+# Climate service keys:
+#   schema     voluptuous schema of the service data.
+#   fields     service fields forwarded to the entity method as keywords;
+#              at least one must be present.
+#   method     HysenClimate coroutine method called on every target.
+#   validator  optional per-target check, see above.
+# Fleet service keys:
+#   schema     voluptuous schema of the service data.
+#   handler    coroutine (hass, service_call) -> response or None.
+#   supports_response  SupportsResponse value (default NONE).
+#   admin      True to reject calls from non-admin users (default False).
+
+_MAX_CONCURRENCY = vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_FLEET_CONCURRENCY))
+
+SERVICES = {
+    SERVICE_SET_HVAC_MODE: {
+        "schema": vol.Schema({
+            vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+            vol.Required(ATTR_HVAC_MODE): cv.string,  # Validate as string, check in async_set_hvac_mode
+        }),
+        "fields": (ATTR_HVAC_MODE,),
+        "method": "async_set_hvac_mode",
+        "validator": _validate_hvac_mode,
+    },
+    SERVICE_SET_TEMPERATURE: {
+        "schema": vol.Schema({
+            vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+            vol.Required(ATTR_TEMPERATURE): cv.positive_float,  # Accept positive float, validation in async_set_temperature
+        }),
+        "fields": (ATTR_TEMPERATURE,),
+        "method": "async_set_temperature",
+        "validator": _validate_temperature,
+    },
+    SERVICE_SET_FAN_MODE: {
+        "schema": vol.Schema({
+            vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+            vol.Required(ATTR_FAN_MODE): cv.string,  # Validate as string, check in async_set_fan_mode
+        }),
+        "fields": (ATTR_FAN_MODE,),
+        "method": "async_set_fan_mode",
+        "validator": _validate_fan_mode,
+    },
+    SERVICE_SET_PRESET_MODE: {
+        "schema": vol.Schema({
+            vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+            vol.Required(ATTR_PRESET_MODE): cv.string,  # Validate as string, check in async_set_preset_mode
+        }),
+        "fields": (ATTR_PRESET_MODE,),
+        "method": "async_set_preset_mode",
+    },
+    SERVICE_SET_STATE: {
+        "schema": vol.All(
+            vol.Schema({
+                vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+                vol.Optional(ATTR_HVAC_MODE): cv.string,
+                vol.Optional(ATTR_FAN_MODE): cv.string,
+                vol.Optional(ATTR_TEMPERATURE): cv.positive_float,
+                vol.Optional(ATTR_PRESET_MODE): cv.string,
+            }),
+            cv.has_at_least_one_key(ATTR_HVAC_MODE, ATTR_FAN_MODE, ATTR_TEMPERATURE, ATTR_PRESET_MODE),
+        ),
+        "fields": (ATTR_HVAC_MODE, ATTR_FAN_MODE, ATTR_TEMPERATURE, ATTR_PRESET_MODE),
+        "method": "async_set_state",
+        "validator": _validate_state,
+    },
+    SERVICE_SET_LIMITS: {
+        "schema": cv.make_entity_service_schema(SET_LIMITS_SCHEMA),
+        "handler": _async_set_limits,
+    },
+    SERVICE_APPLY_SCHEDULE: {
+        "schema": vol.All(
+            cv.make_entity_service_schema({
+                **SCHEDULE_SCHEMA,
+                vol.Optional(ATTR_MAX_CONCURRENCY, default=DEFAULT_FLEET_CONCURRENCY): _MAX_CONCURRENCY,
+            }),
+            cv.has_at_least_one_key(*SCHEDULE_FIELDS),
+        ),
+        "handler": async_apply_schedule,
+        "supports_response": SupportsResponse.OPTIONAL,
+    },
+    SERVICE_SET_DESIRED_SETTINGS: {
+        "schema": vol.All(
+            cv.make_entity_service_schema(SETTINGS_SCHEMA),
+            cv.has_at_least_one_key(*SETTINGS),
+        ),
+        "handler": async_set_desired_settings,
+        "supports_response": SupportsResponse.OPTIONAL,
+    },
+    SERVICE_CLEAR_DESIRED_SETTINGS: {
+        "schema": cv.make_entity_service_schema({}),
+        "handler": async_clear_desired_settings,
+    },
+    SERVICE_EXPORT_SETTINGS: {
+        "schema": cv.make_entity_service_schema({}),
+        "handler": async_export_settings,
+        "supports_response": SupportsResponse.OPTIONAL,
+    },
+    SERVICE_RESTORE_SETTINGS: {
+        "schema": cv.make_entity_service_schema({
+            vol.Required(ATTR_FILE): cv.string,
+            vol.Optional(ATTR_MAX_CONCURRENCY, default=DEFAULT_FLEET_CONCURRENCY): _MAX_CONCURRENCY,
+        }),
+        "handler": async_restore_settings,
+        "supports_response": SupportsResponse.OPTIONAL,
+    },
+    SERVICE_SAVE_PROFILE: {
+        "schema": vol.All(
+            vol.Schema({
+                vol.Required(ATTR_PROFILE): cv.string,
+                **SETTINGS_SCHEMA,
+                **SCHEDULE_SCHEMA,
+            }),
+            cv.has_at_least_one_key(*SETTINGS, *SCHEDULE_FIELDS),
+        ),
+        "handler": async_save_profile,
+        "supports_response": SupportsResponse.OPTIONAL,
+    },
+    SERVICE_DELETE_PROFILE: {
+        "schema": vol.Schema({vol.Required(ATTR_PROFILE): cv.string}),
+        "handler": async_delete_profile,
+    },
+    SERVICE_APPLY_PROFILE: {
+        "schema": cv.make_entity_service_schema({
+            vol.Required(ATTR_PROFILE): cv.string,
+            vol.Optional(ATTR_MAX_CONCURRENCY, default=DEFAULT_FLEET_CONCURRENCY): _MAX_CONCURRENCY,
+        }),
+        "handler": async_apply_profile,
+        "supports_response": SupportsResponse.OPTIONAL,
+    },
+    SERVICE_PROFILE: {
+        "schema": vol.Schema({
+            vol.Optional(ATTR_DURATION, default=DEFAULT_PROFILE_DURATION):
+                vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_PROFILE_DURATION)),
+            vol.Optional(ATTR_MODE, default=PROFILE_MODE_SAMPLING): vol.In(PROFILE_MODES),
+            vol.Optional(ATTR_TOP, default=DEFAULT_PROFILE_TOP):
+                vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_PROFILE_TOP)),
+        }),
+        "handler": async_profile,
+        "supports_response": SupportsResponse.OPTIONAL,
+        "admin": True,
+    },
+    SERVICE_MEMORY_USAGE: {
+        "schema": cv.make_entity_service_schema({}),
+        "handler": async_memory_usage,
+        "supports_response": SupportsResponse.ONLY,
+        "admin": True,
+    },
+    SERVICE_TRACE_MEMORY: {
+        "schema": vol.Schema({
+            vol.Optional(ATTR_DURATION, default=DEFAULT_PROFILE_DURATION):
+                vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_PROFILE_DURATION)),
+            vol.Optional(ATTR_TOP, default=DEFAULT_PROFILE_TOP):
+                vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_PROFILE_TOP)),
+        }),
+        "handler": async_trace_memory,
+        "supports_response": SupportsResponse.OPTIONAL,
+        "admin": True,
+    },
+}
+
+
+# ---------------------------------------------------------------------------
+# Registration and dispatch
+# ---------------------------------------------------------------------------
+
+@callback
+def async_register_services(hass: HomeAssistant) -> None:
+    """Register every service in SERVICES.
+
+    Called once from async_setup. The services stay registered for the
+    lifetime of the integration; a call that targets no loaded device is
+    rejected with no_valid_entity_ids.
+    """
+    for service, spec in SERVICES.items():
+        hass.services.async_register(
+            DOMAIN,
+            service,
+            _async_handle_service,
+            schema=spec["schema"],
+            supports_response=spec.get("supports_response", SupportsResponse.NONE),
+        )
+    _LOGGER.debug("Registered services: %s", ", ".join(SERVICES))
+
+
+async def _async_handle_service(service_call: ServiceCall):
+    """Dispatch a hysen2pfc service call according to its SERVICES entry."""
+    spec = SERVICES[service_call.service]
+    if spec.get("admin"):
+        await _async_require_admin(service_call)
+    if "handler" in spec:
+        return await spec["handler"](service_call.hass, service_call)
+    await _async_handle_climate_service(service_call.hass, service_call, spec)
+    return None
+
+
+async def _async_require_admin(service_call: ServiceCall) -> None:
+    """Reject a call made by a user that is not an admin.
+
+    Calls without a user (automations, scripts) are allowed, as with
+    homeassistant.helpers.service.async_register_admin_service.
+    """
+    user_id = service_call.context.user_id
+    if user_id is None:
+        return
+    user = await service_call.hass.auth.async_get_user(user_id)
+    if user is None:
+        raise UnknownUser(context=service_call.context)
+    if not user.is_admin:
+        raise Unauthorized(context=service_call.context)
+
+
+def _async_lookup_climate(hass: HomeAssistant, entity_id: str):
+    """Return (coordinator, entity) for a Hysen climate entity, or None.
+
+    Resolves through the entity index so that validation reads the live
+    coordinator snapshot rather than state machine attributes.
+    """
+    ref = hass.data[DOMAIN][DATA_ENTITY_INDEX].get(entity_id)
+    if ref is None:
+        _LOGGER.error("Entity %s not found", entity_id)
+        return None
+    if not ref[1].entity_id.startswith("climate."):
+        _LOGGER.error("Invalid entity_id: %s does not belong to climate domain", entity_id)
+        return None
+    return ref
+
+
+async def _async_handle_climate_service(hass: HomeAssistant, service_call: ServiceCall, spec: dict) -> None:
+    """Validate a climate service call and forward it to the target entities.
+
+    Args:
+        hass: The Home Assistant instance.
+        service_call: The service call. Expects 'entity_id' (string or list)
+            and at least one of the spec's fields in service_call.data.
+        spec: The SERVICES entry of the called service.
+
+    Raises:
+        ServiceValidationError: If entity_id or every field is missing or
+            invalid, if a target fails validation, or if no valid entity IDs
+            are provided.
+        HomeAssistantError: If a write fails, is rejected by the device or
+            is queued because the device is unreachable, for any entity; all
+            entities are still processed and failures are reported together.
+    """
+    received = time.monotonic()
+    fields = spec["fields"]
+    entity_ids = service_call.data.get(ATTR_ENTITY_ID)
+    data = {
+        field: service_call.data[field]
+        for field in fields
+        if service_call.data.get(field) is not None
+    }
+
+    # Check for missing or None values
+    if entity_ids is None:
+        _LOGGER.error("Missing or invalid entity_id (%s)", entity_ids)
+        raise ServiceValidationError(
+            f"Missing or invalid entity_id ({entity_ids})",
+            translation_domain=DOMAIN,
+            translation_key="missing_or_invalid_entity_id",
+        )
+    if not data:
+        _LOGGER.error("Missing or invalid %s (None)", fields[0])
+        raise ServiceValidationError(
+            f"Missing or invalid {fields[0]} (None)",
+            translation_domain=DOMAIN,
+            translation_key=f"missing_or_invalid_{fields[0]}",
+        )
+
+    # Ensure entity_ids is a list
+    if isinstance(entity_ids, str):
+        entity_ids = [entity_ids]
+    elif not isinstance(entity_ids, list):
+        _LOGGER.error("entity_id must be a string or list of strings, got %s (type: %s)",
+                      entity_ids, type(entity_ids))
+        raise ServiceValidationError(
+            f"entity_id must be a string or list of strings, got {entity_ids}",
+            translation_domain=DOMAIN,
+            translation_key="invalid_entity_id_type",
+        )
+
+    # Validate each entity_id
+    validator = spec.get("validator")
+    valid_entities = []
+    # Validation spans of every target, for devices with the trace option on.
+    validated = {}
+    for entity_id in entity_ids:
+        if not isinstance(entity_id, str):
+            _LOGGER.error("Invalid entity_id: %s is not a string (type: %s)", entity_id, type(entity_id))
+            continue
+        start = time.monotonic()
+        ref = _async_lookup_climate(hass, entity_id)
+        if ref is None:
+            continue
+        coordinator, entity = ref
+        if validator is not None:
+            validator(coordinator, entity_id, data)
+        valid_entities.append(entity)
+        validated[entity_id] = (received, start, time.monotonic())
+
+    if not valid_entities:
+        _LOGGER.error("No valid entity IDs provided")
+        raise ServiceValidationError(
+            "No valid entity IDs provided",
+            translation_domain=DOMAIN,
+            translation_key="no_valid_entity_ids",
+        )
+
+    # Process valid entity_ids concurrently
+    await _async_dispatch_to_entities(
+        service_call, f"{DOMAIN}.{service_call.service}", valid_entities, spec["method"],
+        validated=validated, **data
+    )
+
+
+async def _async_dispatch_to_entities(
+    service_call: ServiceCall, service: str, entities: list, method: str, *args,
+    validated: dict | None = None, **kwargs
+) -> None:
+    """Call an entity method on every target concurrently.
+
+    The method is invoked directly on the indexed entity objects (no second
+    round trip through the climate service layer), with at most
+    DEFAULT_FLEET_CONCURRENCY calls in flight. A method that returns False
+    (a write the device rejected, or one queued until it is reachable again,
+    see HysenEntity._async_try_command) counts as a failure. A failure for
+    one entity does not abort the others; failures are reported together
+    once every call has finished. Calls to devices with the trace option on are traced
+    (tracing.py), from the time the service call was received.
+
+    Args:
+        service_call: The originating service call (its context is set on
+            each entity before the call).
+        service: The full service name, used in log and error messages.
+        entities: Validated HysenClimate (or limit number) entities.
+        method: Name of the coroutine method to call (e.g. "async_set_fan_mode").
+        *args: Positional arguments forwarded to the method.
+        validated: Optional dict mapping entity IDs to the (received, start,
+            end) time.monotonic() values of the call and of their validation.
+        **kwargs: Keyword arguments forwarded to the method.
+
+    Raises:
+        ServiceValidationError, HomeAssistantError: The original exception
+            when the only target fails; otherwise a HomeAssistantError
+            listing every failed entity.
+    """
+    async def _call(entity):
+        entity.async_set_context(service_call.context)
+        tracer = entity.coordinator.tracer
+        timing = validated.get(entity.entity_id) if validated else None
+        if tracer is None or timing is None:
+            applied = await getattr(entity, method)(*args, **kwargs)
+        else:
+            received, start, end = timing
+            with tracer.trace(service, start=received, entity_id=entity.entity_id) as trace:
+                trace.add("service_validation", start, end)
+                with trace.span("climate_dispatch", method=method):
+                    applied = await getattr(entity, method)(*args, **kwargs)
+        if applied is False:
+            raise HomeAssistantError(
+                f"Command for {entity.entity_id} was not applied; the device rejected it "
+                "or it is queued until the device is reachable",
+                translation_domain=DOMAIN,
+                translation_key="command_not_applied",
+                translation_placeholders={"entity_id": entity.entity_id},
+            )
+        _LOGGER.debug("Called %s on %s with %s %s", method, entity.entity_id, args, kwargs)
+
+    results = await async_fan_out(entities, _call, DEFAULT_FLEET_CONCURRENCY)
+    failures = {
+        entity.entity_id: result
+        for entity, result in zip(entities, results)
+        if isinstance(result, Exception)
+    }
+    if not failures:
+        return
+
+    for entity_id, exc in failures.items():
+        _LOGGER.error("Failed to %s for %s: %s", service, entity_id, exc)
+    if len(entities) == 1:
+        raise next(iter(failures.values()))
+    errors = "; ".join(f"{entity_id}: {exc}" for entity_id, exc in failures.items())
+    raise HomeAssistantError(
+        f"{service} failed for {len(failures)} of {len(entities)} entities: {errors}",
+        translation_domain=DOMAIN,
+        translation_key="partial_service_failure",
+        translation_placeholders={
+            "service": service,
+            "failed": str(len(failures)),
+            "total": str(len(entities)),
+            "errors": errors,
+        },
+    )
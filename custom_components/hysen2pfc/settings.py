@@ -0,0 +1,253 @@
+"""
+Device configuration settings for the Hysen 2 Pipe Fan Coil integration.
+
+"Settings" are the slowly changing configuration values of a unit, as
+opposed to its operating state: hysteresis, sensor calibration, the four
+cooling/heating setpoint limits, fan coil control, frost protection and the
+key lock. They are addressed by their service field names (ATTR_*) and use
+the same HA representation as the coordinator data.
+
+This module holds the pure helpers shared by everything that writes
+settings in bulk (reconciler, fleet services):
+
+- settings_differences compares wanted settings with coordinator data.
+- settings_commands builds the minimal writes: the eight option fields go
+  out as one raw set_options write (unchanged fields keep their current
+  value) and the key lock as one set_lock_power write, instead of one
+  read-modify-write round trip per field through the library setters.
+- lock_power_args builds the raw set_lock_power arguments from HA values,
+  since that frame always carries both the key lock and the power state.
+- SETTER_SETTINGS maps the library setters used by the entities back to
+  settings so that entity writes can be recorded as desired configuration.
+"""
+
+import logging
+import voluptuous as vol
+from homeassistant.exceptions import ServiceValidationError
+from .const import (
+    DOMAIN,
+    DATA_KEY_KEY_LOCK,
+    DATA_KEY_POWER_STATE,
+    DATA_KEY_HYSTERESIS,
+    DATA_KEY_CALIBRATION,
+    DATA_KEY_COOLING_MAX_TEMP,
+    DATA_KEY_COOLING_MIN_TEMP,
+    DATA_KEY_HEATING_MAX_TEMP,
+    DATA_KEY_HEATING_MIN_TEMP,
+    DATA_KEY_FAN_CONTROL,
+    DATA_KEY_FROST_PROTECTION,
+    ATTR_KEY_LOCK,
+    ATTR_HYSTERESIS,
+    ATTR_CALIBRATION,
+    ATTR_COOLING_MAX_TEMP,
+    ATTR_COOLING_MIN_TEMP,
+    ATTR_HEATING_MAX_TEMP,
+    ATTR_HEATING_MIN_TEMP,
+    ATTR_FAN_CONTROL,
+    ATTR_FROST_PROTECTION,
+    HYSEN2PFC_KEY_LOCK_OFF,
+    HYSEN2PFC_KEY_LOCK_ON,
+    HYSEN2PFC_KEY_ALL_UNLOCKED,
+    HYSTERESIS_HASS_TO_HYSEN,
+    HYSTERESIS_HYSEN_TO_HASS,
+    FAN_CONTROL_HASS_TO_HYSEN,
+    FAN_CONTROL_HYSEN_TO_HASS,
+    FROST_PROTECTION_HASS_TO_HYSEN,
+    FROST_PROTECTION_HYSEN_TO_HASS,
+    KEY_LOCK_HASS_TO_HYSEN,
+    KEY_LOCK_HYSEN_TO_HASS,
+    POWER_STATE_HASS_TO_HYSEN,
+    HYSEN2PFC_CALIBRATION_MIN,
+    HYSEN2PFC_CALIBRATION_MAX,
+    HYSEN2PFC_COOLING_MAX_TEMP,
+    HYSEN2PFC_COOLING_MIN_TEMP,
+    HYSEN2PFC_HEATING_MAX_TEMP,
+    HYSEN2PFC_HEATING_MIN_TEMP,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _calibration_arg(value) -> float:
+    """Return a calibration value that set_options encodes exactly.
+
+    set_options truncates value * 10 towards minus infinity, so e.g. 0.3
+    (2.9999... after scaling) would be written as 0.2. Nudging the value by
+    a hundredth makes the truncation land on the intended tenth.
+    """
+    return round(float(value), 1) + 0.01
+
+
+# The eight fields of device.set_options, in argument order:
+# setting -> (coordinator data key, HA value -> device value).
+OPTION_SETTINGS = {
+    ATTR_HYSTERESIS: (DATA_KEY_HYSTERESIS, HYSTERESIS_HASS_TO_HYSEN.__getitem__),
+    ATTR_CALIBRATION: (DATA_KEY_CALIBRATION, _calibration_arg),
+    ATTR_COOLING_MAX_TEMP: (DATA_KEY_COOLING_MAX_TEMP, int),
+    ATTR_COOLING_MIN_TEMP: (DATA_KEY_COOLING_MIN_TEMP, int),
+    ATTR_HEATING_MAX_TEMP: (DATA_KEY_HEATING_MAX_TEMP, int),
+    ATTR_HEATING_MIN_TEMP: (DATA_KEY_HEATING_MIN_TEMP, int),
+    ATTR_FAN_CONTROL: (DATA_KEY_FAN_CONTROL, FAN_CONTROL_HASS_TO_HYSEN.__getitem__),
+    ATTR_FROST_PROTECTION: (DATA_KEY_FROST_PROTECTION, FROST_PROTECTION_HASS_TO_HYSEN.__getitem__),
+}
+
+# Every setting -> coordinator data key.
+SETTING_DATA_KEYS = {
+    **{setting: data_key for setting, (data_key, _) in OPTION_SETTINGS.items()},
+    ATTR_KEY_LOCK: DATA_KEY_KEY_LOCK,
+}
+
+SETTINGS = tuple(SETTING_DATA_KEYS)
+
+# Library setters used by the entities -> (setting, device value -> HA value).
+SETTER_SETTINGS = {
+    "set_hysteresis": (ATTR_HYSTERESIS, HYSTERESIS_HYSEN_TO_HASS.get),
+    "set_calibration": (ATTR_CALIBRATION, lambda value: round(float(value), 1)),
+    "set_cooling_max_temp": (ATTR_COOLING_MAX_TEMP, int),
+    "set_cooling_min_temp": (ATTR_COOLING_MIN_TEMP, int),
+    "set_heating_max_temp": (ATTR_HEATING_MAX_TEMP, int),
+    "set_heating_min_temp": (ATTR_HEATING_MIN_TEMP, int),
+    "set_fan_control": (ATTR_FAN_CONTROL, FAN_CONTROL_HYSEN_TO_HASS.get),
+    "set_frost_protection": (ATTR_FROST_PROTECTION, FROST_PROTECTION_HYSEN_TO_HASS.get),
+    "set_key_lock": (ATTR_KEY_LOCK, KEY_LOCK_HYSEN_TO_HASS.get),
+}
+
+_TEMP_LIMIT = vol.All(
+    vol.Coerce(int),
+    vol.Range(
+        min=min(HYSEN2PFC_COOLING_MIN_TEMP, HYSEN2PFC_HEATING_MIN_TEMP),
+        max=max(HYSEN2PFC_COOLING_MAX_TEMP, HYSEN2PFC_HEATING_MAX_TEMP),
+    ),
+)
+
+# Service fields for a (partial) set of settings, shared by the services
+# that accept settings.
+SETTINGS_SCHEMA = {
+    vol.Optional(ATTR_HYSTERESIS): vol.All(vol.Coerce(str), vol.In(list(HYSTERESIS_HASS_TO_HYSEN))),
+    vol.Optional(ATTR_CALIBRATION): vol.All(
+        vol.Coerce(float), vol.Range(min=HYSEN2PFC_CALIBRATION_MIN, max=HYSEN2PFC_CALIBRATION_MAX)
+    ),
+    vol.Optional(ATTR_COOLING_MAX_TEMP): _TEMP_LIMIT,
+    vol.Optional(ATTR_COOLING_MIN_TEMP): _TEMP_LIMIT,
+    vol.Optional(ATTR_HEATING_MAX_TEMP): _TEMP_LIMIT,
+    vol.Optional(ATTR_HEATING_MIN_TEMP): _TEMP_LIMIT,
+    vol.Optional(ATTR_FAN_CONTROL): vol.In(list(FAN_CONTROL_HASS_TO_HYSEN)),
+    vol.Optional(ATTR_FROST_PROTECTION): vol.In(list(FROST_PROTECTION_HASS_TO_HYSEN)),
+    vol.Optional(ATTR_KEY_LOCK): vol.In(list(KEY_LOCK_HASS_TO_HYSEN)),
+}
+
+# (min setting, max setting) pairs that must stay ordered.
+_LIMIT_PAIRS = (
+    (ATTR_COOLING_MIN_TEMP, ATTR_COOLING_MAX_TEMP),
+    (ATTR_HEATING_MIN_TEMP, ATTR_HEATING_MAX_TEMP),
+)
+
+
+def _same(setting: str, actual, wanted) -> bool:
+    """Compare a setting value, tolerating float noise on calibration."""
+    if setting == ATTR_CALIBRATION and actual is not None and wanted is not None:
+        return round(float(actual), 1) == round(float(wanted), 1)
+    return actual == wanted
+
+
+def settings_differences(settings: dict, data: dict) -> dict:
+    """Return the settings whose wanted value differs from the device.
+
+    Args:
+        settings: Wanted values keyed by setting name.
+        data: Coordinator data dict of one device.
+
+    Returns:
+        Dict of setting -> {"actual": value, "desired": value}.
+    """
+    return {
+        setting: {"actual": data.get(SETTING_DATA_KEYS[setting]), "desired": wanted}
+        for setting, wanted in settings.items()
+        if setting in SETTING_DATA_KEYS
+        and not _same(setting, data.get(SETTING_DATA_KEYS[setting]), wanted)
+    }
+
+
+def validate_limits(settings: dict, data: dict | None = None) -> None:
+    """Reject settings whose min/max limits would end up inverted.
+
+    Limits missing from settings are taken from data (the device's current
+    values), so a partial change is checked against what it will be
+    combined with.
+
+    Raises:
+        ServiceValidationError: If a min limit would exceed its max limit.
+    """
+    data = data or {}
+    for min_setting, max_setting in _LIMIT_PAIRS:
+        low = settings.get(min_setting, data.get(SETTING_DATA_KEYS[min_setting]))
+        high = settings.get(max_setting, data.get(SETTING_DATA_KEYS[max_setting]))
+        if low is not None and high is not None and low > high:
+            raise ServiceValidationError(
+                f"{min_setting} ({low}) must not be higher than {max_setting} ({high}).",
+                translation_domain=DOMAIN,
+                translation_key="invalid_limits",
+                translation_placeholders={
+                    "min_setting": min_setting,
+                    "min_value": str(low),
+                    "max_setting": max_setting,
+                    "max_value": str(high),
+                },
+            )
+
+
+def lock_power_args(key_lock: str, power_state: str) -> tuple:
+    """Return the raw set_lock_power arguments for a key lock and power state.
+
+    Both values are in HA form, as in the coordinator data; the key lock bit
+    follows the key lock type, as in the library's set_key_lock.
+
+    Raises:
+        KeyError: If either value is unknown (e.g. None).
+    """
+    key_lock_type = KEY_LOCK_HASS_TO_HYSEN[key_lock]
+    key_lock_bit = HYSEN2PFC_KEY_LOCK_OFF if key_lock_type == HYSEN2PFC_KEY_ALL_UNLOCKED else HYSEN2PFC_KEY_LOCK_ON
+    return (key_lock_bit, key_lock_type, POWER_STATE_HASS_TO_HYSEN[power_state])
+
+
+def settings_commands(device, settings: dict, data: dict) -> list:
+    """Build the minimal list of (func, args) writes for the changed settings.
+
+    Args:
+        device: The Hysen2PipeFanCoilDevice to write to.
+        settings: Wanted values keyed by setting name.
+        data: Coordinator data dict of the device; unchanged option fields
+            are re-sent with these values.
+
+    Returns:
+        At most one set_options and one set_lock_power write.
+
+    Raises:
+        ServiceValidationError: If the resulting limits would be inverted,
+            or if the key lock changes while the power state is unknown.
+    """
+    changed = settings_differences(settings, data)
+    if not changed:
+        return []
+    validate_limits(settings, data)
+
+    commands = []
+    if any(setting in OPTION_SETTINGS for setting in changed):
+        options = []
+        for setting, (data_key, to_device) in OPTION_SETTINGS.items():
+            value = settings[setting] if setting in settings else data.get(data_key)
+            options.append(to_device(value))
+        commands.append((device.set_options, tuple(options)))
+    if ATTR_KEY_LOCK in changed:
+        # The frame carries the power state too. It is taken from data: the
+        # library device reports on until its first live poll.
+        power_state = data.get(DATA_KEY_POWER_STATE)
+        if power_state not in POWER_STATE_HASS_TO_HYSEN:
+            raise ServiceValidationError(
+                "The state of the device is not known yet. Try again after the next poll.",
+                translation_domain=DOMAIN,
+                translation_key="device_state_unknown",
+            )
+        commands.append((device.set_lock_power, lock_power_args(settings[ATTR_KEY_LOCK], power_state)))
+    _LOGGER.debug("Settings %s need %d writes", list(changed), len(commands))
+    return commands
@@ -0,0 +1,119 @@
+"""
+Coordinator snapshots for warm restarts of the Hysen 2 Pipe Fan Coil
+integration.
+
+Without a snapshot, a device's entities only appear once its first poll
+succeeds, so after a Home Assistant restart every climate card stays empty
+(or the entry is retried with ConfigEntryNotReady) until the device answers.
+
+HysenSnapshotStore keeps the coordinator data of the last successful poll of
+every device in one .storage file, written as a single batch at
+EVENT_HOMEASSISTANT_STOP and at periodic checkpoints (so that a crash loses
+at most one checkpoint interval), never once per device or per poll.
+
+At setup, a device with a snapshot starts from it (see
+HysenCoordinator.async_restore_snapshot): its entities are created at once
+with the cached state, marked with a cached attribute, and the first live
+poll runs in the background. Until that poll lands the coordinator is not
+online, so the reconciler, fleet verification and backups ignore the
+cached data.
+"""
+
+import logging
+from datetime import timedelta
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+from .const import (
+    STORAGE_VERSION,
+    STORAGE_KEY_SNAPSHOTS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Time between checkpoints written while Home Assistant is running.
+_CHECKPOINT_INTERVAL = timedelta(minutes=15)
+
+
+class HysenSnapshotStore:
+    """Last good coordinator data of every device, in a single .storage file.
+
+    Stored in hass.data[DOMAIN][DATA_SNAPSHOT_STORE] and loaded once in
+    async_setup. The data is a dict of MAC address ->
+    {"updated": ISO timestamp of the poll, "data": coordinator data}.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialise the store; call async_load before use."""
+        self._hass = hass
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY_SNAPSHOTS)
+        self._snapshots: dict = {}
+        self._coordinators: dict = {}
+
+    async def async_load(self) -> None:
+        """Load the snapshots saved by a previous run and start checkpointing."""
+        data = await self._store.async_load()
+        self._snapshots = (data or {}).get("devices", {})
+        if self._snapshots:
+            _LOGGER.info("Loaded coordinator snapshots for %d devices", len(self._snapshots))
+
+        cancel_checkpoints = async_track_time_interval(
+            self._hass, self._async_checkpoint, _CHECKPOINT_INTERVAL
+        )
+
+        async def _async_stop(event: Event) -> None:
+            cancel_checkpoints()
+            await self._store.async_save(self._data_to_save())
+
+        self._hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop)
+
+    def get(self, mac: str) -> dict | None:
+        """Return the snapshot of one device, or None."""
+        return self._snapshots.get(mac)
+
+    @callback
+    def async_track(self, mac: str, coordinator):
+        """Include a device's coordinator data in the next writes.
+
+        Returns:
+            Callable that stops tracking; pass it to entry.async_on_unload.
+        """
+        self._coordinators[mac] = coordinator
+
+        @callback
+        def _async_untrack() -> None:
+            self._capture(mac, coordinator)
+            if self._coordinators.get(mac) is coordinator:
+                del self._coordinators[mac]
+
+        return _async_untrack
+
+    @callback
+    def async_remove(self, mac: str) -> None:
+        """Forget the snapshot of a device whose config entry was removed."""
+        self._coordinators.pop(mac, None)
+        if self._snapshots.pop(mac, None) is not None:
+            self._store.async_delay_save(self._data_to_save)
+
+    def _capture(self, mac: str, coordinator) -> None:
+        """Take the data of the coordinator's last successful live poll."""
+        if coordinator.data is None or coordinator.last_success is None or coordinator.cached:
+            return
+        self._snapshots[mac] = {
+            "updated": coordinator.last_success.isoformat(),
+            "data": dict(coordinator.data),
+        }
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Return the data written to .storage, capturing every tracked device."""
+        for mac, coordinator in self._coordinators.items():
+            self._capture(mac, coordinator)
+        return {"devices": self._snapshots}
+
+    @callback
+    def _async_checkpoint(self, now) -> None:
+        """Write all snapshots in one batch."""
+        if self._coordinators:
+            self._store.async_delay_save(self._data_to_save)
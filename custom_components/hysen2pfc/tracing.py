@@ -0,0 +1,269 @@
+"""
+Span tracing of device commands for the Hysen 2 Pipe Fan Coil integration.
+
+With the trace option enabled on a device, every write to it is traced
+from the service call to the last state write it causes, and the spans are
+appended to <config>/hysen2pfc/traces/<mac>.json, rotated like the packet
+captures (see capture.py) at TRACE_MAX_BYTES with TRACE_BACKUP_COUNT
+rotated files kept. One trace holds, nested in time:
+
+    hysen2pfc.<service>   The hysen2pfc climate service call, per target
+                          (from its handler to the end of the dispatch).
+    service_validation    Target lookup and validation of the service data.
+    climate_dispatch      The climate entity method.
+    command               The coordinator's write and refresh; the root of
+                          writes that do not come from a hysen2pfc climate
+                          service (UI, climate.*, other services).
+    lane_queue            Waiting in the device's I/O lane (lane.py), with
+                          write_rate_limit when the write rate limit held a
+                          write back, or settle_sleep when a poll was held
+                          back for the device to apply a write.
+    executor_queue        Waiting for an executor thread.
+    device_write          The blocking device call(s) of the write.
+    refresh_poll          The coordinator refresh after the write, with its
+                          own lane_queue, executor_queue and device_read.
+    listener_fanout       Every entity's update from the new data.
+    state_write           One entity's state write, with its entity_id.
+
+The file uses the JSON Array Format of the Trace Event Format, one complete
+("X") event per line after an opening "[" that is never closed, which the
+format allows; chrome://tracing, Perfetto (ui.perfetto.dev) and speedscope
+open it, rotated files included. Each device is a process and each trace a
+thread of its own, so every command is one row of the timeline.
+
+The current trace travels with the asyncio context (a ContextVar), so polls
+and writes outside a traced command are never traced. Events are kept in
+memory until the trace ends and then written in the executor.
+"""
+
+import contextlib
+import contextvars
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from homeassistant.core import HomeAssistant
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+TRACE_SUFFIX = ".json"
+
+_CURRENT_TRACE = contextvars.ContextVar(f"{DOMAIN}_trace", default=None)
+
+
+def current_trace():
+    """Return the HysenTrace of the running command, or None.
+
+    Tasks created during a trace inherit it; once the trace has been
+    written, they no longer see it.
+    """
+    trace = _CURRENT_TRACE.get()
+    if trace is None or trace.closed:
+        return None
+    return trace
+
+
+def command_span(tracer):
+    """Return the context manager tracing a device command.
+
+    A span of the current trace if there is one, else a new trace of the
+    device's tracer, else nothing.
+    """
+    trace = current_trace()
+    if trace is not None:
+        return trace.span("command")
+    if tracer is not None:
+        return tracer.trace("command")
+    return contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def span(name: str, **args):
+    """Record a span on the current trace, if there is one."""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.monotonic(), **args)
+
+
+class HysenTraceLog:
+    """Rotating trace file of one device.
+
+    Written from executor jobs; a lock keeps lines whole. Write errors
+    disable the tracing instead of failing anything else.
+    """
+
+    def __init__(self, directory: str, mac: bytes, host: str, max_bytes: int, backup_count: int) -> None:
+        """Initialise the log; the file is opened on the first trace.
+
+        Args:
+            directory: Directory of the trace files; created if missing.
+            mac: MAC address of the device, as bytes.
+            host: Address of the device, used as its process name.
+            max_bytes: Size at which the file is rotated.
+            backup_count: Rotated files kept.
+        """
+        self.path = os.path.join(directory, mac.hex() + TRACE_SUFFIX)
+        self.pid = int.from_bytes(mac[-3:], "big")
+        self._directory = directory
+        self._host = host
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._lock = threading.Lock()
+        self._handle = None
+        self._failed = False
+
+    def write(self, events: list) -> None:
+        """Append the events of one trace, rotating the file first if it is full."""
+        lines = "".join(json.dumps(event, separators=(",", ":")) + ",\n" for event in events)
+        with self._lock:
+            if self._failed:
+                return
+            try:
+                if self._handle is None:
+                    self._open()
+                elif self._handle.tell() + len(lines) > self._max_bytes:
+                    self._rotate()
+                self._handle.write(lines)
+                self._handle.flush()
+            except OSError as exc:
+                _LOGGER.error("Stopped tracing to %s: %s", self.path, exc)
+                self._failed = True
+                self._close()
+
+    def close(self) -> None:
+        """Close the file; blocking."""
+        with self._lock:
+            self._close()
+
+    def _open(self) -> None:
+        """Open the current file for appending, starting the array if new."""
+        os.makedirs(self._directory, exist_ok=True)
+        self._handle = open(self.path, "a", encoding="utf-8")
+        if self._handle.tell() == 0:
+            process = {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": f"{DOMAIN} {self._host}"}}
+            self._handle.write("[\n" + json.dumps(process, separators=(",", ":")) + ",\n")
+        _LOGGER.info("Tracing device commands to %s", self.path)
+
+    def _rotate(self) -> None:
+        """Shift the rotated files up by one and start a new current file."""
+        self._close()
+        for index in range(self._backup_count, 0, -1):
+            source = f"{self.path}.{index - 1}" if index > 1 else self.path
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index}")
+        if not self._backup_count:
+            os.remove(self.path)
+        self._open()
+
+    def _close(self) -> None:
+        """Close the current file if open; the caller holds the lock."""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class HysenTrace:
+    """The spans of one traced command.
+
+    Times are time.monotonic() values; add may be called from executor
+    threads while the command runs.
+    """
+
+    def __init__(self, tracer: "HysenTracer", trace_id: int) -> None:
+        """Initialise an empty trace."""
+        self.id = trace_id
+        self.events = []
+        self.closed = False
+        self._tracer = tracer
+
+    def add(self, name: str, start: float, end: float, **args) -> None:
+        """Record a finished span."""
+        event = {
+            "name": name,
+            "cat": DOMAIN,
+            "ph": "X",
+            "ts": round((start + self._tracer.clock_offset) * 1e6),
+            "dur": round((end - start) * 1e6),
+            "pid": self._tracer.log.pid,
+            "tid": self.id,
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args):
+        """Record the enclosed code as a span."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.monotonic(), **args)
+
+    def wrap(self, name: str, func, handed_off: float):
+        """Return an executor job wrapped to record its executor_queue and name spans.
+
+        Args:
+            name: Span of the call itself (device_write or device_read).
+            func: The blocking device call.
+            handed_off: time.monotonic() at which the job was given to the
+                executor.
+        """
+
+        def _traced(*args):
+            start = time.monotonic()
+            self.add("executor_queue", handed_off, start)
+            try:
+                return func(*args)
+            finally:
+                self.add(name, start, time.monotonic())
+
+        return _traced
+
+
+class HysenTracer:
+    """Starts the traces of one device and writes them to its HysenTraceLog."""
+
+    def __init__(self, hass: HomeAssistant, log: HysenTraceLog) -> None:
+        """Initialise the tracer.
+
+        Args:
+            hass: The Home Assistant instance.
+            log: The device's trace file.
+        """
+        self.log = log
+        # Converts time.monotonic() to the UNIX time of the trace events.
+        self.clock_offset = time.time() - time.monotonic()
+        self._hass = hass
+        self._ids = itertools.count(1)
+
+    @contextlib.contextmanager
+    def trace(self, name: str, start: float | None = None, **args):
+        """Trace the enclosed code as a new trace and write it at the end.
+
+        Args:
+            name: Name of the root span.
+            start: time.monotonic() at which the root span starts, if
+                before the enclosed code; defaults to now.
+            **args: Arguments of the root span.
+        """
+        trace = HysenTrace(self, next(self._ids))
+        if start is None:
+            start = time.monotonic()
+        token = _CURRENT_TRACE.set(trace)
+        try:
+            yield trace
+        finally:
+            _CURRENT_TRACE.reset(token)
+            trace.add(name, start, time.monotonic(), **args)
+            trace.closed = True
+            self._hass.async_add_executor_job(self.log.write, trace.events)
@@ -0,0 +1 @@
+"""Tests for the Hysen 2 Pipe Fan Coil integration."""
@@ -0,0 +1,22 @@
+"""
+Fixtures for the hysen2pfc tests.
+
+hysen_fleet serves simulated devices (tools/hysen_simulator.py) on loopback
+ephemeral ports, so the coordinator and the hysen library underneath run
+without hardware. Parametrize it indirectly with the number of devices:
+
+    @pytest.mark.parametrize("hysen_fleet", [1, 20], indirect=True)
+    async def test_something(hass, hysen_fleet):
+        ...
+"""
+
+import pytest
+from hysen_simulator import HysenSimulator
+
+
+@pytest.fixture
+async def hysen_fleet(request):
+    """Yield a HysenSimulator serving request.param devices (default 1)."""
+    async with HysenSimulator() as simulator:
+        await simulator.async_add_devices(getattr(request, "param", 1))
+        yield simulator
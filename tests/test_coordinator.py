@@ -0,0 +1,68 @@
+"""HysenCoordinator polls and commands against simulated devices."""
+
+import asyncio
+import pytest
+from homeassistant.const import STATE_ON
+from hysen import Hysen2PipeFanCoilDevice
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from custom_components.hysen2pfc.command_queue import HysenCommandQueueStore
+from custom_components.hysen2pfc.const import (
+    DOMAIN,
+    DATA_KEY_POWER_STATE,
+    DATA_KEY_TARGET_TEMP,
+)
+from custom_components.hysen2pfc.coordinator import HysenCoordinator
+
+FLEET_SIZES = [1, 20]
+
+# Offset of the target temperature in the simulated device memory.
+_TARGET_TEMP_BYTE = 5
+
+
+def _coordinator(hass, simulated, store) -> HysenCoordinator:
+    """Build the coordinator of one simulated device, as async_setup_entry does."""
+    host, port = simulated.address
+    mac = ":".join(f"{byte:02x}" for byte in simulated.mac)
+    entry = MockConfigEntry(domain=DOMAIN, data={"host": host, "mac": mac, "name": mac}, unique_id=mac)
+    entry.add_to_hass(hass)
+    # The integration always connects to port 80; the simulator hands out
+    # ephemeral ports, so the device is built with the simulated address.
+    device = Hysen2PipeFanCoilDevice(host=(host, port), mac=simulated.mac, timeout=5, sync_clock=False, sync_hour=0)
+    return HysenCoordinator(hass, device, f"{host}:{port}", entry, command_queue_store=store)
+
+
+@pytest.mark.parametrize("hysen_fleet", FLEET_SIZES, indirect=True)
+async def test_poll(hass, hysen_fleet):
+    """Every coordinator publishes the state held by its simulated device."""
+    store = HysenCommandQueueStore(hass)
+    coordinators = [_coordinator(hass, simulated, store) for simulated in hysen_fleet.devices]
+
+    await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+
+    for coordinator, simulated in zip(coordinators, hysen_fleet.devices):
+        assert coordinator.last_update_success
+        assert not coordinator.stale
+        assert coordinator.data[DATA_KEY_POWER_STATE] == STATE_ON
+        assert coordinator.data[DATA_KEY_TARGET_TEMP] == simulated.memory[_TARGET_TEMP_BYTE]
+        await coordinator.async_shutdown()
+    assert hysen_fleet.stats()["reads"] >= len(coordinators)
+
+
+@pytest.mark.parametrize("hysen_fleet", FLEET_SIZES, indirect=True)
+async def test_command(hass, hysen_fleet):
+    """A command reaches its device and the refresh that follows publishes it."""
+    store = HysenCommandQueueStore(hass)
+    coordinators = [_coordinator(hass, simulated, store) for simulated in hysen_fleet.devices]
+    await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+
+    targets = [20 + index % 8 for index in range(len(coordinators))]
+    await asyncio.gather(*(
+        coordinator.async_send_command(coordinator.device.set_target_temp, target)
+        for coordinator, target in zip(coordinators, targets)
+    ))
+
+    for coordinator, simulated, target in zip(coordinators, hysen_fleet.devices, targets):
+        assert simulated.memory[_TARGET_TEMP_BYTE] == target
+        assert coordinator.data[DATA_KEY_TARGET_TEMP] == target
+        assert not coordinator.command_queue
+        await coordinator.async_shutdown()
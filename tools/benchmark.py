@@ -0,0 +1,327 @@
+"""
+Benchmark of the Hysen 2 Pipe Fan Coil integration against simulated devices.
+
+Boots a real Home Assistant instance in a temporary config directory (with
+this repository's custom_components linked in), serves N simulated devices
+from tools/hysen_simulator.py on a separate thread, and measures for every
+fleet size:
+
+- startup_s                 Time from adding N config entries until all of
+                            them are loaded (first poll included).
+- polls_per_s               Coordinator polls completed per wall-clock second
+                            while every coordinator refreshes back to back.
+- polls_per_cpu_s           Polls per CPU-second of Home Assistant (event loop
+                            plus executor threads; the simulator thread is
+                            excluded), i.e. polls per second per core.
+- loop_cpu_ms_per_poll      Event loop CPU time per poll (occupancy).
+- executor_cpu_ms_per_poll  Executor thread CPU time per poll.
+- max_executor_threads      Largest number of live SyncWorker threads.
+- command_latency_ms        p50/p95/max time from HysenEntity._async_try_command
+                            to the new value being in the coordinator data.
+
+Results are written as JSON. With --baseline, every metric is compared with
+an earlier result file and the run fails (exit code 1) if one of them is
+worse by more than --threshold percent, so regressions in the coordinator
+or entity layer show up as numbers.
+
+The integration always talks to port 80, so each device is bound to its
+own loopback address (127.0.0.2, 127.0.0.3, ...) on port 80; run as root or
+lower net.ipv4.ip_unprivileged_port_start. Needs a Home Assistant
+installation (python -m pip install homeassistant) and the hysen package.
+
+    python tools/benchmark.py --devices 1 50 500 --output bench.json
+    python tools/benchmark.py --devices 1 50 500 --baseline bench.json
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from types import MappingProxyType
+
+from homeassistant import config_entries
+from homeassistant.bootstrap import async_setup_hass
+from homeassistant.runner import RuntimeConfig
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from hysen_simulator import HysenSimulator  # noqa: E402
+
+_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_DOMAIN = "hysen2pfc"
+_EXECUTOR_THREAD_PREFIX = "SyncWorker"
+
+# Metrics where a higher value is better; every other metric is a cost.
+_HIGHER_IS_BETTER = ("polls_per_s", "polls_per_cpu_s")
+
+
+class _SimulatorThread:
+    """Runs the simulated fleet on its own event loop and thread.
+
+    Keeping the devices off Home Assistant's loop means the loop occupancy
+    measured is the integration's alone.
+    """
+
+    def __init__(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="HysenSimulator", daemon=True)
+        self._thread.start()
+        self.simulator = HysenSimulator()
+
+    def run(self, coro):
+        """Run a coroutine on the simulator loop and return its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def cpu_time(self) -> float:
+        """Return the CPU time used by the simulator thread."""
+        async def _cpu_time():
+            return time.thread_time()
+        return self.run(_cpu_time())
+
+    def close(self) -> None:
+        """Close the endpoints and stop the thread."""
+        self.run(self.simulator.async_close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def _loopback_address(index: int) -> str:
+    """Return the index-th usable loopback address from 127.0.0.2."""
+    index += 2
+    while index % 256 in (0, 255):
+        index += 1
+    return f"127.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"
+
+
+def _free_port() -> int:
+    """Return a free TCP port for Home Assistant's HTTP server."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _config_entry(device, index: int) -> config_entries.ConfigEntry:
+    """Build the config entry of one simulated device."""
+    mac = device.mac.hex(":")
+    kwargs = {
+        "version": 1,
+        "minor_version": 1,
+        "domain": _DOMAIN,
+        "title": f"Bench {index}",
+        "data": {"host": device.address[0], "mac": mac, "name": f"Bench {index}", "timeout": 5},
+        # No scheduled polls or write rate limit: the benchmark drives both.
+        "options": {"update_interval": 300, "write_rate": 0},
+        "source": config_entries.SOURCE_USER,
+        "unique_id": mac,
+        "discovery_keys": MappingProxyType({}),
+        "subentries_data": None,
+    }
+    parameters = inspect.signature(config_entries.ConfigEntry).parameters
+    return config_entries.ConfigEntry(**{key: value for key, value in kwargs.items() if key in parameters})
+
+
+def _percentile(values: list, fraction: float) -> float:
+    """Return a percentile of a non-empty list."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _executor_threads() -> int:
+    """Return the number of live executor threads."""
+    return sum(1 for thread in threading.enumerate() if thread.name.startswith(_EXECUTOR_THREAD_PREFIX))
+
+
+async def _async_bench(hass, devices: list, simulator: _SimulatorThread, duration: float, commands: int) -> dict:
+    """Measure one fleet size on a running Home Assistant instance."""
+    entries = [_config_entry(device, index) for index, device in enumerate(devices)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(hass.config_entries.async_add(entry) for entry in entries))
+    await hass.async_block_till_done()
+    startup = time.perf_counter() - start
+    loaded = [entry for entry in entries if entry.state is config_entries.ConfigEntryState.LOADED]
+    coordinators = [hass.data[_DOMAIN][entry.entry_id]["coordinator"] for entry in loaded]
+
+    # Poll throughput: every coordinator refreshes back to back.
+    polls = 0
+    max_threads = 0
+    deadline = time.perf_counter() + duration
+
+    async def _poll_loop(coordinator):
+        nonlocal polls
+        while time.perf_counter() < deadline:
+            await coordinator.async_refresh()
+            polls += 1
+
+    async def _sample_threads():
+        nonlocal max_threads
+        while time.perf_counter() < deadline:
+            max_threads = max(max_threads, _executor_threads())
+            await asyncio.sleep(0.05)
+
+    loop_cpu = time.thread_time()
+    process_cpu = time.process_time()
+    simulator_cpu = simulator.cpu_time()
+    start = time.perf_counter()
+    await asyncio.gather(_sample_threads(), *(_poll_loop(coordinator) for coordinator in coordinators))
+    elapsed = time.perf_counter() - start
+    loop_cpu = time.thread_time() - loop_cpu
+    simulator_cpu = simulator.cpu_time() - simulator_cpu
+    hass_cpu = time.process_time() - process_cpu - simulator_cpu
+
+    # Command-to-state latency through the entity command path.
+    index = hass.data[_DOMAIN]["entity_index"]
+    entities = {}
+    for coordinator, entity in index.entities():
+        entities.setdefault(coordinator, entity)
+    latencies = []
+    failed = 0
+    for round_ in range(commands):
+        temp = 22 + round_ % 2
+
+        async def _command(coordinator, entity, temp=temp):
+            nonlocal failed
+            start = time.perf_counter()
+            ok = await entity._async_try_command(
+                "Benchmark command failed", coordinator.device.set_target_temp, temp
+            )
+            if ok and coordinator.data.get("target_temp") == temp:
+                latencies.append(time.perf_counter() - start)
+            else:
+                failed += 1
+
+        await asyncio.gather(*(_command(coordinator, entity) for coordinator, entity in entities.items()))
+
+    await asyncio.gather(*(hass.config_entries.async_remove(entry.entry_id) for entry in entries))
+    await hass.async_block_till_done()
+
+    return {
+        "devices": len(devices),
+        "loaded": len(loaded),
+        "startup_s": round(startup, 3),
+        "polls": polls,
+        "polls_per_s": round(polls / elapsed, 1),
+        "polls_per_cpu_s": round(polls / hass_cpu, 1) if hass_cpu > 0 else None,
+        "loop_cpu_ms_per_poll": round(1000 * loop_cpu / polls, 3) if polls else None,
+        "executor_cpu_ms_per_poll": round(1000 * (hass_cpu - loop_cpu) / polls, 3) if polls else None,
+        "max_executor_threads": max_threads,
+        "commands": len(latencies) + failed,
+        "failed_commands": failed,
+        "command_latency_ms": {
+            "p50": round(1000 * statistics.median(latencies), 1),
+            "p95": round(1000 * _percentile(latencies, 0.95), 1),
+            "max": round(1000 * max(latencies), 1),
+        } if latencies else None,
+    }
+
+
+async def _async_main(args) -> dict:
+    """Run every fleet size on one Home Assistant instance."""
+    results = {}
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.symlink(os.path.join(_REPO, "custom_components"), os.path.join(config_dir, "custom_components"))
+        with open(os.path.join(config_dir, "configuration.yaml"), "w", encoding="utf-8") as handle:
+            handle.write(f"http:\n  server_host: 127.0.0.1\n  server_port: {_free_port()}\n")
+        hass = await async_setup_hass(RuntimeConfig(config_dir=config_dir, skip_pip=True))
+        if hass is None:
+            raise RuntimeError("Home Assistant failed to start")
+        await hass.async_start()
+        simulator = _SimulatorThread()
+        try:
+            offset = 0
+            for count in args.devices:
+                devices = [
+                    simulator.run(simulator.simulator.async_add_device(
+                        _loopback_address(offset + index), 80, latency=args.latency, jitter=args.jitter,
+                    ))
+                    for index in range(count)
+                ]
+                offset += count
+                logging.info("Benchmarking %d devices", count)
+                results[str(count)] = await _async_bench(hass, devices, simulator, args.duration, args.commands)
+                logging.info("%s", results[str(count)])
+        finally:
+            simulator.close()
+            await hass.async_stop()
+    return results
+
+
+def _flatten(result: dict) -> dict:
+    """Return the numeric metrics of one fleet size as a flat dict."""
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update({f"{key}.{sub}": sub_value for sub, sub_value in value.items()})
+        elif isinstance(value, (int, float)) and key not in ("devices", "loaded", "polls", "commands"):
+            flat[key] = value
+    return flat
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print a comparison with a baseline and return the regressions."""
+    regressions = []
+    for count, result in results.items():
+        if count not in baseline:
+            continue
+        current, previous = _flatten(result), _flatten(baseline[count])
+        for metric, value in current.items():
+            old = previous.get(metric)
+            if old in (None, 0) or value is None:
+                continue
+            change = 100.0 * (value - old) / old
+            worse = -change if metric.split(".")[0] in _HIGHER_IS_BETTER else change
+            flag = "REGRESSION" if worse > threshold else ""
+            print(f"{count:>5} {metric:<28} {old:>12} -> {value:>12} {change:+7.1f}% {flag}")
+            if flag:
+                regressions.append((count, metric, old, value))
+    return regressions
+
+
+def main() -> int:
+    """Parse the command line, run the benchmark and compare."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 50, 500], help="fleet sizes")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of back-to-back polling")
+    parser.add_argument("--commands", type=int, default=5, help="commands per device")
+    parser.add_argument("--latency", type=float, default=0.01, help="simulated device latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.005, help="simulated device jitter (s)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with this earlier result file")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression (%%)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    logging.getLogger("homeassistant").setLevel(logging.WARNING)
+    logging.getLogger("custom_components").setLevel(logging.WARNING)
+
+    results = asyncio.run(_async_main(args))
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "cpus": os.cpu_count(),
+        "settings": {key: getattr(args, key) for key in ("duration", "commands", "latency", "jitter")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.threshold}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,533 @@
+"""
+UDP simulator of Hysen HY03AC-x-Wifi 2 pipe fan coil controllers.
+
+Lets the integration (HysenCoordinator, the platforms and the hysen library
+underneath) run against virtual devices, so that load and latency work can
+be measured repeatably and offline against 1 to 1000 devices.
+
+Protocol
+--------
+The simulator speaks the Broadlink UDP protocol the hysen library uses:
+
+- 0x65 auth: the device answers with a session id and a fresh AES key.
+- 0x6A with the firmware request (payload 0x68): firmware version.
+- 0x6A with a Hysen request ([len, 0] + request + CRC16, see
+  hysen/hysendevice.py): read words (0x03), write one word (0x06) and
+  write several words (0x10) of the 32-byte device memory that
+  get_device_status decodes. Every setter of the library is a write to
+  that memory, so all of them are supported.
+
+Packets with a bad checksum are ignored; packets for an unknown MAC or
+with an outdated session id get a Broadlink error code, like the firmware.
+
+Network conditions
+------------------
+Each device has a latency, a jitter (uniform, added to the latency) and a
+packet loss probability, applied to every request.
+
+Firmware quirks
+---------------
+Modelled because the integration has code paths for them:
+
+- Settle time: for settle_time seconds after a write, reads still return
+  the memory as it was before the write (why the coordinator waits before
+  refreshing after a command).
+- Busy device: a device serves one request at a time; with drop_when_busy
+  a request arriving while the previous answer is pending is dropped, as
+  the real units do when several clients talk to them at once.
+- Read-only fields: the room temperature and the valve bit cannot be
+  written (set_target_temp writes the room temperature byte as 0); the
+  valve is driven by a simple thermal model and time_valve_on counts the
+  seconds it has been open.
+- Fan-only with auto fan is refused by the firmware: the fan falls back
+  to low.
+- The device clock runs from the last set_time.
+
+Many devices per process
+------------------------
+Every device has its own MAC. Devices may share an endpoint (one socket,
+requests are routed by the MAC in the packet header) or have their own
+(host, port): the integration always talks to port 80, so a fleet for the
+integration itself uses one loopback address per device (127.0.0.2,
+127.0.0.3, ...), which needs the privilege to bind port 80. The library
+can also be pointed at any port directly.
+
+Usage
+-----
+From a pytest suite: tests/conftest.py provides the hysen_fleet fixture,
+parametrized indirectly with the number of devices, and
+tests/test_coordinator.py drives a HysenCoordinator against it::
+
+    @pytest.mark.parametrize("hysen_fleet", [1, 20], indirect=True)
+    async def test_poll(hass, hysen_fleet):
+        device = hysen_fleet.devices[0]
+        hysen = Hysen2PipeFanCoilDevice(device.address, device.mac, 5, False, 0)
+        await hass.async_add_executor_job(hysen.get_device_status)
+
+From a shell, to serve a fleet until interrupted::
+
+    python tools/hysen_simulator.py --devices 50 --host 127.0.0.1 --latency 0.05
+
+Needs the cryptography package (a Home Assistant dependency).
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+_LOGGER = logging.getLogger(__name__)
+
+DEVICE_TYPE = 0x4F5B
+FIRMWARE_VERSION = 25
+
+_MAGIC = bytes.fromhex("5aa5aa555aa5aa55")
+_INIT_KEY = bytes.fromhex("097628343fe99e23765c1513accf8b02")
+_INIT_VECT = bytes.fromhex("562e17996d093d28ddb3ba695a2e6f58")
+
+_PACKET_AUTH = 0x65
+_PACKET_COMMAND = 0x6A
+_FIRMWARE_REQUEST = 0x68
+
+# Broadlink error codes written at 0x22 of a response.
+_ERROR_AUTHORIZATION = -7
+_ERROR_CONTROL_ID = -4012
+
+_HYSEN_HEADER = 0x01
+_HYSEN_READ = 0x03
+_HYSEN_WRITE_WORD = 0x06
+_HYSEN_WRITE_WORDS = 0x10
+
+# Byte offsets in the device memory (see get_device_status in the library).
+_MEM_LOCK = 0
+_MEM_VALVE_POWER = 1
+_MEM_MODE = 2
+_MEM_FAN = 3
+_MEM_ROOM_TEMP = 4
+_MEM_TARGET_TEMP = 5
+_MEM_HYSTERESIS = 6
+_MEM_CLOCK = 14
+_MEM_TIME_VALVE_ON = 28
+_MEMORY_SIZE = 32
+
+_MODE_FAN = 1
+_MODE_COOL = 2
+_MODE_HEAT = 3
+_FAN_LOW = 1
+_FAN_AUTO = 4
+
+# Thermal model: degrees per second towards the target while the valve is
+# open, and towards the ambient temperature while it is closed.
+_VALVE_RATE = 0.01
+_DRIFT_RATE = 0.002
+
+
+def _crc16(data: bytes) -> int:
+    """Return the CRC-16/MODBUS of data, as used by the Hysen requests."""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+def _checksum(data: bytes) -> int:
+    """Return the Broadlink 16-bit additive checksum."""
+    return sum(data, 0xBEAF) & 0xFFFF
+
+
+def _aes(key: bytes) -> Cipher:
+    """Return the AES-128-CBC cipher of a session key."""
+    return Cipher(algorithms.AES(key), modes.CBC(_INIT_VECT))
+
+
+def _random_mac() -> bytes:
+    """Return a random locally administered MAC address."""
+    return bytes([0x02]) + os.urandom(5)
+
+
+class SimulatedDevice:
+    """One virtual HY03AC controller: device memory, session and quirks.
+
+    Attributes:
+        mac: MAC address (6 bytes), as passed to the library.
+        address: (host, port) the device answers on.
+        memory: The 32 bytes returned by the status read.
+        latency, jitter, loss: Network conditions of every request.
+        settle_time: Seconds during which reads return pre-write memory.
+        drop_when_busy: Drop requests arriving while an answer is pending.
+        stats: Request counters (requests, auths, reads, writes, dropped,
+            busy, errors).
+    """
+
+    def __init__(
+        self,
+        mac: bytes | None = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        loss: float = 0.0,
+        settle_time: float = 0.0,
+        drop_when_busy: bool = False,
+        ambient_temp: float = 26.0,
+        fwversion: int = FIRMWARE_VERSION,
+        seed: int | None = None,
+    ) -> None:
+        """Initialise a powered-on device in cooling mode at ambient temperature."""
+        self.mac = mac or _random_mac()
+        self.address = None
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.settle_time = settle_time
+        self.drop_when_busy = drop_when_busy
+        self.ambient_temp = ambient_temp
+        self.fwversion = fwversion
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "auths": 0, "reads": 0, "writes": 0, "dropped": 0, "busy": 0, "errors": 0}
+
+        now = datetime.now()
+        self.memory = bytearray([
+            0x00, 0x01, _MODE_COOL, _FAN_LOW, int(ambient_temp), 22,
+            0x01, 0x00, 40, 10, 40, 10, 0x00, 0x00,
+            now.hour, now.minute, now.second, now.isoweekday(), 0x00, 0x00,
+            8, 0, 11, 30, 12, 30, 17, 30,
+            0, 0, 0, 0,
+        ])
+        self._room_temp = ambient_temp
+        self._valve_seconds = 0.0
+        self._clock_base = time.monotonic()
+        self._clock_set = now.hour * 3600 + now.minute * 60 + now.second
+        self._clock_weekday = now.isoweekday()
+        self._updated = time.monotonic()
+        self._settled_memory = None
+        self._settled_at = 0.0
+        self._busy_until = 0.0
+        self._session_id = 0
+        self._cipher = _aes(_INIT_KEY)
+
+    # ------------------------------------------------------------------
+    # Device behaviour
+    # ------------------------------------------------------------------
+
+    def _update(self) -> None:
+        """Advance the thermal model, valve counter and clock to now."""
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        power = self.memory[_MEM_VALVE_POWER] & 1
+        mode = self.memory[_MEM_MODE]
+        target = self.memory[_MEM_TARGET_TEMP]
+        hysteresis = 1.0 if self.memory[_MEM_HYSTERESIS] else 0.5
+        valve = bool(self.memory[_MEM_VALVE_POWER] & 0x10)
+
+        if power and mode == _MODE_HEAT:
+            valve = self._room_temp < target - (0 if valve else hysteresis)
+        elif power and mode == _MODE_COOL:
+            valve = self._room_temp > target + (0 if valve else hysteresis)
+        else:
+            valve = False
+
+        if valve:
+            step = min(abs(target - self._room_temp), _VALVE_RATE * elapsed)
+            self._room_temp += step if target > self._room_temp else -step
+            self._valve_seconds += elapsed
+        else:
+            step = min(abs(self.ambient_temp - self._room_temp), _DRIFT_RATE * elapsed)
+            self._room_temp += step if self.ambient_temp > self._room_temp else -step
+
+        self.memory[_MEM_VALVE_POWER] = (0x10 if valve else 0x00) | power
+        self.memory[_MEM_ROOM_TEMP] = max(0, min(255, round(self._room_temp)))
+        self.memory[_MEM_TIME_VALVE_ON:_MEM_TIME_VALVE_ON + 4] = int(self._valve_seconds).to_bytes(4, "big")
+
+        seconds = self._clock_set + int(now - self._clock_base)
+        days, seconds = divmod(seconds, 86400)
+        self.memory[_MEM_CLOCK:_MEM_CLOCK + 4] = bytes([
+            seconds // 3600, seconds // 60 % 60, seconds % 60, (self._clock_weekday - 1 + days) % 7 + 1,
+        ])
+
+    def _write(self, offset: int, data: bytes) -> None:
+        """Write device memory like the firmware does."""
+        now = time.monotonic()
+        if self.settle_time and now >= self._settled_at:
+            self._settled_memory = bytes(self.memory)
+        self._settled_at = now + self.settle_time
+
+        clock_written = False
+        for index, value in enumerate(data, offset):
+            if index == _MEM_ROOM_TEMP or index >= _MEM_TIME_VALVE_ON:
+                continue
+            if index == _MEM_VALVE_POWER:
+                value = (self.memory[index] & 0x10) | (value & 0x01)
+            if _MEM_CLOCK <= index < _MEM_CLOCK + 4:
+                clock_written = True
+            self.memory[index] = value
+
+        if self.memory[_MEM_MODE] == _MODE_FAN and self.memory[_MEM_FAN] == _FAN_AUTO:
+            self.memory[_MEM_FAN] = _FAN_LOW
+        if clock_written:
+            hour, minute, second, weekday = self.memory[_MEM_CLOCK:_MEM_CLOCK + 4]
+            self._clock_base = now
+            self._clock_set = hour * 3600 + minute * 60 + second
+            self._clock_weekday = weekday
+
+    def _read(self, offset: int, length: int) -> bytes:
+        """Read device memory, returning pre-write values while settling."""
+        self._update()
+        if self._settled_memory is not None and time.monotonic() < self._settled_at:
+            return self._settled_memory[offset:offset + length]
+        self._settled_memory = None
+        return bytes(self.memory[offset:offset + length])
+
+    def _hysen_request(self, request: bytes) -> bytes:
+        """Execute one Hysen memory request and return the response payload."""
+        if len(request) < 6 or request[0] != _HYSEN_HEADER:
+            return bytes([_HYSEN_HEADER, 0x80, 0x01])
+        command, word = request[1], request[3]
+        if command == _HYSEN_READ:
+            count = request[5]
+            if 2 * (word + count) > _MEMORY_SIZE:
+                return bytes([_HYSEN_HEADER, command | 0x80, 0x02])
+            self.stats["reads"] += 1
+            return bytes([_HYSEN_HEADER, command, 2 * count]) + self._read(2 * word, 2 * count)
+        if command == _HYSEN_WRITE_WORD:
+            self.stats["writes"] += 1
+            self._write(2 * word, request[4:6])
+            return bytes(request[:6])
+        if command == _HYSEN_WRITE_WORDS:
+            size = request[6] if len(request) > 6 else 0
+            if size != 2 * request[5] or len(request) < 7 + size or 2 * word + size > _MEMORY_SIZE:
+                return bytes([_HYSEN_HEADER, command | 0x80, 0x03])
+            self.stats["writes"] += 1
+            self._write(2 * word, request[7:7 + size])
+            return bytes(request[:6])
+        return bytes([_HYSEN_HEADER, command | 0x80, 0x01])
+
+    # ------------------------------------------------------------------
+    # Broadlink framing
+    # ------------------------------------------------------------------
+
+    def handle_packet(self, packet: bytes) -> bytes | None:
+        """Return the response to one UDP packet, or None to ignore it."""
+        if len(packet) < 0x38 or packet[:8] != _MAGIC:
+            return None
+        if int.from_bytes(packet[0x20:0x22], "little") != (_checksum(packet) - sum(packet[0x20:0x22])) & 0xFFFF:
+            return None
+        self.stats["requests"] += 1
+        packet_type = int.from_bytes(packet[0x26:0x28], "little")
+        session_id = int.from_bytes(packet[0x30:0x34], "little")
+
+        if packet_type == _PACKET_AUTH:
+            payload = self._decrypt(_aes(_INIT_KEY), packet[0x38:])
+            if payload is None:
+                return None
+            self.stats["auths"] += 1
+            self._session_id = self.random.randrange(1, 1 << 32)
+            key = bytes(self.random.randrange(256) for _ in range(16))
+            response = self._response(packet, self._session_id.to_bytes(4, "little") + key + bytes(12), _aes(_INIT_KEY))
+            self._cipher = _aes(key)
+            return response
+
+        if packet_type != _PACKET_COMMAND:
+            return None
+        if session_id != self._session_id or not self._session_id:
+            self.stats["errors"] += 1
+            return self._response(packet, b"", self._cipher, _ERROR_CONTROL_ID)
+        payload = self._decrypt(self._cipher, packet[0x38:])
+        if payload is None:
+            self.stats["errors"] += 1
+            return self._response(packet, b"", self._cipher, _ERROR_AUTHORIZATION)
+
+        if payload[0] == _FIRMWARE_REQUEST and len(payload) > 2 and payload[2] != _HYSEN_HEADER:
+            return self._response(packet, bytes(4) + self.fwversion.to_bytes(2, "little"), self._cipher)
+
+        length = payload[0]
+        request = payload[2:length]
+        crc = _crc16(request)
+        if length < 4 or length + 2 > len(payload) or payload[length:length + 2] != bytes([crc & 0xFF, crc >> 8]):
+            self.stats["errors"] += 1
+            return None
+        result = self._hysen_request(request)
+        crc = _crc16(result)
+        return self._response(packet, bytes([len(result) + 2, 0]) + result + bytes([crc & 0xFF, crc >> 8]), self._cipher)
+
+    @staticmethod
+    def _decrypt(cipher: Cipher, data: bytes) -> bytes | None:
+        """Decrypt a payload, or return None if it is not block aligned."""
+        if not data or len(data) % 16:
+            return None
+        decryptor = cipher.decryptor()
+        return decryptor.update(bytes(data)) + decryptor.finalize()
+
+    def _response(self, request: bytes, payload: bytes, cipher: Cipher, error: int = 0) -> bytes:
+        """Frame an encrypted response to a request."""
+        packet = bytearray(0x38)
+        packet[:8] = _MAGIC
+        packet[0x22:0x24] = error.to_bytes(2, "little", signed=True)
+        packet[0x24:0x26] = DEVICE_TYPE.to_bytes(2, "little")
+        packet[0x26:0x28] = (int.from_bytes(request[0x26:0x28], "little") + 900).to_bytes(2, "little")
+        packet[0x28:0x2A] = request[0x28:0x2A]
+        packet[0x2A:0x30] = self.mac[::-1]
+        packet[0x30:0x34] = self._session_id.to_bytes(4, "little")
+        if payload:
+            packet[0x34:0x36] = _checksum(payload).to_bytes(2, "little")
+            payload = payload + bytes((16 - len(payload)) % 16)
+            encryptor = cipher.encryptor()
+            packet.extend(encryptor.update(payload) + encryptor.finalize())
+        packet[0x20:0x22] = _checksum(packet).to_bytes(2, "little")
+        return bytes(packet)
+
+
+class _SimulatorProtocol(asyncio.DatagramProtocol):
+    """UDP endpoint serving the devices bound to one (host, port)."""
+
+    def __init__(self) -> None:
+        self.devices: dict = {}
+        self.transport = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        device = self.devices.get(bytes(data[0x2A:0x30])[::-1]) if len(data) >= 0x30 else None
+        if device is None:
+            if len(self.devices) != 1:
+                return
+            # A single device answers whatever MAC it is addressed with,
+            # like a real unit on its own IP address.
+            device = next(iter(self.devices.values()))
+        now = time.monotonic()
+        if device.loss and device.random.random() < device.loss:
+            device.stats["dropped"] += 1
+            return
+        if device.drop_when_busy and now < device._busy_until:
+            device.stats["busy"] += 1
+            return
+        response = device.handle_packet(data)
+        if response is None:
+            return
+        delay = device.latency + (device.random.uniform(0, device.jitter) if device.jitter else 0.0)
+        device._busy_until = now + delay
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._send, response, addr)
+        else:
+            self._send(response, addr)
+
+    def _send(self, response: bytes, addr) -> None:
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.sendto(response, addr)
+
+
+class HysenSimulator:
+    """A process-local fleet of simulated devices.
+
+    Use as an async context manager, or call async_close when done.
+    """
+
+    def __init__(self) -> None:
+        """Initialise an empty fleet."""
+        self.devices: list = []
+        self._endpoints: dict = {}
+
+    async def __aenter__(self) -> "HysenSimulator":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.async_close()
+
+    async def async_add_device(self, host: str = "127.0.0.1", port: int = 0, **kwargs) -> SimulatedDevice:
+        """Create a device answering on (host, port).
+
+        Args:
+            host: Address to bind.
+            port: UDP port; 0 gives the device its own ephemeral port, an
+                already bound (host, port) is shared with its devices.
+            **kwargs: SimulatedDevice arguments (mac, latency, jitter, loss,
+                settle_time, drop_when_busy, ...).
+
+        Returns:
+            The device; device.address is what the library must connect to.
+        """
+        device = SimulatedDevice(**kwargs)
+        protocol = self._endpoints.get((host, port)) if port else None
+        if protocol is None:
+            _, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+                _SimulatorProtocol, local_addr=(host, port)
+            )
+            self._endpoints[protocol.transport.get_extra_info("sockname")[:2]] = protocol
+        protocol.devices[device.mac] = device
+        device.address = protocol.transport.get_extra_info("sockname")[:2]
+        self.devices.append(device)
+        return device
+
+    async def async_add_devices(self, count: int, host: str = "127.0.0.1", shared_port: bool = False, **kwargs) -> list:
+        """Create count devices, each on its own port or all on one port.
+
+        With shared_port, the devices are told apart by their MAC address.
+        """
+        devices = []
+        port = 0
+        for _ in range(count):
+            device = await self.async_add_device(host, port, **kwargs)
+            if shared_port:
+                port = device.address[1]
+            devices.append(device)
+        return devices
+
+    def stats(self) -> dict:
+        """Return the request counters summed over the fleet."""
+        total: dict = {}
+        for device in self.devices:
+            for key, value in device.stats.items():
+                total[key] = total.get(key, 0) + value
+        return total
+
+    async def async_close(self) -> None:
+        """Close every endpoint."""
+        for protocol in self._endpoints.values():
+            protocol.transport.close()
+        self._endpoints.clear()
+
+
+async def _async_main(args) -> None:
+    """Serve a fleet until interrupted."""
+    async with HysenSimulator() as simulator:
+        devices = await simulator.async_add_devices(
+            args.devices,
+            host=args.host,
+            shared_port=args.shared_port,
+            latency=args.latency,
+            jitter=args.jitter,
+            loss=args.loss,
+            settle_time=args.settle_time,
+            drop_when_busy=args.drop_when_busy,
+        )
+        for device in devices:
+            print(f"{device.mac.hex(':')} {device.address[0]}:{device.address[1]}")
+        try:
+            while True:
+                await asyncio.sleep(60)
+                _LOGGER.info("Requests: %s", simulator.stats())
+        finally:
+            print(simulator.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--shared-port", action="store_true", help="serve all devices on one port, routed by MAC")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="packet loss probability")
+    parser.add_argument("--settle-time", type=float, default=0.0, help="seconds reads return pre-write data")
+    parser.add_argument("--drop-when-busy", action="store_true")
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_async_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
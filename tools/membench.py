@@ -0,0 +1,179 @@
+"""
+Memory benchmark of the Hysen 2 Pipe Fan Coil integration against simulated
+devices.
+
+Boots Home Assistant like tools/benchmark.py, with allocations traced by
+tracemalloc, and for every fleet size loads N simulated devices, polls each
+of them a few times and measures per device:
+
+- traced_bytes_per_device    Memory allocated by setting the fleet up and
+                             still held once it has been polled (garbage
+                             collected), i.e. what a device costs Home
+                             Assistant as a whole: the integration's objects
+                             plus states, registry entries and the like.
+- peak_bytes_per_device      Peak traced memory while the fleet was set up
+                             and polled, above the starting point.
+- retained_bytes_per_device  The integration's own objects, by part, as
+                             reported by the memory_usage service
+                             (custom_components/hysen2pfc/memory.py).
+- leaked_bytes_per_device    Memory still held after every entry has been
+                             removed again; should stay near 0.
+
+Results are written as JSON and compared like the other benchmarks: with
+--baseline, the run fails (exit code 1) if a metric grew by more than
+--threshold percent. Same requirements as tools/benchmark.py (root or low
+unprivileged ports, Home Assistant and the hysen package installed).
+
+    python tools/membench.py --devices 1 100 1000 --output mem.json
+    python tools/membench.py --devices 1 100 1000 --baseline mem.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from homeassistant import config_entries
+from homeassistant.bootstrap import async_setup_hass
+from homeassistant.runner import RuntimeConfig
+
+_TOOLS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(_TOOLS))
+sys.path.insert(0, _TOOLS)
+
+from benchmark import (  # noqa: E402
+    _REPO,
+    _SimulatorThread,
+    _config_entry,
+    _free_port,
+    _loopback_address,
+    compare,
+)
+from custom_components.hysen2pfc.memory import measure_device  # noqa: E402
+
+_DOMAIN = "hysen2pfc"
+# Frames kept per allocation; only totals are read, so one is enough.
+_TRACE_FRAMES = 1
+
+
+def _traced() -> int:
+    """Return the traced memory after a full garbage collection."""
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+async def _async_bench(hass, devices: list, polls: int) -> dict:
+    """Measure one fleet size on a running Home Assistant instance."""
+    count = len(devices)
+    entries = [_config_entry(device, index) for index, device in enumerate(devices)]
+    start = _traced()
+    tracemalloc.reset_peak()
+
+    await asyncio.gather(*(hass.config_entries.async_add(entry) for entry in entries))
+    await hass.async_block_till_done()
+    loaded = [entry for entry in entries if entry.state is config_entries.ConfigEntryState.LOADED]
+    device_data = [hass.data[_DOMAIN][entry.entry_id] for entry in loaded]
+    for _ in range(polls):
+        await asyncio.gather(*(data["coordinator"].async_refresh() for data in device_data))
+    await hass.async_block_till_done()
+    traced = _traced() - start
+    peak = tracemalloc.get_traced_memory()[1] - start
+
+    retained = {}
+    for data in device_data:
+        for part, size in measure_device(hass, data)["bytes"].items():
+            retained[part] = retained.get(part, 0) + size
+    del device_data
+
+    await asyncio.gather(*(hass.config_entries.async_remove(entry.entry_id) for entry in entries))
+    await hass.async_block_till_done()
+    del entries, loaded
+    leaked = _traced() - start
+
+    return {
+        "devices": count,
+        "traced_bytes_per_device": round(traced / count),
+        "peak_bytes_per_device": round(peak / count),
+        "retained_bytes_per_device": {part: round(size / count) for part, size in retained.items()},
+        "leaked_bytes_per_device": round(leaked / count),
+    }
+
+
+async def _async_main(args) -> dict:
+    """Run every fleet size on one traced Home Assistant instance."""
+    results = {}
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.symlink(os.path.join(_REPO, "custom_components"), os.path.join(config_dir, "custom_components"))
+        with open(os.path.join(config_dir, "configuration.yaml"), "w", encoding="utf-8") as handle:
+            handle.write(f"http:\n  server_host: 127.0.0.1\n  server_port: {_free_port()}\n")
+        hass = await async_setup_hass(RuntimeConfig(config_dir=config_dir, skip_pip=True))
+        if hass is None:
+            raise RuntimeError("Home Assistant failed to start")
+        await hass.async_start()
+        simulator = _SimulatorThread()
+        try:
+            # Load the integration once so that its modules and shared
+            # stores are not charged to the first fleet size.
+            warmup = simulator.run(simulator.simulator.async_add_device(_loopback_address(0), 80))
+            await _async_bench(hass, [warmup], 1)
+            offset = 1
+            for count in args.devices:
+                devices = [
+                    simulator.run(simulator.simulator.async_add_device(_loopback_address(offset + index), 80))
+                    for index in range(count)
+                ]
+                offset += count
+                logging.info("Measuring %d devices", count)
+                results[str(count)] = await _async_bench(hass, devices, args.polls)
+                logging.info("%s", results[str(count)])
+        finally:
+            simulator.close()
+            await hass.async_stop()
+    return results
+
+
+def main() -> int:
+    """Parse the command line, run the benchmark and compare."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 100, 1000], help="fleet sizes")
+    parser.add_argument("--polls", type=int, default=3, help="polls per device before measuring")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with this earlier result file")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression (%%)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    logging.getLogger("homeassistant").setLevel(logging.WARNING)
+    logging.getLogger("custom_components").setLevel(logging.WARNING)
+
+    tracemalloc.start(_TRACE_FRAMES)
+    results = asyncio.run(_async_main(args))
+    tracemalloc.stop()
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "settings": {"polls": args.polls},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.threshold}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
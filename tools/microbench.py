@@ -0,0 +1,241 @@
+"""
+Microbenchmarks of the per-poll hot paths of the Hysen 2 Pipe Fan Coil
+integration.
+
+Every poll runs coordinator.translate_status once per device, and every
+state write makes Home Assistant evaluate the entity properties below. This
+tool feeds recorded raw device states through each of them in isolation,
+without an event loop, a device or Home Assistant's state machine, and
+reports for every case:
+
+- ns_per_op                Mean wall time per call (best of --repeat runs).
+- retained_blocks_per_op   Memory blocks still referenced by each result
+                           (e.g. the dict and strings built per call).
+- peak_bytes_per_op        Peak memory allocated during one call,
+                           temporaries included.
+
+Cases:
+
+    translate_status                     coordinator.translate_status(device)
+    climate.extra_state_attributes       HysenClimate
+    climate.supported_features           HysenClimate
+    max_temp.native_min_value            HysenMaxTempNumber
+    device_time.extra_state_attributes   HysenDeviceTimeSensor
+
+Entities are built on a minimal stand-in coordinator holding the translated
+data, which is all these properties read. Needs Home Assistant and the
+hysen package installed (the modules import them).
+
+    python tools/microbench.py --output micro.json
+    python tools/microbench.py --baseline micro.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+_TOOLS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(_TOOLS))
+sys.path.insert(0, _TOOLS)
+
+from custom_components.hysen2pfc.climate import HysenClimate  # noqa: E402
+from custom_components.hysen2pfc.coordinator import translate_status  # noqa: E402
+from custom_components.hysen2pfc.number import HysenMaxTempNumber  # noqa: E402
+from custom_components.hysen2pfc.sensor import HysenDeviceTimeSensor  # noqa: E402
+
+# Raw attributes of Hysen2PipeFanCoilDevice after get_device_status, as
+# recorded from units in typical states.
+RECORDED_STATES = {
+    "cooling": {
+        "key_lock": 0, "key_lock_type": 0, "valve_state": 1, "power_state": 1,
+        "operation_mode": 2, "fan_mode": 4, "room_temp": 27, "target_temp": 23,
+        "hysteresis": 1, "calibration": -0.5,
+        "cooling_max_temp": 30, "cooling_min_temp": 18, "heating_max_temp": 28, "heating_min_temp": 10,
+        "fan_control": 0, "frost_protection": 1,
+        "clock_hour": 14, "clock_minute": 5, "clock_second": 30, "clock_weekday": 1,
+        "unknown": 0, "schedule": 1,
+        "period1_start_enabled": 1, "period1_start_hour": 7, "period1_start_min": 30,
+        "period1_end_enabled": 1, "period1_end_hour": 12, "period1_end_min": 0,
+        "period2_start_enabled": 1, "period2_start_hour": 13, "period2_start_min": 0,
+        "period2_end_enabled": 1, "period2_end_hour": 18, "period2_end_min": 30,
+        "time_valve_on": 1234567, "fwversion": 25,
+    },
+    "heating_idle": {
+        "key_lock": 1, "key_lock_type": 1, "valve_state": 0, "power_state": 1,
+        "operation_mode": 3, "fan_mode": 2, "room_temp": 21, "target_temp": 21,
+        "hysteresis": 0, "calibration": 1.0,
+        "cooling_max_temp": 40, "cooling_min_temp": 10, "heating_max_temp": 25, "heating_min_temp": 16,
+        "fan_control": 0, "frost_protection": 0,
+        "clock_hour": 6, "clock_minute": 59, "clock_second": 2, "clock_weekday": 6,
+        "unknown": 0, "schedule": 3,
+        "period1_start_enabled": 0, "period1_start_hour": 8, "period1_start_min": 0,
+        "period1_end_enabled": 0, "period1_end_hour": 11, "period1_end_min": 30,
+        "period2_start_enabled": 0, "period2_start_hour": 12, "period2_start_min": 30,
+        "period2_end_enabled": 0, "period2_end_hour": 17, "period2_end_min": 30,
+        "time_valve_on": 86400, "fwversion": 25,
+    },
+    "fan_only": {
+        "key_lock": 0, "key_lock_type": 0, "valve_state": 0, "power_state": 1,
+        "operation_mode": 1, "fan_mode": 3, "room_temp": 24, "target_temp": 22,
+        "hysteresis": 1, "calibration": 0.0,
+        "cooling_max_temp": 40, "cooling_min_temp": 10, "heating_max_temp": 40, "heating_min_temp": 10,
+        "fan_control": 1, "frost_protection": 1,
+        "clock_hour": 23, "clock_minute": 0, "clock_second": 0, "clock_weekday": 7,
+        "unknown": 0, "schedule": 0,
+        "period1_start_enabled": 1, "period1_start_hour": 9, "period1_start_min": 15,
+        "period1_end_enabled": 0, "period1_end_hour": 11, "period1_end_min": 30,
+        "period2_start_enabled": 0, "period2_start_hour": 12, "period2_start_min": 30,
+        "period2_end_enabled": 1, "period2_end_hour": 22, "period2_end_min": 45,
+        "time_valve_on": 0, "fwversion": 25,
+    },
+    "off": {
+        "key_lock": 1, "key_lock_type": 2, "valve_state": 0, "power_state": 0,
+        "operation_mode": 2, "fan_mode": 1, "room_temp": 19, "target_temp": 24,
+        "hysteresis": 1, "calibration": -2.3,
+        "cooling_max_temp": 32, "cooling_min_temp": 20, "heating_max_temp": 40, "heating_min_temp": 10,
+        "fan_control": 0, "frost_protection": 1,
+        "clock_hour": 2, "clock_minute": 30, "clock_second": 59, "clock_weekday": 3,
+        "unknown": 0, "schedule": 2,
+        "period1_start_enabled": 0, "period1_start_hour": 8, "period1_start_min": 0,
+        "period1_end_enabled": 0, "period1_end_hour": 11, "period1_end_min": 30,
+        "period2_start_enabled": 0, "period2_start_hour": 12, "period2_start_min": 30,
+        "period2_end_enabled": 0, "period2_end_hour": 17, "period2_end_min": 30,
+        "time_valve_on": 7200, "fwversion": 25,
+    },
+}
+
+
+class _BenchCoordinator:
+    """The parts of HysenCoordinator the measured properties read."""
+
+    last_update_success = True
+    online = True
+    stale = False
+    cached = False
+    data_age = None
+
+    def __init__(self, data: dict) -> None:
+        self.data = data
+        self.command_queue = SimpleNamespace(pending=())
+
+
+def _cases(raw: dict) -> dict:
+    """Return the measured callables for one recorded state."""
+    device = SimpleNamespace(**raw)
+    coordinator = _BenchCoordinator(translate_status(device))
+    device_data = {"coordinator": coordinator, "host": "192.0.2.1", "mac": "02:00:00:00:00:01", "name": "Bench"}
+    climate = HysenClimate(device_data)
+    max_temp = HysenMaxTempNumber(device_data)
+    device_time = HysenDeviceTimeSensor(device_data)
+    return {
+        "translate_status": lambda: translate_status(device),
+        "climate.extra_state_attributes": lambda: climate.extra_state_attributes,
+        "climate.supported_features": lambda: climate.supported_features,
+        "max_temp.native_min_value": lambda: max_temp.native_min_value,
+        "device_time.extra_state_attributes": lambda: device_time.extra_state_attributes,
+    }
+
+
+def _time_ns(func, ops: int, repeat: int) -> float:
+    """Return the best mean ns per call over repeat runs of ops calls."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(ops):
+            func()
+        mean = (time.perf_counter_ns() - start) / ops
+        best = mean if best is None else min(best, mean)
+    return best
+
+
+def _allocations(func, ops: int) -> tuple:
+    """Return (retained blocks per call, peak bytes of one call)."""
+    results = [None] * ops
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        for index in range(ops):
+            results[index] = func()
+        after = tracemalloc.take_snapshot()
+        retained = sum(stat.count_diff for stat in after.compare_to(before, "lineno")
+                       if stat.traceback[0].filename != tracemalloc.__file__)
+        func()
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        func()
+        peak = tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+    return max(0.0, retained / ops), peak
+
+
+def run(ops: int, repeat: int) -> dict:
+    """Measure every case over every recorded state and return the means."""
+    totals: dict = {}
+    gc.disable()
+    try:
+        for raw in RECORDED_STATES.values():
+            for name, func in _cases(raw).items():
+                func()
+                ns = _time_ns(func, ops, repeat)
+                retained, peak = _allocations(func, min(ops, 1000))
+                total = totals.setdefault(name, {"ns_per_op": 0.0, "retained_blocks_per_op": 0.0, "peak_bytes_per_op": 0})
+                total["ns_per_op"] += ns
+                total["retained_blocks_per_op"] += retained
+                total["peak_bytes_per_op"] = max(total["peak_bytes_per_op"], peak)
+    finally:
+        gc.enable()
+    count = len(RECORDED_STATES)
+    return {
+        name: {
+            "ns_per_op": round(total["ns_per_op"] / count, 1),
+            "retained_blocks_per_op": round(total["retained_blocks_per_op"] / count, 2),
+            "peak_bytes_per_op": total["peak_bytes_per_op"],
+        }
+        for name, total in totals.items()
+    }
+
+
+def main() -> int:
+    """Parse the command line, run the cases and compare."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--ops", type=int, default=20000, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs; the best is kept")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with this earlier result file")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression (%%)")
+    args = parser.parse_args()
+
+    results = run(args.ops, args.repeat)
+    for name, result in results.items():
+        print(f"{name:<36} {result['ns_per_op']:>10.1f} ns/op "
+              f"{result['retained_blocks_per_op']:>6.2f} blocks/op {result['peak_bytes_per_op']:>7} peak B/op")
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "settings": {"ops": args.ops, "repeat": args.repeat},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.baseline:
+        from benchmark import compare
+
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.threshold}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
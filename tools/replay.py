@@ -0,0 +1,173 @@
+"""
+Replay of captured device traffic through the Hysen 2 Pipe Fan Coil
+coordinator.
+
+Reads a capture written by the integration's capture option (see
+custom_components/hysen2pfc/capture.py; the rotated files are included),
+and polls a real HysenCoordinator, on a Home Assistant instance booted in a
+temporary config directory, against a HysenReplayDevice that answers from
+the trace until no recorded poll is left. No device or network is needed.
+
+- At the recorded pace (--realtime), every exchange waits for its recorded
+  time and latency, so field latency problems (slow answers, timeouts and
+  the retries they cause, stale data) play out as they did on site.
+- As fast as possible (the default), the recorded latencies and the
+  coordinator's retry back-off are skipped, which benchmarks the request,
+  decryption, parsing and translation path against real traffic.
+
+Reports the polls replayed, how many failed or served stale data, the
+refresh time (p50/p95/max), polls per second and per CPU-second, and the
+recorded exchanges skipped (commands in the trace are not issued again).
+Needs a Home Assistant installation and the hysen package.
+
+    python tools/replay.py config/hysen2pfc/captures/34ea34b5c1d2.hcap
+    python tools/replay.py --realtime --output replay.json config/hysen2pfc/captures/34ea34b5c1d2.hcap
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from types import MappingProxyType
+
+from homeassistant import config_entries
+from homeassistant.bootstrap import async_setup_hass
+from homeassistant.runner import RuntimeConfig
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from custom_components.hysen2pfc import coordinator as coordinator_module  # noqa: E402
+from custom_components.hysen2pfc.capture import (  # noqa: E402
+    HysenReplayDevice,
+    capture_files,
+    read_capture,
+)
+from custom_components.hysen2pfc.command_queue import HysenCommandQueueStore  # noqa: E402
+from custom_components.hysen2pfc.coordinator import HysenCoordinator  # noqa: E402
+
+_DOMAIN = "hysen2pfc"
+_HOST = "replay"
+
+
+def _config_entry(mac: str) -> config_entries.ConfigEntry:
+    """Build the config entry the replayed coordinator belongs to."""
+    kwargs = {
+        "version": 1,
+        "minor_version": 1,
+        "domain": _DOMAIN,
+        "title": "Replay",
+        "data": {"host": _HOST, "mac": mac, "name": "Replay"},
+        "options": {},
+        "source": config_entries.SOURCE_USER,
+        "unique_id": mac,
+        "discovery_keys": MappingProxyType({}),
+        "subentries_data": None,
+    }
+    parameters = inspect.signature(config_entries.ConfigEntry).parameters
+    return config_entries.ConfigEntry(**{key: value for key, value in kwargs.items() if key in parameters})
+
+
+def _percentile(values: list, fraction: float) -> float:
+    """Return the value at the given fraction of the sorted values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _async_replay(hass, records: list, realtime: bool, stale_grace: int) -> dict:
+    """Poll a coordinator against the trace and return the metrics."""
+    device = HysenReplayDevice(records, realtime=realtime)
+    coordinator = HysenCoordinator(
+        hass, device, _HOST, _config_entry("00:00:00:00:00:00"),
+        update_interval=300,
+        command_queue_store=HysenCommandQueueStore(hass),
+        stale_grace=stale_grace,
+    )
+    refresh_ms = []
+    polls = failed = stale = 0
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    while not device.exhausted:
+        start = time.perf_counter()
+        await coordinator.async_refresh()
+        if device.exhausted:
+            break
+        refresh_ms.append((time.perf_counter() - start) * 1000)
+        polls += 1
+        failed += not coordinator.last_update_success
+        stale += coordinator.stale
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    recorded = [record[1] * 1000 for record in records]
+    return {
+        "records": len(records),
+        "replayed": device.replayed,
+        "skipped": device.skipped,
+        "polls": polls,
+        "failed_polls": failed,
+        "stale_polls": stale,
+        "refresh_ms": {
+            "p50": round(_percentile(refresh_ms, 0.50), 3),
+            "p95": round(_percentile(refresh_ms, 0.95), 3),
+            "max": round(max(refresh_ms, default=0.0), 3),
+        },
+        "recorded_latency_ms": {
+            "p50": round(_percentile(recorded, 0.50), 3),
+            "p95": round(_percentile(recorded, 0.95), 3),
+            "max": round(max(recorded, default=0.0), 3),
+        },
+        "polls_per_s": round(polls / wall, 1) if wall else 0.0,
+        "polls_per_cpu_s": round(polls / cpu, 1) if cpu else 0.0,
+        "trace_s": round(records[-1][0] - records[0][0], 1) if records else 0.0,
+        "replay_s": round(wall, 3),
+    }
+
+
+async def _async_main(args, records: list) -> dict:
+    """Boot Home Assistant, replay and stop."""
+    if not args.realtime:
+        # As fast as possible: the recorded failures still fail, without
+        # the back-off between the coordinator's attempts.
+        coordinator_module._RETRY_DELAY = 0
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_setup_hass(RuntimeConfig(config_dir=config_dir, skip_pip=True))
+        if hass is None:
+            raise RuntimeError("Home Assistant failed to start")
+        await hass.async_start()
+        try:
+            return await _async_replay(hass, records, args.realtime, args.stale_grace)
+        finally:
+            await hass.async_stop()
+
+
+def main() -> int:
+    """Parse the command line, load the capture and replay it."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("capture", help="capture file (<mac>.hcap); its rotated files are read first")
+    parser.add_argument("--realtime", action="store_true", help="replay at the recorded pace")
+    parser.add_argument("--stale-grace", type=int, default=90, help="coordinator stale grace (s)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    files = capture_files(args.capture)
+    if not files:
+        parser.error(f"{args.capture} not found")
+    records = [record for path in files for record in read_capture(path)]
+    logging.info("Replaying %d exchanges from %d files", len(records), len(files))
+
+    result = asyncio.run(_async_main(args, records))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())